@@ -0,0 +1,16 @@
+"""
+Benchmarks for the algorithms.
+
+Run from the repository root, eg. `python3 -m algorithms.benchmarks.lempel_ziv`.
+"""
+
+from time import perf_counter
+
+
+def timed(function, *args, **kwargs):
+    """
+    Call function once, returning its result and elapsed time in seconds.
+    """
+    start = perf_counter()
+    result = function(*args, **kwargs)
+    return result, perf_counter() - start
@@ -0,0 +1,59 @@
+"""
+Block-mode `lempel_ziv` compression across process pools of different sizes.
+
+    $ python3 -m algorithms.benchmarks.blocks [SIZE]
+
+Also shows what a dictionary costs and gains, and the time to read one block
+compared to decompressing everything.
+"""
+
+import io
+import os
+import sys
+
+from .. import lempel_ziv
+from . import timed
+
+
+BLOCK_SIZE = 131_072
+
+
+def run(data, workers, dictionary):
+    compressed = io.BytesIO()
+    _, compress_seconds = timed(
+        lempel_ziv.compress_blocks, io.BytesIO(data), compressed,
+        block_size=BLOCK_SIZE, dictionary=dictionary, max_workers=workers, lazy=False)
+    output = io.BytesIO()
+    _, decompress_seconds = timed(
+        lempel_ziv.decompress_blocks, io.BytesIO(compressed.getvalue()), output,
+        max_workers=workers)
+    assert output.getvalue() == data
+    return compressed.getvalue(), compress_seconds, decompress_seconds
+
+
+def main(size):
+    with open('data/scrabble.txt', 'rb') as fp:
+        text = fp.read()
+    data = (text * (size // len(text) + 1))[:size]
+    print(f"{size:,} bytes of text, {BLOCK_SIZE:,} byte blocks, {os.cpu_count()} CPUs")
+
+    streamed, seconds = timed(lempel_ziv.compress, data, lazy=False)
+    print(f"{'stream':<22} ratio {len(streamed) / size:.3f}   "
+          f"compress {size / seconds / 1e6:>6.2f} MB/s")
+
+    for dictionary in (False, True):
+        for workers in (1, 2, 4, 8):
+            compressed, compress_seconds, decompress_seconds = run(data, workers, dictionary)
+            name = f"{workers} workers{', dictionary' if dictionary else ''}"
+            print(f"{name:<22} ratio {len(compressed) / size:.3f}   "
+                  f"compress {size / compress_seconds / 1e6:>6.2f} MB/s   "
+                  f"decompress {size / decompress_seconds / 1e6:>6.2f} MB/s")
+
+        reader = lempel_ziv.BlockReader(io.BytesIO(compressed))
+        last = len(reader) - 1
+        _, seconds = timed(reader.read_block, last)
+        print(f"{'read_block(' + str(last) + ')':<22} {seconds * 1000:.1f} ms")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000)
@@ -0,0 +1,74 @@
+"""
+Streaming `lempel_ziv` compression against `zlib`: ratio, speed and memory.
+
+    $ python3 -m algorithms.benchmarks.compression [SIZE]
+
+Memory is the peak traced by `tracemalloc` while compressing a file of SIZE
+bytes to another file, which should not grow with the input size.
+"""
+
+import os
+from random import Random
+import sys
+import tempfile
+import tracemalloc
+import zlib
+
+from .. import lempel_ziv
+from . import timed
+
+
+def peak_memory(function, *args, **kwargs):
+    tracemalloc.start()
+    try:
+        function(*args, **kwargs)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def stream_file(function, source, destination, **kwargs):
+    with open(source, 'rb') as infile, open(destination, 'wb') as outfile:
+        function(infile, outfile, **kwargs)
+
+
+def main(size):
+    with open('data/scrabble.txt', 'rb') as fp:
+        text = fp.read()
+    inputs = (
+        ('scrabble', (text * (size // len(text) + 1))[:size]),
+        ('random', Random(1).randbytes(size)),
+    )
+    codecs = (
+        ('zlib -1', lambda data: zlib.compress(data, 1), zlib.decompress),
+        ('zlib -6', lambda data: zlib.compress(data, 6), zlib.decompress),
+        ('lz greedy', lambda data: lempel_ziv.compress(data, lazy=False), lempel_ziv.decompress),
+        ('lz lazy', lempel_ziv.compress, lempel_ziv.decompress),
+    )
+
+    print(f"{size:,} bytes")
+    for name, data in inputs:
+        for codec, compress, decompress in codecs:
+            compressed, compress_seconds = timed(compress, data)
+            output, decompress_seconds = timed(decompress, compressed)
+            assert output == data
+            print(f"{name:<8} {codec:<9} ratio {len(compressed) / len(data):>6.3f}   "
+                  f"compress {size / compress_seconds / 1e6:>8.2f} MB/s   "
+                  f"decompress {size / decompress_seconds / 1e6:>8.2f} MB/s")
+
+    with tempfile.TemporaryDirectory() as folder:
+        raw, packed, unpacked = (os.path.join(folder, name) for name in ('raw', 'lz', 'out'))
+        with open(raw, 'wb') as fp:
+            fp.write(inputs[0][1])
+        # Greedy, as tracing makes compression much slower still
+        compress_peak = peak_memory(
+            stream_file, lempel_ziv.compress_file, raw, packed, lazy=False)
+        decompress_peak = peak_memory(stream_file, lempel_ziv.decompress_file, packed, unpacked)
+        with open(unpacked, 'rb') as fp:
+            assert fp.read() == inputs[0][1]
+    print(f"compress_file() peak {compress_peak / 1e6:.1f} MB   "
+          f"decompress_file() peak {decompress_peak / 1e6:.1f} MB")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
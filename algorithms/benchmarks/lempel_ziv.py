@@ -0,0 +1,46 @@
+"""
+Throughput of `tokenise()` against input size, greedy and lazy.
+
+    $ python3 -m algorithms.benchmarks.lempel_ziv [MAX_SIZE]
+
+Input is the scrabble word list, repeated as needed, and random bytes.
+"""
+
+from random import Random
+import sys
+
+from ..lempel_ziv import Token, tokenise, untokenise
+from . import timed
+
+
+def sizes(max_size):
+    size = 10_000
+    while size <= max_size:
+        yield size
+        size *= 10
+
+
+def describe(tokens: list[Token]) -> str:
+    literals = sum(token.length for token in tokens if token.literal is not None)
+    matches = sum(1 for token in tokens if token.literal is None)
+    return f"{literals:>9,} literals {matches:>9,} matches"
+
+
+def main(max_size):
+    with open('data/scrabble.txt', 'rb') as fp:
+        text = fp.read()
+    noise = Random(1).randbytes(max_size)
+
+    for name, source in (('scrabble', text), ('random', noise)):
+        for size in sizes(max_size):
+            data = (source * (size // len(source) + 1))[:size]
+            for lazy in (False, True):
+                tokens, seconds = timed(tokenise, data, lazy=lazy)
+                assert untokenise(tokens) == data
+                mode = 'lazy' if lazy else 'greedy'
+                print(f"{name:<8} {size:>10,} bytes {mode:<6} "
+                      f"{size / seconds / 1e3:>8,.0f} kB/s   {describe(tokens)}")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,65 @@
+"""
+LZW against LZ77 tokenising and zlib, on text and on binary input.
+
+    $ python3 -m algorithms.benchmarks.lzw [SIZE]
+
+LZW size assumes fixed-width codes, just wide enough for the dictionary.
+LZ77 size is the output of the bit-packed `lempel_ziv.compress()`. The
+binary input is the start of the largest of Python's extension modules.
+"""
+
+from glob import glob
+import os
+from random import Random
+import sys
+import sysconfig
+import zlib
+
+from .. import lempel_ziv
+from . import timed
+
+
+def binary_path():
+    folder = os.path.join(sysconfig.get_path('platstdlib'), 'lib-dynload')
+    paths = glob(os.path.join(folder, '*.so')) or [sys.executable]
+    return max(paths, key=os.path.getsize)
+
+
+def inputs(size):
+    with open('data/scrabble.txt', 'rb') as fp:
+        yield 'scrabble', fp.read(size)
+    path = binary_path()
+    with open(path, 'rb') as fp:
+        yield os.path.basename(path), fp.read(size)
+    yield 'random', Random(1).randbytes(size)
+
+
+def lzw_size(codes, max_size):
+    width = (256 + max_size - 1).bit_length()
+    return (len(codes) * width + 7) // 8
+
+
+def main(size):
+    for name, data in inputs(size):
+        print(f"{name}, {len(data):,} bytes")
+        for max_size in (4096, 65_536):
+            for reset in lempel_ziv.LZW_RESET_POLICIES:
+                codes, seconds = timed(lempel_ziv.lzw_tokenise, data, max_size, reset)
+                output, untokenise_seconds = timed(
+                    lempel_ziv.lzw_untokenise, codes, False, max_size, reset)
+                assert output == data
+                ratio = lzw_size(codes, max_size) / len(data)
+                print(f"    LZW {max_size:>6,} {reset:<6}  ratio {ratio:.3f}   "
+                      f"tokenise {len(data) / seconds / 1e6:>6.2f} MB/s   "
+                      f"untokenise {len(data) / untokenise_seconds / 1e6:>6.2f} MB/s")
+
+        compressed, seconds = timed(lempel_ziv.compress, data, lazy=False)
+        print(f"    LZ77 greedy        ratio {len(compressed) / len(data):.3f}   "
+              f"compress {len(data) / seconds / 1e6:>6.2f} MB/s")
+        compressed, seconds = timed(zlib.compress, data)
+        print(f"    zlib -6            ratio {len(compressed) / len(data):.3f}   "
+              f"compress {len(data) / seconds / 1e6:>6.2f} MB/s")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500_000)
@@ -0,0 +1,34 @@
+"""
+Algorithm L reservoir sampling against one random number per element.
+
+    $ python3 -m algorithms.benchmarks.reservoir_sampling [MAX_LENGTH]
+"""
+
+import sys
+
+from ..reservoir_sampling import reservoir_samples, reservoir_samples_skip
+from . import timed
+
+
+NUM_SAMPLES = 30
+
+
+def lengths(max_length):
+    length = 10_000
+    while length <= max_length:
+        yield length
+        length *= 10
+
+
+def main(max_length):
+    for length in lengths(max_length):
+        _, seconds = timed(reservoir_samples, range(length), NUM_SAMPLES)
+        _, skip_seconds = timed(reservoir_samples_skip, range(length), NUM_SAMPLES)
+        print(f"{length:>13,} elements   "
+              f"per element {seconds * 1000:>9.1f} ms   "
+              f"skipping {skip_seconds * 1000:>7.1f} ms   "
+              f"x{seconds / skip_seconds:,.0f}")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000)
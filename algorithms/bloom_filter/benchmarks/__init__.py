@@ -0,0 +1,34 @@
+"""
+Benchmarks for the bloom filter module.
+
+Run from the `algorithms/bloom_filter` folder, eg. `python3 -m benchmarks.batch`.
+The full parameter sweep, with JSON output, is run by `python3 -m benchmarks`.
+"""
+
+from random import Random
+from string import ascii_lowercase
+from time import perf_counter
+
+
+def random_words(count, *, length=12, seed=None):
+    """
+    Build a list of random lower-case ASCII words.
+    """
+    random = Random(seed)
+    return [''.join(random.choices(ascii_lowercase, k=length)) for _ in range(count)]
+
+
+def timed(function, *args, **kwargs):
+    """
+    Call function once, returning its result and elapsed time in seconds.
+    """
+    start = perf_counter()
+    result = function(*args, **kwargs)
+    return result, perf_counter() - start
+
+
+def rate(count, seconds):
+    """
+    Format operations-per-second nicely.
+    """
+    return f"{count / seconds:>14,.0f} per second"
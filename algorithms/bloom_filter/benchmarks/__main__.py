@@ -0,0 +1,44 @@
+"""
+Run the bloom filter benchmark sweep.
+
+    $ python3 -m benchmarks --elements 10000 100000 --output results.json
+    $ python3 -m benchmarks --baseline results.json
+"""
+
+import argparse
+import logging
+import sys
+
+from .sweep import main
+
+
+def make_parser():
+    parser = argparse.ArgumentParser(
+        prog='benchmarks', description="Benchmark bloom filter parameters")
+    parser.add_argument(
+        '--elements', type=int, nargs='+', default=[10_000, 100_000, 1_000_000],
+        help='number of elements to insert')
+    parser.add_argument(
+        '--bits', type=float, nargs='+', default=[8, 12, 16],
+        help='bits per element')
+    parser.add_argument(
+        '--probes', type=int, nargs='+',
+        help='number of probes, defaults to optimal for size')
+    parser.add_argument(
+        '--strategies', nargs='+',
+        help='probe strategy names, defaults to all but mersenne-twister')
+    parser.add_argument(
+        '--output', metavar='PATH',
+        help='write results to JSON file')
+    parser.add_argument(
+        '--baseline', metavar='PATH',
+        help='JSON results to compare throughput against')
+    parser.add_argument(
+        '--tolerance', type=float, default=0.1,
+        help='allowed slow-down versus baseline (default: 0.1)')
+    return parser
+
+
+if __name__ == '__main__':
+    logging.getLogger('bloom_filter').setLevel(logging.INFO)
+    sys.exit(main(make_parser().parse_args()))
@@ -0,0 +1,49 @@
+"""
+Compare the scalar `update()`/`in` path with `add_many()`/`contains_many()`.
+
+The first rows time the original scalar path, with `MersenneTwister` probes,
+which was the default before `DoubleHashing` replaced it.
+
+    $ python3 -m benchmarks.batch [NUM_KEYS]
+"""
+
+import sys
+
+from bloom_filter import BloomFilter, MersenneTwister
+
+from . import random_words, rate, timed
+
+
+def main(num_keys):
+    keys = random_words(num_keys, seed=1)
+    missing = random_words(num_keys, seed=2)
+    num_bytes = num_keys * 10 // 8
+    print(f"{num_keys:,} keys, {num_bytes:,} bytes, 7 probes")
+
+    original = BloomFilter(num_bytes, 7, strategy=MersenneTwister())
+    _, elapsed = timed(original.update, keys)
+    print(f"update() original {rate(num_keys, elapsed)}")
+
+    lookups = keys + missing
+    _, elapsed = timed(lambda: [key in original for key in lookups])
+    print(f"in original       {rate(len(lookups), elapsed)}")
+
+    scalar = BloomFilter(num_bytes, 7)
+    _, elapsed = timed(scalar.update, keys)
+    print(f"update()          {rate(num_keys, elapsed)}")
+
+    batch = BloomFilter(num_bytes, 7)
+    _, elapsed = timed(batch.add_many, keys)
+    print(f"add_many()        {rate(num_keys, elapsed)}")
+    assert batch.array == scalar.array
+
+    _, elapsed = timed(lambda: [key in scalar for key in lookups])
+    print(f"in                {rate(len(lookups), elapsed)}")
+
+    found, elapsed = timed(batch.contains_many, lookups)
+    print(f"contains_many()   {rate(len(lookups), elapsed)}")
+    print(f"False positive rate: {found[num_keys:].mean():.2%}")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,59 @@
+"""
+Lookup latency and false-positive rate of `BlockedBloomFilter`.
+
+Compared against `BloomFilter`, `BloomFilter_4k` and `BloomFilter_32k`, all
+loaded with the same number of elements. The last two have a fixed size, so
+are hopelessly overloaded at these sizes; they are included for reference.
+
+    $ python3 -m benchmarks.blocked [NUM_ELEMENTS...]
+
+Defaults to 10^6, 10^7 and 10^8 elements. The largest needs about 120 MB per
+filter, and a long time to build.
+"""
+
+import sys
+
+from bloom_filter import BlockedBloomFilter, BloomFilter, BloomFilter_4k, BloomFilter_32k
+
+from . import timed
+
+
+NUM_LOOKUPS = 100_000
+
+
+def keys(start, stop):
+    return (f"key-{index}" for index in range(start, stop))
+
+
+def main(sizes):
+    for num_elements in sizes:
+        num_bytes, num_probes = BloomFilter.calculate_parameters(num_elements, error_rate=0.01)
+        filters = {
+            'BloomFilter': BloomFilter(num_bytes, num_probes),
+            'BlockedBloomFilter': BlockedBloomFilter(num_bytes, num_probes),
+            'BloomFilter_4k': BloomFilter_4k(),
+            'BloomFilter_32k': BloomFilter_32k(),
+        }
+        heading = f"{num_elements:,} elements, {num_bytes:,} bytes, {num_probes} probes"
+        print(heading)
+        print('=' * len(heading))
+        print(f"{'':<20} {'scalar in':>12} {'batch':>12} {'false pos.':>12}")
+
+        stride = max(1, num_elements // NUM_LOOKUPS)
+        present = [f"key-{index}" for index in range(0, num_elements, stride)]
+        absent = list(keys(num_elements, num_elements + NUM_LOOKUPS))
+        for name, bf in filters.items():
+            bf.add_many(keys(0, num_elements))
+            _, elapsed = timed(lambda: [key in bf for key in present[:10_000]])
+            scalar = elapsed / len(present[:10_000]) * 1e9
+            _, elapsed = timed(bf.contains_many, present)
+            batch = elapsed / len(present) * 1e9
+            assert bf.contains_many(present).all()
+            false_positives = bf.contains_many(absent).mean()
+            print(f"{name:<20} {scalar:>9,.0f} ns {batch:>9,.0f} ns {false_positives:>12.3%}")
+        print()
+
+
+if __name__ == '__main__':
+    sizes = [int(float(arg)) for arg in sys.argv[1:]] or [10**6, 10**7, 10**8]
+    main(sizes)
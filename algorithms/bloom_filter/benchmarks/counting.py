@@ -0,0 +1,60 @@
+"""
+Expire keys from a `CountingBloomFilter`, versus rebuilding a `BloomFilter`.
+
+Simulates a deduplication filter where a fraction of its keys expire and are
+replaced by new ones each round.
+
+    $ python3 -m benchmarks.counting [NUM_KEYS]
+"""
+
+import sys
+
+from bloom_filter import BloomFilter, CountingBloomFilter
+
+from . import random_words, rate, timed
+
+
+def main(num_keys, expire=0.1, rounds=5):
+    num_bytes, num_probes = BloomFilter.calculate_parameters(num_keys, error_rate=0.01)
+    churn = int(num_keys * expire)
+    keys = random_words(num_keys, seed=1)
+    fresh = random_words(churn * rounds, seed=2)
+    print(f"{num_keys:,} keys, {churn:,} expired and replaced per round, {rounds} rounds")
+
+    # Counting filter needs four times the memory, for the same number of bins
+    counting = CountingBloomFilter(num_bytes * 4, num_probes)
+    counting.add_many(keys)
+    plain = BloomFilter(num_bytes, num_probes)
+    plain.add_many(keys)
+    print(f"BloomFilter memory:         {len(plain.array):>14,} bytes")
+    print(f"CountingBloomFilter memory: {len(counting.array):>14,} bytes")
+
+    def rotate_counting():
+        live = list(keys)
+        for index in range(rounds):
+            expired, live = live[:churn], live[churn:]
+            added = fresh[index * churn:(index + 1) * churn]
+            counting.remove_many(expired)
+            counting.add_many(added)
+            live.extend(added)
+        return live
+
+    def rotate_rebuild():
+        live = list(keys)
+        for index in range(rounds):
+            live = live[churn:] + fresh[index * churn:(index + 1) * churn]
+            rebuilt = BloomFilter(num_bytes, num_probes)
+            rebuilt.add_many(live)
+        return rebuilt
+
+    live, elapsed = timed(rotate_counting)
+    print(f"remove_many() + add_many()  {rate(churn * rounds, elapsed)} expiries")
+    rebuilt, elapsed = timed(rotate_rebuild)
+    print(f"Rebuild BloomFilter         {rate(churn * rounds, elapsed)} expiries")
+
+    assert counting.contains_many(live).all()
+    assert rebuilt.contains_many(live).all()
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,50 @@
+"""
+Insert, lookup and delete with `CuckooFilter`, versus bloom filters.
+
+Both are sized for a 0.1% false-positive rate, or as near as fingerprint
+widths allow. Plain `BloomFilter` cannot delete, so deletion is compared with
+`CountingBloomFilter` instead. Bits per key is the size of the whole table,
+empty slots included, divided by the number of keys.
+
+    $ python3 -m benchmarks.cuckoo [NUM_KEYS]
+"""
+
+import sys
+
+from bloom_filter import BloomFilter, CountingBloomFilter
+from cuckoo_filter import CuckooFilter
+
+from . import random_words, rate, timed
+
+
+def main(num_keys, error_rate=0.001):
+    keys = random_words(num_keys, seed=1)
+    missing = random_words(num_keys, seed=2)
+    num_bytes, num_probes = BloomFilter.calculate_parameters(num_keys, error_rate=error_rate)
+    filters = {
+        'BloomFilter': BloomFilter(num_bytes, num_probes),
+        'CountingBloomFilter': CountingBloomFilter(num_bytes * 4, num_probes),
+        'CuckooFilter (12-bit)': CuckooFilter(num_keys, fingerprint_bits=12),
+        'CuckooFilter (13-bit)': CuckooFilter(num_keys, fingerprint_bits=13),
+        'CuckooFilter (16-bit)': CuckooFilter(num_keys, fingerprint_bits=16),
+    }
+
+    print(f"{num_keys:,} keys, target error rate {error_rate:.2%}")
+    for name, bf in filters.items():
+        print(name)
+        _, elapsed = timed(bf.add_many, keys)
+        print(f"    add_many()       {rate(num_keys, elapsed)}")
+        found, elapsed = timed(bf.contains_many, keys + missing)
+        print(f"    contains_many()  {rate(2 * num_keys, elapsed)}")
+        _, elapsed = timed(lambda: [key in bf for key in missing])
+        print(f"    in               {rate(num_keys, elapsed)}")
+        if hasattr(bf, 'remove_many'):
+            _, elapsed = timed(bf.remove_many, keys[:num_keys // 2])
+            print(f"    remove_many()    {rate(num_keys // 2, elapsed)}")
+        size = len(bf.array) if hasattr(bf, 'array') else bf.num_bytes()
+        print(f"    Bits per key     {size * 8 / num_keys:>14.1f}")
+        print(f"    False positives  {found[num_keys:].mean():>14.3%}")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,44 @@
+"""
+Build a filter from a text file, with and without `BloomFilter.build_parallel()`.
+
+    $ python3 -m benchmarks.parallel [NUM_LINES]
+"""
+
+import os
+import sys
+import tempfile
+
+from bloom_filter import BloomFilter
+
+from . import random_words, rate, timed
+
+
+def main(num_lines):
+    num_bytes, num_probes = BloomFilter.calculate_parameters(num_lines, error_rate=0.01)
+    print(f"{num_lines:,} lines, {os.cpu_count()} CPUs")
+
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, 'words.txt')
+        with open(path, 'wt') as fp:
+            for offset in range(0, num_lines, 100_000):
+                words = random_words(min(100_000, num_lines - offset), seed=offset)
+                fp.write('\n'.join(words) + '\n')
+
+        def sequential():
+            bf = BloomFilter(num_bytes, num_probes)
+            with open(path) as fp:
+                bf.add_many(line.strip() for line in fp)
+            return bf
+
+        expected, elapsed = timed(sequential)
+        print(f"add_many()         {rate(num_lines, elapsed)}")
+
+        chunk_size = max(1024, os.path.getsize(path) // (4 * os.cpu_count()))
+        bf, elapsed = timed(
+            BloomFilter.build_parallel, [path], num_bytes, num_probes, chunk_size=chunk_size)
+        print(f"build_parallel()   {rate(num_lines, elapsed)}")
+        assert bf.array == expected.array
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000)
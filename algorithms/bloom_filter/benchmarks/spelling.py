@@ -0,0 +1,47 @@
+"""
+Throughput of `SpellChecker.check_lines()`, versus `find_misspellings()`.
+
+Text is built from a small vocabulary with a skewed distribution, as in
+natural language, so that the LRU cache has something to do.
+
+    $ python3 -m benchmarks.spelling [NUM_LINES]
+"""
+
+import os
+from itertools import accumulate
+from random import Random
+import sys
+import tempfile
+
+from bloom_filter import SpellChecker
+
+from . import random_words, rate, timed
+
+
+def main(num_lines, words_per_line=12):
+    vocabulary = random_words(50_000, length=7, seed=1)
+    random = Random(2)
+    weights = list(accumulate(1 / rank for rank in range(1, len(vocabulary) + 1)))
+    lines = [
+        ' '.join(random.choices(vocabulary, cum_weights=weights, k=words_per_line)) + '\n'
+        for _ in range(num_lines)
+    ]
+    num_words = num_lines * words_per_line
+    print(f"{num_lines:,} lines, {num_words:,} words")
+
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, 'words.txt')
+        with open(path, 'wt') as fp:
+            fp.write('\n'.join(vocabulary[:45_000]))
+        checker = SpellChecker([path], estimated_word_count=len(vocabulary))
+
+    expected, elapsed = timed(lambda: checker.find_misspellings(''.join(lines)))
+    print(f"find_misspellings()         {rate(num_words, elapsed)}")
+    for cache_size in (0, 1024, 65_536):
+        found, elapsed = timed(lambda: list(checker.check_lines(lines, cache_size)))
+        print(f"check_lines(cache={cache_size:<6})  {rate(num_words, elapsed)}")
+    assert [spelling.word for spelling in found] == expected
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -0,0 +1,176 @@
+"""
+Sweep filter size, probe count and probe strategy, recording results as JSON.
+
+Every combination is built, timed, and its empirical false-positive rate
+compared with the theoretical rates. Results from an earlier run can be given
+as a baseline, to catch regressions between releases.
+"""
+
+from datetime import datetime, timezone
+from itertools import product
+import json
+import logging
+import platform
+import sys
+
+import numpy as np
+
+from bloom_filter import (
+    Blocked, bloom_filter_parameters, BloomFilter, get_probe_strategy, PROBE_STRATEGIES)
+
+from . import random_words, timed
+
+
+logger = logging.getLogger(__name__)
+
+# Throughput measurements compared against a baseline
+THROUGHPUTS = ('insert_per_second', 'lookup_per_second', 'scalar_lookup_per_second')
+
+
+def run_one(num_elements, bits_per_element, num_probes, strategy_name, *, keys, missing):
+    """
+    Build and measure a single filter.
+
+    Args:
+        num_elements (int): Number of keys to insert, taken from start of `keys`.
+        bits_per_element (float): Filter size.
+        num_probes (int): Probes per key, or None for the optimal number.
+        strategy_name (str): Name for `get_probe_strategy()`.
+        keys (list): Keys to insert.
+        missing (list): Keys never inserted, to measure false positives.
+
+    Returns:
+        Dictionary of parameters and measurements. The filter's actual size,
+        which may be rounded up from `bits_per_element`, is in `num_bytes`.
+    """
+    theory = bloom_filter_parameters(num_elements, bits_per_element)
+    if num_probes is None:
+        num_probes = theory['num_probes']
+    num_bytes = -(-theory['bits_total'] // 8)
+    strategy = get_probe_strategy(strategy_name)
+    if isinstance(strategy, Blocked):
+        # Only the blocked strategy needs whole cache-line blocks
+        num_bytes = -(-num_bytes // strategy.block_bytes) * strategy.block_bytes
+    bf = BloomFilter(num_bytes, num_probes, strategy=strategy)
+    keys = keys[:num_elements]
+
+    _, insert_seconds = timed(bf.add_many, keys)
+    found, lookup_seconds = timed(bf.contains_many, missing)
+    sample = missing[:10_000]
+    _, scalar_seconds = timed(lambda: [key in bf for key in sample])
+    assert bf.contains_many(keys[:10_000]).all(), "False negative found"
+
+    return {
+        'num_elements': num_elements,
+        'bits_per_element': bits_per_element,
+        'num_probes': num_probes,
+        'strategy': strategy_name,
+        'num_bytes': len(bf.array),
+        'insert_per_second': len(keys) / insert_seconds,
+        'lookup_per_second': len(missing) / lookup_seconds,
+        'scalar_lookup_per_second': len(sample) / scalar_seconds,
+        'error_rate': float(np.mean(found)),
+        'expected_error_rate': bf.expected_error_rate(bf.num_bins, num_probes, num_elements),
+        'optimal_error_rate': theory['error_rate'],
+    }
+
+
+def sweep(elements, bits_per_element, probes, strategies, num_lookups=100_000):
+    """
+    Run every combination of the given parameters.
+
+    Yields:
+        Result dictionaries from `run_one()`.
+    """
+    keys = random_words(max(elements), seed=1)
+    missing = random_words(num_lookups, seed=2)
+    for num_elements, bits, num_probes, strategy in product(
+            elements, bits_per_element, probes, strategies):
+        try:
+            yield run_one(num_elements, bits, num_probes, strategy, keys=keys, missing=missing)
+        except ValueError as e:
+            # eg. Hash slicing runs out of digest bits for large filters
+            logger.warning(f"Skipping {strategy} for {num_elements:,} elements: {e}")
+
+
+def metadata():
+    """
+    Describe environment, so that results can be compared fairly.
+    """
+    return {
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'platform': platform.platform(),
+    }
+
+
+def find_regressions(results, baseline, tolerance):
+    """
+    Compare throughput with baseline results.
+
+    Args:
+        results (list): Current results.
+        baseline (list): Earlier results, as loaded from JSON.
+        tolerance (float): Allowed slow-down, eg. 0.1 for 10%.
+
+    Returns:
+        List of `(result, measurement, before, after)` for every regression.
+    """
+    def key(result):
+        return (result['num_elements'], result['bits_per_element'],
+                result['num_probes'], result['strategy'])
+
+    earlier = {key(result): result for result in baseline}
+    regressions = []
+    for result in results:
+        before = earlier.get(key(result))
+        if before is None:
+            continue
+        for measurement in THROUGHPUTS:
+            if result[measurement] < before[measurement] * (1 - tolerance):
+                regressions.append((result, measurement, before[measurement], result[measurement]))
+    return regressions
+
+
+def format_result(result):
+    return (
+        f"{result['num_elements']:>11,} {result['bits_per_element']:>5} "
+        f"{result['num_probes']:>3} {result['strategy']:<20} "
+        f"{result['insert_per_second']:>11,.0f} {result['lookup_per_second']:>11,.0f} "
+        f"{result['scalar_lookup_per_second']:>9,.0f} "
+        f"{result['error_rate']:>8.3%} {result['expected_error_rate']:>8.3%}"
+    )
+
+
+HEADING = (
+    f"{'elements':>11} {'bits':>5} {'k':>3} {'strategy':<20} "
+    f"{'insert/s':>11} {'lookup/s':>11} {'scalar/s':>9} {'fp':>8} {'expected':>8}"
+)
+
+
+def main(options):
+    strategies = options.strategies or sorted(
+        name for name in PROBE_STRATEGIES if name != 'mersenne-twister')
+    print(HEADING)
+    results = []
+    for result in sweep(options.elements, options.bits, options.probes or [None], strategies):
+        print(format_result(result))
+        results.append(result)
+
+    if options.output:
+        with open(options.output, 'wt') as fp:
+            json.dump({'metadata': metadata(), 'results': results}, fp, indent=4)
+
+    if options.baseline:
+        with open(options.baseline, 'rt') as fp:
+            baseline = json.load(fp)['results']
+        regressions = find_regressions(results, baseline, options.tolerance)
+        for result, measurement, before, after in regressions:
+            print(
+                f"REGRESSION {result['strategy']} n={result['num_elements']:,} "
+                f"{measurement}: {before:,.0f} -> {after:,.0f}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
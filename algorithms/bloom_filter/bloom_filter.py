@@ -53,13 +53,26 @@ Divide and modulo big integer into lots of little ones
 
 """
 
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 import logging
 import hashlib
+from itertools import islice
 import math
+import mmap
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+import os
 from pprint import pprint;
 from random import Random
+import re
+import struct
 from sys import byteorder
 from time import perf_counter
+import traceback
+
+import numpy as np
 
 
 dump = pprint
@@ -67,34 +80,1008 @@ logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.DEBUG)
 
 
+# Keys hashed per NumPy pass by the batch methods, to bound temporary memory
+BATCH_SIZE = 65_536
+
+# Bytes of input file given to each worker by `BloomFilter.build_parallel()`
+CHUNK_SIZE = 64 * 1024 * 1024
+
+MASK64 = (1 << 64) - 1
+
+# On-disk format: fixed 64-byte header, followed immediately by the bit array.
+# Version 2 added bits per bin, for counting filters.
+FILE_MAGIC = b'BLMF'
+FILE_VERSION = 2
+FILE_HEADER = struct.Struct('<4sHBxQQI32s')
+FILE_HEADER_SIZE = 64
+FILE_MODES = {
+    'r': mmap.ACCESS_READ,
+    'r+': mmap.ACCESS_WRITE,
+    'c': mmap.ACCESS_COPY,
+}
+
+
+def double_hash(key):
+    """
+    Split a 128-bit BLAKE2b digest of `key` into two 64-bit integers.
+
+    Args:
+        key (str|bytes): Key to hash. Strings are encoded as UTF-8.
+
+    Returns:
+        Tuple of two integers, `(h1, h2)`.
+    """
+    digest = hashlib.blake2b(encode_key(key), digest_size=16).digest()
+    return (int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little'))
+
+
+def double_hash_many(keys):
+    """
+    Vectorised version of `double_hash()`.
+
+    Only the hashing itself is done one key at a time, everything after that
+    is done on the whole batch at once.
+
+    Args:
+        keys (iterable): Strings or bytes to hash.
+
+    Returns:
+        NumPy array of `uint64` with shape `(len(keys), 2)`.
+    """
+    blake2b = hashlib.blake2b
+    digests = b''.join(blake2b(encode_key(key), digest_size=16).digest() for key in keys)
+    return np.frombuffer(digests, dtype='<u8').reshape(-1, 2)
+
+
+def slice_digests(digests, *, digest_size, count, bits):
+    """
+    Vectorised bite-off-pieces of big-endian digests, lowest bits first.
+
+    Matches, for every digest, the loop::
+
+        h = int.from_bytes(digest, 'big')
+        for _ in range(count):
+            yield h & (2 ** bits - 1)
+            h >>= bits
+
+    Args:
+        digests (bytes): Concatenated digests, each `digest_size` bytes long.
+        digest_size (int): Length of a single digest, in bytes.
+        count (int): Number of pieces to extract from each digest.
+        bits (int): Width of every piece, in bits.
+
+    Returns:
+        NumPy array of `uint64` with shape `(num_digests, count)`.
+    """
+    array = np.frombuffer(digests, dtype=np.uint8).reshape(-1, digest_size)
+    # Reverse bytes to little-endian, so that bit `j` of the number is column `j`
+    unpacked = np.unpackbits(array[:, ::-1], axis=1, bitorder='little')
+    pieces = unpacked[:, :count * bits].reshape(-1, count, bits).astype(np.uint64)
+    weights = np.left_shift(np.uint64(1), np.arange(bits, dtype=np.uint64))
+    return (pieces * weights).sum(axis=2, dtype=np.uint64)
+
+
+class ProbeStrategy:
+    """
+    Base class for ways to turn a key into a number of probe locations.
+
+    Subclasses must set `name`, which is saved into filter files, and provide
+    both a scalar and a vectorised method that agree exactly.
+    """
+    name = None
+
+    def probes(self, key, count, top):
+        """
+        Iterable of `count` probe locations in `range(top)` for `key`.
+        """
+        raise NotImplementedError()
+
+    def probes_many(self, keys, count, top):
+        """
+        NumPy `uint64` array with shape `(len(keys), count)`.
+        """
+        raise NotImplementedError()
+
+    def __eq__(self, other):
+        return isinstance(other, ProbeStrategy) and self.name == other.name
+
+    def __hash__(self):
+        return hash(self.name)
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}: {self.name}>"
+
+
+class DoubleHashing(ProbeStrategy):
+    """
+    Kirsch-Mitzenmacher double hashing, `g(i) = h1 + i*h2 (mod top)`.
+
+    Only needs a single 128-bit hash per key, however many probes are used.
+    The arithmetic wraps at 64-bits, so that NumPy can do it too. The step is
+    forced to be odd, so it is never zero, and for power-of-two ranges every
+    probe is distinct.
+
+    Timing:
+        count=11, top=1,000,000:    3.47 usec per loop
+    """
+    name = 'double-hashing'
+
+    def probes(self, key, count, top):
+        h, step = double_hash(key)
+        step |= 1
+        probes = []
+        for _ in range(count):
+            probes.append(h % top)
+            h = (h + step) & MASK64
+        return probes
+
+    def probes_many(self, keys, count, top):
+        hashes = double_hash_many(keys)
+        steps = np.arange(count, dtype=np.uint64)
+        probes = hashes[:, :1] + (hashes[:, 1:] | np.uint64(1)) * steps
+        return probes % np.uint64(top)
+
+
+class HashSlicing(ProbeStrategy):
+    """
+    Bite probes off a single large digest, as in Raymond Hettinger's recipe.
+
+    Every probe uses just enough bits to cover `top`, so the digest must be
+    long enough to provide `count` of them.
+
+    Timing:
+        sha256, count=11, top=1,000,000:    3.36 usec per loop
+    """
+    def __init__(self, hash_name='sha256'):
+        if hash_name not in hashlib.algorithms_guaranteed or hash_name.startswith('shake'):
+            raise ValueError(f"Unsupported hash function: {hash_name!r}")
+        self.hash_name = hash_name
+        self.hash_function = getattr(hashlib, hash_name)
+        self.digest_size = self.hash_function().digest_size
+        self.name = f"hash-slicing:{hash_name}"
+
+    def probes(self, key, count, top):
+        bits = self._bits(count, top)
+        h = int.from_bytes(self.hash_function(encode_key(key)).digest(), 'big')
+        mask = (1 << bits) - 1
+        probes = []
+        for _ in range(count):
+            probes.append((h & mask) % top)
+            h >>= bits
+        return probes
+
+    def probes_many(self, keys, count, top):
+        bits = self._bits(count, top)
+        hash_function = self.hash_function
+        digests = b''.join(hash_function(encode_key(key)).digest() for key in keys)
+        pieces = slice_digests(digests, digest_size=self.digest_size, count=count, bits=bits)
+        return pieces % np.uint64(top)
+
+    def _bits(self, count, top):
+        bits = max(1, (top - 1).bit_length())
+        if count * bits > self.digest_size * 8:
+            raise ValueError(
+                f"{self.hash_name} digest too short for {count} probes of {bits}-bits")
+        return bits
+
+
+class Xorshift(ProbeStrategy):
+    """
+    Seed a xorshift64* generator with a 64-bit hash, then take its outputs.
+
+    Timing:
+        count=11, top=1,000,000:    8.97 usec per loop
+    """
+    name = 'xorshift'
+    multiplier = 0x2545F4914F6CDD1D
+
+    def probes(self, key, count, top):
+        x = self._seed(hashlib.blake2b(encode_key(key), digest_size=8).digest())
+        multiplier = self.multiplier
+        probes = []
+        for _ in range(count):
+            x ^= x >> 12
+            x ^= (x << 25) & MASK64
+            x ^= x >> 27
+            probes.append(((x * multiplier) & MASK64) % top)
+        return probes
+
+    def probes_many(self, keys, count, top):
+        blake2b = hashlib.blake2b
+        digests = b''.join(blake2b(encode_key(key), digest_size=8).digest() for key in keys)
+        x = np.frombuffer(digests, dtype='<u8').copy()
+        x[x == 0] = self._seed(bytes(8))
+        multiplier = np.uint64(self.multiplier)
+        top = np.uint64(top)
+        probes = np.empty((len(x), count), dtype=np.uint64)
+        for i in range(count):
+            x ^= x >> np.uint64(12)
+            x ^= x << np.uint64(25)
+            x ^= x >> np.uint64(27)
+            probes[:, i] = (x * multiplier) % top
+        return probes
+
+    @staticmethod
+    def _seed(digest):
+        # Generator's state must never be zero
+        return int.from_bytes(digest, 'little') or 0x9E3779B97F4A7C15
+
+
+class Blocked(ProbeStrategy):
+    """
+    Keep all of a key's probes inside a single 64-byte cache line.
+
+    The first half of a 128-bit hash chooses the block, the second half is
+    used for double hashing inside it. The step is odd, so no probe repeats.
+
+    A block holds 512 one-bit bins, or fewer wider ones for counting filters,
+    so `bits_per_bin` must match that of the filter. The range given must be
+    a whole number of blocks.
+    """
+    name = 'blocked'
+    block_bytes = 64
+
+    def __init__(self, bits_per_bin=1):
+        bits_per_bin = int(bits_per_bin)
+        if bits_per_bin not in (1, 2, 4, 8):
+            raise ValueError(f"Bits per bin must be 1, 2, 4, or 8, given {bits_per_bin}")
+        self.bits_per_bin = bits_per_bin
+        self.block_bins = self.block_bytes * 8 // bits_per_bin
+        if bits_per_bin != 1:
+            self.name = f"blocked:{bits_per_bin}"
+
+    def probes(self, key, count, top):
+        num_blocks = self._num_blocks(top)
+        block_bins = self.block_bins
+        mask = block_bins - 1
+        h1, h2 = double_hash(key)
+        base = (h1 % num_blocks) * block_bins
+        offset = h2 & mask
+        step = (h2 >> mask.bit_length()) | 1
+        probes = []
+        for _ in range(count):
+            probes.append(base + offset)
+            offset = (offset + step) & mask
+        return probes
+
+    def probes_many(self, keys, count, top):
+        num_blocks = self._num_blocks(top)
+        block_bins = np.uint64(self.block_bins)
+        mask = np.uint64(self.block_bins - 1)
+        hashes = double_hash_many(keys)
+        base = (hashes[:, :1] % np.uint64(num_blocks)) * block_bins
+        offset = hashes[:, 1:] & mask
+        step = (hashes[:, 1:] >> np.uint64(int(mask).bit_length())) | np.uint64(1)
+        steps = np.arange(count, dtype=np.uint64)
+        return base + ((offset + step * steps) & mask)
+
+    def _num_blocks(self, top):
+        num_blocks, remainder = divmod(top, self.block_bins)
+        if remainder or not num_blocks:
+            raise ValueError(f"Number of bins must be a multiple of {self.block_bins}, given {top}")
+        return num_blocks
+
+
+class MersenneTwister(ProbeStrategy):
+    """
+    Seed the standard library's `Random` with the key, as in the original recipe.
+
+    Much slower, and cannot be vectorised. This was the only strategy before
+    probe strategies became pluggable, so filters built by older code must be
+    given it explicitly, as the default is now `DoubleHashing`. The two set
+    different bits for the same key.
+
+    Timing:
+        count=11, top=1,000,000:    15.6 usec per loop
+    """
+    name = 'mersenne-twister'
+
+    def probes(self, key, count, top):
+        random = Random(key).random
+        return (int(random() * top) for _ in range(count))
+
+    def probes_many(self, keys, count, top):
+        probes = [list(self.probes(key, count, top)) for key in keys]
+        return np.array(probes, dtype=np.uint64).reshape(-1, count)
+
+
+PROBE_STRATEGIES = {
+    DoubleHashing.name: DoubleHashing,
+    'hash-slicing': HashSlicing,
+    Blocked.name: Blocked,
+    Xorshift.name: Xorshift,
+    MersenneTwister.name: MersenneTwister,
+}
+
+
+def get_probe_strategy(name):
+    """
+    Create probe strategy from its name, eg. 'hash-slicing:sha224'
+
+    Raises:
+        ValueError: If name not recognised.
+    """
+    kind, _, argument = name.partition(':')
+    try:
+        cls = PROBE_STRATEGIES[kind]
+    except KeyError:
+        raise ValueError(f"Unknown probe strategy: {name!r}") from None
+    return cls(argument) if argument else cls()
+
+
+def encode_key(key):
+    """
+    Keys may be strings or bytes. Strings are encoded as UTF-8.
+    """
+    return key.encode('utf-8') if isinstance(key, str) else key
+
+
 class BloomFilter:
+    bits_per_bin = 1
+
     @staticmethod
     def calculate_parameters(num_elements, error_rate=None, megabytes=None):
-        def log(num, bits):
-            megabytes = num * bits / 1024 / 1024
-            logger.info(f"Using {bits}-bits per element, expected size {megabytes} MiB")
+        """
+        Size a filter for the given number of elements.
+
+        Give at most one of `error_rate` or `megabytes`. If neither is given a
+        default of 11-bits per element is used, for an error rate of about 0.5%.
+
+        Args:
+            num_elements (int): Expected number of elements.
+            error_rate (float): Target false-positive rate, eg. 0.001
+            megabytes (float): Memory budget for bit array, in MiB.
 
-        if error_rate is None and megabytes is None:
-            bits_per_element = 11
-            log(num_elements, bits_per_element)
+        Raises:
+            ValueError: If both `error_rate` and `megabytes` given, or invalid.
+
+        Returns:
+            Tuple of `(num_bytes, num_probes)`, ready for the constructor.
+        """
+        def log(num, bits):
+            megabytes = num * bits / 1024 / 1024 / 8
+            logger.debug(f"Using {bits:.1f}-bits per element, expected size {megabytes:.3f} MiB")
+
+        if num_elements < 1:
+            raise ValueError(f"Number of elements must be positive, given {num_elements}")
+        if error_rate is not None and megabytes is not None:
+            raise ValueError("Give error rate or memory budget, not both")
+
+        if error_rate is not None:
+            if not 0 < error_rate < 1:
+                raise ValueError(f"Error rate must be between 0 and 1, given {error_rate}")
+            num_bits = -num_elements * math.log(error_rate) / (math.log(2) ** 2)
+            num_bytes = math.ceil(num_bits / 8)
+        elif megabytes is not None:
+            num_bytes = int(megabytes * 1024 * 1024)
+            if num_bytes < 1:
+                raise ValueError(f"Memory budget too small, given {megabytes} MiB")
+        else:
+            num_bytes = math.ceil(num_elements * 11 / 8)
+
+        bits_per_element = num_bytes * 8 / num_elements
+        num_probes = max(1, round(bits_per_element * math.log(2)))
+        log(num_elements, bits_per_element)
+        return (num_bytes, num_probes)
 
-    def __init__(self, num_bytes, num_probes, iterable=()):
+    @staticmethod
+    def expected_error_rate(num_bins, num_probes, num_elements):
+        """
+        Theoretical false-positive rate, `(1 - e^(-kn/m))^k`.
+        """
+        return (1 - math.exp(-num_probes * num_elements / num_bins)) ** num_probes
+
+    @classmethod
+    def from_capacity(
+        cls, num_elements, error_rate=None, megabytes=None, iterable=(), strategy=None):
+        """
+        Create new filter sized using `calculate_parameters()`.
+        """
+        num_bytes, num_probes = cls.calculate_parameters(num_elements, error_rate, megabytes)
+        return cls(num_bytes, num_probes, iterable, strategy=strategy)
+
+    def __init__(self, num_bytes, num_probes, iterable=(), strategy=None):
+        """
+        Args:
+            num_bytes (int): Size of bit array.
+            num_probes (int): Number of probes per key.
+            iterable (iterable): Initial keys to add.
+            strategy (ProbeStrategy):
+                How to turn keys into probes. Defaults to `DoubleHashing`,
+                which can be vectorised. Use `MersenneTwister` to match bit
+                arrays built before the default changed.
+        """
         self.array = bytearray(num_bytes)
         self.num_probes = num_probes
-        self.num_bins = num_bytes * 8
+        self.strategy = DoubleHashing() if strategy is None else strategy
+        if isinstance(self.strategy, Blocked) and self.strategy.bits_per_bin != self.bits_per_bin:
+            raise ValueError(
+                f"{self.strategy!r} is for {self.strategy.bits_per_bin}-bit bins, "
+                f"{self.__class__.__name__} has {self.bits_per_bin}-bit bins")
+        self.num_bins = num_bytes * 8 // self.bits_per_bin
+        self.count = 0
+        self._mmap = None
+        self._writeback = False
         self.update(iterable)
 
+    @classmethod
+    def open(cls, path, mode='r'):
+        """
+        Open filter saved by `save()`, backing its bit array with `mmap`.
+
+        Nothing is read up-front, so queries can start immediately, and
+        processes opening the same file share a single copy in the page cache.
+
+        Args:
+            path (str): Path to saved filter.
+            mode (str):
+                One of 'r' for read-only, 'r+' to write changes back to the
+                file, or 'c' for private copy-on-write changes.
+
+        Raises:
+            ValueError: If file is not a compatible bloom filter.
+
+        Returns:
+            New filter instance. Call `close()` when finished with it.
+        """
+        try:
+            access = FILE_MODES[mode]
+        except KeyError:
+            raise ValueError(f"Invalid mode {mode!r}, expected one of {list(FILE_MODES)}")
+
+        with open(path, 'r+b' if mode == 'r+' else 'rb') as fp:
+            header = fp.read(FILE_HEADER_SIZE)
+            if len(header) < FILE_HEADER_SIZE:
+                raise ValueError(f"File too short for bloom filter header: {path}")
+            (magic, version, bits_per_bin, num_bins,
+             count, num_probes, scheme) = FILE_HEADER.unpack_from(header)
+            if magic != FILE_MAGIC:
+                raise ValueError(f"Not a bloom filter file: {path}")
+            if version not in (1, FILE_VERSION):
+                raise ValueError(f"Unsupported bloom filter file version: {version}")
+            if version == 1:
+                bits_per_bin = 1
+            if bits_per_bin != cls.bits_per_bin:
+                raise ValueError(
+                    f"File has {bits_per_bin}-bit bins, {cls.__name__} needs "
+                    f"{cls.bits_per_bin}-bit bins")
+            strategy = get_probe_strategy(scheme.rstrip(b'\0').decode('ascii'))
+            mapped = mmap.mmap(fp.fileno(), 0, access=access)
+
+        num_bytes = num_bins * bits_per_bin // 8
+        if len(mapped) != FILE_HEADER_SIZE + num_bytes:
+            mapped.close()
+            raise ValueError(f"Bloom filter file has wrong length: {path}")
+
+        array = memoryview(mapped)[FILE_HEADER_SIZE:]
+        bf = cls._create(array, num_bins, num_probes, strategy, count)
+        bf._mmap = mapped
+        bf._writeback = (mode == 'r+')
+        return bf
+
+    @classmethod
+    def build_parallel(
+        cls,
+        paths,
+        num_bytes,
+        num_probes,
+        *,
+        strategy=None,
+        max_workers=None,
+        chunk_size=CHUNK_SIZE,
+    ):
+        """
+        Build filter from the lines of text files, using a pool of processes.
+
+        Files are split into chunks of about `chunk_size` bytes, on line
+        boundaries. Each worker builds a partial filter for a chunk directly
+        into shared memory, and these are merged with `|=` as they complete.
+        Lines are stripped of whitespace, as in `SpellChecker`.
+
+        Args:
+            paths (iterable): Paths to UTF-8 text files, one key per line.
+            num_bytes (int): Size of bit array.
+            num_probes (int): Number of probes per key.
+            strategy (ProbeStrategy): Defaults to `DoubleHashing`.
+            max_workers (int): Size of process pool, defaults to CPU count.
+            chunk_size (int): Maximum number of bytes of input per task.
+
+        Workers build partial filters of class `cls`, so subclasses such as
+        `BlockedBloomFilter` get their own sizing and probes. The class must
+        support `|=`, which rules out `CountingBloomFilter`.
+
+        Returns:
+            New filter.
+        """
+        bf = cls(num_bytes, num_probes, strategy=strategy)
+        shape = (len(bf.array), bf.num_bins, bf.num_probes, bf.strategy.name)
+        chunks = [
+            (path, start, min(start + chunk_size, size))
+            for path in paths
+            for size in (os.path.getsize(path),)
+            for start in range(0, size, chunk_size)
+        ]
+
+        # Workers must share our tracker, otherwise each would start its own,
+        # which would destroy their shared memory when they exit.
+        resource_tracker.ensure_running()
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(_build_chunk, cls, *chunk, *shape) for chunk in chunks]
+            pending = iter(futures)
+            try:
+                for future in pending:
+                    name, count = future.result()
+                    shared = SharedMemory(name)
+                    try:
+                        partial = cls._create(
+                            shared.buf[:shape[0]], bf.num_bins, bf.num_probes, bf.strategy, count)
+                        bf |= partial
+                        partial.array.release()
+                    finally:
+                        shared.close()
+                        shared.unlink()
+            finally:
+                # Only reached with futures left after an error. Their shared
+                # memory would otherwise outlive us.
+                for future in pending:
+                    if future.cancel():
+                        continue
+                    try:
+                        name, _ = future.result()
+                    except Exception:
+                        continue
+                    shared = SharedMemory(name)
+                    shared.close()
+                    shared.unlink()
+        return bf
+
+    @classmethod
+    def _create(cls, array, num_bins, num_probes, strategy, count=0):
+        """
+        Create instance around existing buffer, bypassing `__init__()`.
+        """
+        bf = cls.__new__(cls)
+        bf.array = array
+        bf.num_probes = num_probes
+        bf.strategy = strategy
+        bf.num_bins = num_bins
+        bf.count = count
+        bf._mmap = None
+        bf._writeback = False
+        return bf
+
+    def copy(self):
+        """
+        Return independent, in-memory copy of filter.
+        """
+        return self._create(
+            bytearray(self.array), self.num_bins, self.num_probes, self.strategy, self.count)
+
+    def save(self, path):
+        """
+        Write filter to the given path, ready to be used by `open()`.
+        """
+        with open(path, 'wb') as fp:
+            fp.write(self._header())
+            fp.write(self.array)
+
+    def flush(self):
+        """
+        Write element count and any changes back to a file opened with mode 'r+'.
+        """
+        if self._mmap is not None and self._writeback:
+            self._mmap[:FILE_HEADER_SIZE] = self._header()
+            self._mmap.flush()
+
+    def close(self):
+        """
+        Flush and release the memory mapping, if any.
+        """
+        if self._mmap is not None:
+            self.flush()
+            self.array.release()
+            self._mmap.close()
+            self._mmap = None
+
+    def _header(self):
+        header = FILE_HEADER.pack(
+            FILE_MAGIC,
+            FILE_VERSION,
+            self.bits_per_bin,
+            self.num_bins,
+            self.count,
+            self.num_probes,
+            self.strategy.name.encode('ascii'),
+        )
+        return header.ljust(FILE_HEADER_SIZE, b'\0')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
     def get_probes(self, key):
-        random = Random(key).random
-        return (int(random() * self.num_bins) for _ in range(self.num_probes))
+        return self.strategy.probes(key, self.num_probes, self.num_bins)
+
+    def get_probes_many(self, keys):
+        """
+        Calculate probes for a whole batch of keys at once.
+
+        Subclasses that override `get_probes()` must override this too.
+
+        Args:
+            keys (sequence): Batch of keys.
+
+        Returns:
+            NumPy array of `uint64` with shape `(len(keys), num_probes)`.
+        """
+        return self.strategy.probes_many(keys, self.num_probes, self.num_bins)
+
+    def update(self, keys):
+        for key in keys:
+            for i in self.get_probes(key):
+                self.array[i >> 3] |= 1 << (i & 7)
+            self.count += 1
+
+    def add_many(self, keys):
+        """
+        Add all of the given keys, using vectorised NumPy operations.
+
+        Equivalent to `update()`, but much faster for large batches.
+
+        Args:
+            keys (iterable): Keys to add, of any length.
+        """
+        bins = np.frombuffer(self.array, dtype=np.uint8)
+        for batch in batched(keys, BATCH_SIZE):
+            probes = self.get_probes_many(batch).ravel()
+            masks = np.left_shift(np.uint8(1), (probes & 7).astype(np.uint8))
+            np.bitwise_or.at(bins, probes >> 3, masks)
+            self.count += len(batch)
+
+    def contains_many(self, keys):
+        """
+        Test membership for a whole batch of keys at once.
+
+        Args:
+            keys (iterable): Keys to test.
+
+        Returns:
+            NumPy boolean array, one value per key, in input order.
+        """
+        bins = np.frombuffer(self.array, dtype=np.uint8)
+        results = []
+        for batch in batched(keys, BATCH_SIZE):
+            probes = self.get_probes_many(batch)
+            found = (bins[probes >> 3] >> (probes & 7).astype(np.uint8)) & 1
+            results.append(found.all(axis=1))
+        if not results:
+            return np.zeros(0, dtype=bool)
+        return np.concatenate(results)
+
+    def _check_compatible(self, other):
+        if not isinstance(other, BloomFilter):
+            raise TypeError(f"Expected a bloom filter, given {type(other).__name__}")
+        ours = (self.num_bins, self.bits_per_bin, self.num_probes, self.strategy)
+        theirs = (other.num_bins, other.bits_per_bin, other.num_probes, other.strategy)
+        if ours != theirs:
+            raise ValueError(
+                "Bloom filters must have the same number of bins, probes, and strategy")
+
+    def __and__(self, other):
+        """
+        Intersection. Matches keys in both filters, plus a few more false positives.
+        """
+        result = self.copy()
+        result &= other
+        return result
+
+    def __iand__(self, other):
+        # Count can only be estimated, so use the upper bound
+        self._check_compatible(other)
+        bins = np.frombuffer(self.array, dtype=np.uint8)
+        np.bitwise_and(bins, np.frombuffer(other.array, dtype=np.uint8), out=bins)
+        self.count = min(self.count, other.count)
+        return self
+
+    def __or__(self, other):
+        """
+        Union. Exactly as if all keys were added to a single filter.
+        """
+        result = self.copy()
+        result |= other
+        return result
+
+    def __ior__(self, other):
+        # Keys in both filters are counted twice
+        self._check_compatible(other)
+        bins = np.frombuffer(self.array, dtype=np.uint8)
+        np.bitwise_or(bins, np.frombuffer(other.array, dtype=np.uint8), out=bins)
+        self.count += other.count
+        return self
+
+    def __contains__(self, key):
+        return all(self.array[i >> 3] & (1 << (i & 7)) for i in self.get_probes(key))
+
+
+def _build_chunk(cls, path, start, end, num_bytes, num_bins, num_probes, strategy_name):
+    """
+    Worker for `BloomFilter.build_parallel()`.
+
+    Adds lines whose first byte lies within `[start, end)` to a new filter of
+    class `cls` in shared memory, to avoid pickling a large bytearray back to
+    the parent.
+
+    Returns:
+        Tuple of the shared memory block's name and the number of keys added.
+        The caller is responsible for unlinking the shared memory.
+    """
+    shared = SharedMemory(create=True, size=max(1, num_bytes))
+    bf = cls._create(
+        shared.buf[:num_bytes], num_bins, num_probes, get_probe_strategy(strategy_name))
+    try:
+        with open(path, 'rb') as fp:
+            if start:
+                # Skip line owned by previous chunk
+                fp.seek(start - 1)
+                fp.readline()
+
+            def lines():
+                position = fp.tell()
+                while position < end:
+                    line = fp.readline()
+                    if not line:
+                        break
+                    position += len(line)
+                    yield line.decode('utf-8').strip()
+
+            bf.add_many(lines())
+    except BaseException as error:
+        shared.unlink()
+        # Frames in the traceback hold NumPy views of the buffer, which
+        # would stop it being released below, hiding the real error.
+        traceback.clear_frames(error.__traceback__)
+        raise
+    finally:
+        bf.array.release()
+        shared.close()
+    return (shared.name, bf.count)
+
+
+class BlockedBloomFilter(BloomFilter):
+    """
+    Bloom filter where every lookup touches just one 64-byte cache line.
+
+    For large filters, each probe of a plain `BloomFilter` is likely to be a
+    cache (and TLB) miss. Here each key is mapped to a single block, so lookups
+    cost one miss, at the price of a slightly higher false-positive rate as
+    blocks are not evenly loaded.
+
+    Size is rounded up to a whole number of blocks. Blocks are only aligned to
+    real cache lines when the filter is loaded with `open()`, as the file's
+    header is 64 bytes long and `mmap` is page-aligned.
+    """
+    def __init__(self, num_bytes, num_probes, iterable=(), strategy=None):
+        num_bytes = max(64, math.ceil(num_bytes / 64) * 64)
+        strategy = Blocked(self.bits_per_bin) if strategy is None else strategy
+        super().__init__(num_bytes, num_probes, iterable, strategy=strategy)
+
+
+class CountingBloomFilter(BloomFilter):
+    """
+    Bloom filter that supports removing keys.
+
+    Every bin is a 4-bit counter rather than a single bit, packed two to a
+    byte (the even bin in the low nibble). Counters saturate at 15 and are then
+    never decremented, as their true value is no longer known. With a sensible
+    load the chance of any counter reaching 15 is vanishingly small.
+
+    Removing a key that was never added can cause false negatives, so `remove()`
+    refuses to remove keys not (probably) present.
+    """
+    bits_per_bin = 4
+
+    # Merging counters is not a bitwise operation
+    __and__ = __iand__ = __or__ = __ior__ = None
 
     def update(self, keys):
+        array = self.array
         for key in keys:
             for i in self.get_probes(key):
-                self.array[i//8] |= 2 ** (i%8)
+                index, shift = i >> 1, (i & 1) << 2
+                if (array[index] >> shift) & 0xF != 0xF:
+                    array[index] += 1 << shift
+            self.count += 1
+
+    def add_many(self, keys):
+        for batch in batched(keys, BATCH_SIZE):
+            self._adjust(self.get_probes_many(batch), +1)
+            self.count += len(batch)
+
+    def remove(self, key):
+        """
+        Remove single key from filter.
+
+        Raises:
+            KeyError: If key is not present.
+        """
+        if key not in self:
+            raise KeyError(key)
+        array = self.array
+        for i in self.get_probes(key):
+            index, shift = i >> 1, (i & 1) << 2
+            counter = (array[index] >> shift) & 0xF
+            if 0 < counter < 0xF:
+                array[index] -= 1 << shift
+        self.count -= 1
+
+    def remove_many(self, keys):
+        """
+        Remove all of the given keys, using vectorised NumPy operations.
+
+        Keys are checked a batch at a time, so if a `KeyError` is raised then
+        keys from earlier batches will have already been removed.
+
+        Raises:
+            KeyError: If any key is not present.
+        """
+        bins = np.frombuffer(self.array, dtype=np.uint8)
+        for batch in batched(keys, BATCH_SIZE):
+            probes = self.get_probes_many(batch)
+            found = (self._counters(bins, probes) != 0).all(axis=1)
+            if not found.all():
+                raise KeyError(batch[int(np.argmin(found))])
+            self._adjust(probes, -1)
+            self.count -= len(batch)
+
+    def contains_many(self, keys):
+        bins = np.frombuffer(self.array, dtype=np.uint8)
+        results = []
+        for batch in batched(keys, BATCH_SIZE):
+            probes = self.get_probes_many(batch)
+            results.append((self._counters(bins, probes) != 0).all(axis=1))
+        if not results:
+            return np.zeros(0, dtype=bool)
+        return np.concatenate(results)
+
+    @staticmethod
+    def _counters(bins, probes):
+        """
+        Fetch counter values for array of probes.
+        """
+        shifts = ((probes & 1) << 2).astype(np.uint8)
+        return (bins[probes >> 1] >> shifts) & 0xF
+
+    def _adjust(self, probes, direction):
+        """
+        Increment or decrement counters, allowing for repeated probes.
+        """
+        bins = np.frombuffer(self.array, dtype=np.uint8)
+        probes, repeats = np.unique(probes, return_counts=True)
+        current = self._counters(bins, probes).astype(np.int64)
+        if direction > 0:
+            values = np.minimum(current + repeats, 0xF)
+        else:
+            values = np.where(current == 0xF, 0xF, np.maximum(current - repeats, 0))
+        values = values.astype(np.uint8)
+
+        # Even and odd bins separately, so each byte is written at most once per pass
+        for parity in (0, 1):
+            selected = (probes & 1) == parity
+            index = probes[selected] >> 1
+            shift = 4 * parity
+            keep = bins[index] & np.uint8(0xF0 >> shift)
+            bins[index] = keep | (values[selected] << np.uint8(shift))
 
     def __contains__(self, key):
-        return all(self.array[i//8] & (2 ** (i%8)) for i in self.get_probes(key))
+        array = self.array
+        return all((array[i >> 1] >> ((i & 1) << 2)) & 0xF for i in self.get_probes(key))
+
+
+class ScalableBloomFilter:
+    """
+    Chain of bloom filters that grows to stay under its error rate.
+
+    See Almeida et al, "Scalable Bloom Filters" (2007). Every time the newest
+    filter reaches capacity another is added, `growth` times larger, and with
+    an error rate `tightening` times smaller. The compound error rate then
+    converges to, but never exceeds, the requested `error_rate`.
+
+    Keys already present are not inserted again, so that duplicates do not
+    use up capacity.
+    """
+    def __init__(
+        self,
+        initial_capacity=1000,
+        error_rate=0.001,
+        *,
+        growth=2,
+        tightening=0.9,
+        strategy=None,
+        iterable=(),
+    ):
+        if not 0 < tightening < 1:
+            raise ValueError(f"Tightening ratio must be between 0 and 1, given {tightening}")
+        self.initial_capacity = initial_capacity
+        self.error_rate = error_rate
+        self.growth = growth
+        self.tightening = tightening
+        self.strategy = strategy
+        self.filters = []
+        self.capacities = []
+        self._add_filter()
+        self.update(iterable)
+
+    def update(self, keys):
+        for key in keys:
+            if key in self:
+                continue
+            if self.filters[-1].count >= self.capacities[-1]:
+                self._add_filter()
+            self.filters[-1].update((key,))
+
+    def add_many(self, keys):
+        """
+        Vectorised version of `update()`.
+
+        Duplicates within a single batch are not detected, so they may use up
+        a little extra capacity.
+        """
+        for batch in batched(keys, BATCH_SIZE):
+            found = self.contains_many(batch)
+            batch = [key for key, seen in zip(batch, found) if not seen]
+            while batch:
+                room = self.capacities[-1] - self.filters[-1].count
+                if room <= 0:
+                    self._add_filter()
+                    continue
+                self.filters[-1].add_many(batch[:room])
+                batch = batch[room:]
+
+    def contains_many(self, keys):
+        """
+        Test membership for a whole batch of keys at once.
+        """
+        results = []
+        for batch in batched(keys, BATCH_SIZE):
+            found = np.zeros(len(batch), dtype=bool)
+            for bf in self.filters:
+                found |= bf.contains_many(batch)
+            results.append(found)
+        if not results:
+            return np.zeros(0, dtype=bool)
+        return np.concatenate(results)
+
+    def num_bytes(self):
+        """
+        Total size of all filters' bit arrays, in bytes.
+        """
+        return sum(bf.num_bins // 8 for bf in self.filters)
+
+    def _add_filter(self):
+        index = len(self.filters)
+        capacity = self.initial_capacity * self.growth ** index
+        error_rate = self.error_rate * (1 - self.tightening) * self.tightening ** index
+        self.filters.append(
+            BloomFilter.from_capacity(capacity, error_rate, strategy=self.strategy))
+        self.capacities.append(capacity)
+
+    def __contains__(self, key):
+        # Newest filters are largest, so most likely to hold key
+        return any(key in bf for bf in reversed(self.filters))
+
+    def __len__(self):
+        return sum(bf.count for bf in self.filters)
+
+
+def batched(iterable, size):
+    """
+    Yield lists of up to `size` items from `iterable`.
+    """
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
 
 
 def get_probes_using_hash(key, *, count, top):
@@ -162,8 +1149,17 @@ def get_probes_using_random_stdlib(key, *, count, top):
     return (randrange(0, top+1) for _ in range(count))
 
 
-def get_probes_using_random_xorshift(key, *, num, bits):
-    raise NotImplementedError()
+def get_probes_using_random_xorshift(key, *, count, top):
+    """
+    Timing:
+        $ python3 -m timeit \
+          -s "from bloom_filter import get_probes_using_random_xorshift as get_probes" \
+          "list(get_probes('Heywood U. Cuddleme', count=11, top=1000))"
+
+        top=1,000:          11.8 usec per loop
+        top=1,000,000,000:  11.8 usec per loop
+    """
+    return Xorshift().probes(key, count, top)
 
 
 def test_probes_fram_hash():
@@ -181,13 +1177,35 @@ def test_probes_fram_hash():
     print(1_000_000 / (perf_counter() - start))
 
 
-def bloom_filter_parameters():
+def bloom_filter_parameters(num_elements, bits_per_element):
+    """
+    Theoretical parameters for a filter using the optimal number of probes.
+
+    Args:
+        num_elements (int): Number of elements in filter.
+        bits_per_element (float): Size of filter.
+
+    Returns:
+        Dictionary with keys `bits_total`, `bits_per_probe`, `num_probes`,
+        and `error_rate`.
+    """
     def calculate_p(bits_per_element):
         return math.exp( - bits_per_element * math.pow(math.log(2), 2))
 
     def k_from_p(p):
         return math.ceil(-(math.log(p, 2)))
 
+    bits_total = math.ceil(num_elements * bits_per_element)
+    p = calculate_p(bits_per_element)
+    return {
+        'bits_total': bits_total,
+        'bits_per_probe': bits_total.bit_length(),
+        'num_probes': k_from_p(p),
+        'error_rate': p,
+    }
+
+
+def print_bloom_filter_parameters():
     for num_elements in [1000, 100_000, 10_000_000, 1_000_000_000]:
         bits_per_element = 20
         heading = f"{num_elements:,} elements, {bits_per_element}-bits per element"
@@ -195,12 +1213,11 @@ def bloom_filter_parameters():
         print(heading)
         print("="*len(heading))
 
-        bits_total = (num_elements * bits_per_element)
-        bits_per_probe = bits_total.bit_length()
-        gigabytes = bits_total / 8 / 1e9
-        p = calculate_p(bits_per_element)
-        r = math.floor(1/p)
-        k = k_from_p(p)
+        parameters = bloom_filter_parameters(num_elements, bits_per_element)
+        bits_per_probe = parameters['bits_per_probe']
+        gigabytes = parameters['bits_total'] / 8 / 1e9
+        r = math.floor(1/parameters['error_rate'])
+        k = parameters['num_probes']
         memory = f"{gigabytes:.1f} GB RAM: {bits_per_element:>2} bits per element"
         suffix = "-" * (80-len(memory))
         print(memory, suffix)
@@ -215,13 +1232,55 @@ def bloom_filter_parameters():
 
 ##  Sample application  ##############################################
 
+Misspelling = namedtuple('Misspelling', 'line column word')
+
+
 class SpellChecker(BloomFilter):
+    """
+    Building from wordlists is slow, so `save()` the result once and then
+    use `SpellChecker.open()` to start checking immediately.
+    """
+    # Runs of letters, allowing for apostrophes inside words, eg. "don't"
+    word_pattern = re.compile(r"[^\W\d_]+(?:'[^\W\d_]+)*")
 
     def __init__(self, wordlistfiles, estimated_word_count=125000):
         num_probes = 14           # set higher for fewer false positives
         num_bytes = estimated_word_count * num_probes * 3 // 2 // 8
         wordlist = (w.strip() for f in wordlistfiles for w in open(f))
-        BloomFilter.__init__(self, num_bytes, num_probes, wordlist)
+        BloomFilter.__init__(self, num_bytes, num_probes)
+        self.add_many(wordlist)
+
+    def check_file(self, path, cache_size=65_536):
+        """
+        Stream misspellings from the given UTF-8 text file.
+
+        See `check_lines()`.
+        """
+        with open(path, 'rt', encoding='utf-8', errors='replace') as fp:
+            yield from self.check_lines(fp, cache_size)
+
+    def check_lines(self, lines, cache_size=65_536):
+        """
+        Generator yielding misspellings from an iterable of lines.
+
+        Only one line is held at a time, so memory use is constant however
+        large the input. Verdicts for recently seen words are kept in a
+        bounded LRU cache, so common words skip hashing entirely.
+
+        Args:
+            lines (iterable): Lines of text, eg. an open file.
+            cache_size (int): Maximum number of words to cache.
+
+        Returns:
+            Iterator of `Misspelling` tuples, with 1-based line and column
+            numbers, and the word as it appeared in the text.
+        """
+        is_word = lru_cache(maxsize=cache_size)(self.__contains__)
+        for line_number, line in enumerate(lines, 1):
+            for match in self.word_pattern.finditer(line):
+                word = match.group()
+                if not is_word(word.lower()):
+                    yield Misspelling(line_number, match.start() + 1, word)
 
     def find_misspellings(self, text):
         return [word for word in text.lower().split() if word not in self]
@@ -229,31 +1288,19 @@ class SpellChecker(BloomFilter):
 
 ## Example of subclassing with faster probe functions ################
 
-from hashlib import sha224, sha256
-
 class BloomFilter_4k(BloomFilter):
     # 4Kb (2**15 bins) 13 probes. Holds 1,700 entries with 1 error per 10,000.
+    # Probes are 15-bit slices of a SHA-224 hash.
 
     def __init__(self, iterable=()):
-        BloomFilter.__init__(self, 4 * 1024, 13, iterable)
-
-    def get_probes(self, key):
-        h = int(sha224(key.encode()).hexdigest(), 16)
-        for _ in range(13):
-            yield h & 32767     # 2 ** 15 - 1
-            h >>= 15
+        BloomFilter.__init__(self, 4 * 1024, 13, iterable, strategy=HashSlicing('sha224'))
 
 class BloomFilter_32k(BloomFilter):
     # 32kb (2**18 bins), 13 probes. Holds 13,600 entries with 1 error per 10,000.
+    # Probes are 18-bit slices of a SHA-256 hash.
 
     def __init__(self, iterable=()):
-        BloomFilter.__init__(self, 32 * 1024, 13, iterable)
-
-    def get_probes(self, key):
-        h = int(sha256(key.encode()).hexdigest(), 16)
-        for _ in range(13):
-            yield h & 262143    # 2 ** 18 - 1
-            h >>= 18
+        BloomFilter.__init__(self, 32 * 1024, 13, iterable, strategy=HashSlicing('sha256'))
 
 
 if __name__ == '__main__':
@@ -0,0 +1,281 @@
+"""
+Cuckoo Filter
+
+Fan, Andersen, Kaminsky & Mitzenmacher, "Cuckoo Filter: Practically Better
+Than Bloom" (2014).
+
+Stores a short fingerprint of every key in one of two candidate buckets. The
+second bucket can be calculated from the first and the fingerprint alone, so
+entries can be moved ('kicked') between buckets to make room without knowing
+the original key. Unlike a `BloomFilter`, keys can be removed, and at low
+false-positive rates it uses less space.
+
+The paper finds the alternate bucket with `index ^ hash(fingerprint)`, which
+needs a power-of-two number of buckets, and so wastes up to half the table.
+Here it is `(hash(fingerprint) - index) mod num_buckets` instead, which is
+also its own inverse, but works for any number of buckets.
+"""
+
+import hashlib
+import math
+from random import Random
+
+import numpy as np
+
+from bloom_filter import batched, BATCH_SIZE, encode_key
+
+
+MASK32 = (1 << 32) - 1
+MURMUR = 0x5BD1E995
+
+
+class CuckooFilter:
+    """
+    Probabilistic set with deletion, built on a flat array of fingerprints.
+
+    The bucket table is a single `bytearray`, with `bucket_size` slots per
+    bucket and zero marking an empty slot. Fingerprints are bit-packed, so
+    a 12-bit fingerprint takes 12 bits, and the table is padded by two
+    bytes so that any slot can be read as three whole bytes. The batch
+    methods view the same memory through NumPy.
+
+    The expected false-positive rate is about `2 * bucket_size / 2 **
+    fingerprint_bits`. For the defaults that is 0.012%.
+    """
+    def __init__(
+        self,
+        capacity,
+        fingerprint_bits=16,
+        bucket_size=4,
+        max_kicks=500,
+        iterable=(),
+        seed=None,
+    ):
+        """
+        Args:
+            capacity (int): Number of keys to make room for.
+            fingerprint_bits (int): Between 4 and 16 bits.
+            bucket_size (int): Slots per bucket.
+            max_kicks (int): Moves to try before giving up on an insert.
+            iterable (iterable): Initial keys to add.
+            seed: Seed for random choices made while kicking.
+        """
+        if not 4 <= fingerprint_bits <= 16:
+            raise ValueError(f"Fingerprints must be 4 to 16 bits, given {fingerprint_bits}")
+
+        # Leave some slack, as inserts start failing as the table fills
+        num_buckets = max(1, math.ceil(capacity / (bucket_size * 0.95)))
+
+        self.num_buckets = num_buckets
+        self.bucket_size = bucket_size
+        self.fingerprint_bits = fingerprint_bits
+        self.max_kicks = max_kicks
+        self.count = 0
+        self.num_slots = num_buckets * bucket_size
+        self.table = bytearray(math.ceil(self.num_slots * fingerprint_bits / 8) + 2)
+        self._fingerprint_mask = (1 << fingerprint_bits) - 1
+        # Buckets are read whole, as an integer, which may start mid-byte
+        self._bucket_bits = bucket_size * fingerprint_bits
+        self._bucket_bytes = (self._bucket_bits + 14) // 8
+        self._shifts = range(0, self._bucket_bits, fingerprint_bits)
+        self._random = Random(seed)
+        self.update(iterable)
+
+    def add(self, key):
+        """
+        Add a single key.
+
+        Raises:
+            RuntimeError: If the filter is too full to make room.
+        """
+        index, fingerprint = self._hash(key)
+        self._insert(index, fingerprint)
+
+    def update(self, keys):
+        for key in keys:
+            self.add(key)
+
+    def add_many(self, keys):
+        """
+        Add all of the given keys, with hashing vectorised.
+
+        Inserts themselves are sequential, as each may need to move others.
+        """
+        insert = self._insert
+        for batch in batched(keys, BATCH_SIZE):
+            indexes, fingerprints = self._hash_many(batch)
+            for index, fingerprint in zip(indexes.tolist(), fingerprints.tolist()):
+                insert(index, fingerprint)
+
+    def remove(self, key):
+        """
+        Remove single key.
+
+        Only remove keys that were added: removing a key that was never added,
+        but which shares a fingerprint with one that was, removes that instead.
+
+        Raises:
+            KeyError: If key is not present.
+        """
+        index, fingerprint = self._hash(key)
+        if not self._delete(index, fingerprint):
+            raise KeyError(key)
+
+    def remove_many(self, keys):
+        """
+        Remove all of the given keys.
+
+        Raises:
+            KeyError: If any key is not present. Earlier keys will have been
+            removed already.
+        """
+        delete = self._delete
+        for batch in batched(keys, BATCH_SIZE):
+            indexes, fingerprints = self._hash_many(batch)
+            for key, index, fingerprint in zip(batch, indexes.tolist(), fingerprints.tolist()):
+                if not delete(index, fingerprint):
+                    raise KeyError(key)
+
+    def contains_many(self, keys):
+        """
+        Test membership for a whole batch of keys at once.
+
+        Returns:
+            NumPy boolean array, one value per key, in input order.
+        """
+        results = []
+        for batch in batched(keys, BATCH_SIZE):
+            indexes, fingerprints = self._hash_many(batch)
+            alternates = self._alternate_many(indexes, fingerprints)
+            fingerprints = fingerprints[:, None]
+            found = ((self._buckets_many(indexes) == fingerprints).any(axis=1)
+                     | (self._buckets_many(alternates) == fingerprints).any(axis=1))
+            results.append(found)
+        if not results:
+            return np.zeros(0, dtype=bool)
+        return np.concatenate(results)
+
+    def load_factor(self):
+        """
+        Fraction of slots in use.
+        """
+        return self.count / self.num_slots
+
+    def num_bytes(self):
+        """
+        Size of bucket table, in bytes.
+        """
+        return len(self.table)
+
+    def _alternate(self, index, fingerprint):
+        return (((fingerprint * MURMUR) & MASK32) - index) % self.num_buckets
+
+    def _alternate_many(self, indexes, fingerprints):
+        # Add the modulus first, as unsigned subtraction must not wrap
+        num_buckets = np.uint64(self.num_buckets)
+        hashed = (fingerprints.astype(np.uint64) * np.uint64(MURMUR)) & np.uint64(MASK32)
+        return (hashed + num_buckets - indexes) % num_buckets
+
+    def _buckets_many(self, indexes):
+        """
+        Unpack whole buckets, as NumPy array with shape `(len(indexes), bucket_size)`.
+        """
+        # Gather three bytes per slot, enough for 16-bits at any bit offset
+        bins = np.frombuffer(self.table, dtype=np.uint8)
+        slots = indexes[:, None] * np.uint64(self.bucket_size) + np.arange(
+            self.bucket_size, dtype=np.uint64)
+        bits = slots * np.uint64(self.fingerprint_bits)
+        start = (bits >> np.uint64(3)).astype(np.intp)
+        words = (bins[start].astype(np.uint32)
+                 | (bins[start + 1].astype(np.uint32) << np.uint32(8))
+                 | (bins[start + 2].astype(np.uint32) << np.uint32(16)))
+        shifts = (bits & np.uint64(7)).astype(np.uint32)
+        return (words >> shifts) & np.uint32(self._fingerprint_mask)
+
+    def _bucket(self, bucket):
+        """
+        List of the fingerprints in a bucket, zero for empty slots.
+        """
+        first = bucket * self._bucket_bits
+        start = first >> 3
+        word = int.from_bytes(self.table[start:start + self._bucket_bytes], 'little')
+        word >>= first & 7
+        mask = self._fingerprint_mask
+        return [(word >> shift) & mask for shift in self._shifts]
+
+    def _delete(self, index, fingerprint):
+        size = self.bucket_size
+        for bucket in (index, self._alternate(index, fingerprint)):
+            fingerprints = self._bucket(bucket)
+            if fingerprint in fingerprints:
+                self._set(bucket * size + fingerprints.index(fingerprint), 0)
+                self.count -= 1
+                return True
+        return False
+
+    def _set(self, slot, fingerprint):
+        bit = slot * self.fingerprint_bits
+        start, shift = bit >> 3, bit & 7
+        table = self.table
+        word = int.from_bytes(table[start:start + 3], 'little')
+        word = (word & ~(self._fingerprint_mask << shift)) | (fingerprint << shift)
+        table[start:start + 3] = word.to_bytes(3, 'little')
+
+    def _hash(self, key):
+        """
+        Bucket index from the low bits of a 64-bit hash, fingerprint from the high.
+        """
+        digest = hashlib.blake2b(encode_key(key), digest_size=8).digest()
+        h = int.from_bytes(digest, 'little')
+        fingerprint = ((h >> 32) & self._fingerprint_mask) or 1
+        return ((h & MASK32) % self.num_buckets, fingerprint)
+
+    def _hash_many(self, keys):
+        blake2b = hashlib.blake2b
+        digests = b''.join(blake2b(encode_key(key), digest_size=8).digest() for key in keys)
+        h = np.frombuffer(digests, dtype='<u8')
+        fingerprints = (h >> np.uint64(32)) & np.uint64(self._fingerprint_mask)
+        fingerprints[fingerprints == 0] = 1
+        return ((h & np.uint64(MASK32)) % np.uint64(self.num_buckets), fingerprints)
+
+    def _insert(self, index, fingerprint):
+        put = self._set
+        size = self.bucket_size
+        alternate = self._alternate(index, fingerprint)
+        for bucket in (index, alternate):
+            fingerprints = self._bucket(bucket)
+            if 0 in fingerprints:
+                put(bucket * size + fingerprints.index(0), fingerprint)
+                self.count += 1
+                return
+
+        # Both full, start kicking out existing entries
+        randrange = self._random.randrange
+        bucket = index if randrange(2) else alternate
+        moves = []
+        for _ in range(self.max_kicks):
+            position = randrange(size)
+            slot = bucket * size + position
+            previous = self._bucket(bucket)[position]
+            moves.append((slot, previous))
+            put(slot, fingerprint)
+            fingerprint = previous
+            bucket = self._alternate(bucket, fingerprint)
+            fingerprints = self._bucket(bucket)
+            if 0 in fingerprints:
+                put(bucket * size + fingerprints.index(0), fingerprint)
+                self.count += 1
+                return
+
+        # Undo, so that no existing key is lost
+        for slot, previous in reversed(moves):
+            put(slot, previous)
+        raise RuntimeError(f"Cuckoo filter is full, holding {self.count:,} keys")
+
+    def __contains__(self, key):
+        index, fingerprint = self._hash(key)
+        return (fingerprint in self._bucket(index)
+                or fingerprint in self._bucket(self._alternate(index, fingerprint)))
+
+    def __len__(self):
+        return self.count
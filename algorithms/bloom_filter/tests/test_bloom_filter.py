@@ -0,0 +1,489 @@
+import os
+import tempfile
+from random import Random
+from string import ascii_lowercase
+from unittest import skipUnless, TestCase
+
+import bloom_filter
+from bloom_filter import (
+    Blocked, BlockedBloomFilter, BloomFilter, BloomFilter_4k, BloomFilter_32k,
+    CountingBloomFilter, DoubleHashing, get_probe_strategy, HashSlicing, MersenneTwister,
+    ScalableBloomFilter, Xorshift)
+
+
+def random_words(count, seed=42):
+    random = Random(seed)
+    return [''.join(random.choices(ascii_lowercase, k=10)) for _ in range(count)]
+
+
+class TestBatch(TestCase):
+    words = random_words(1_000)
+    others = random_words(1_000, seed=99)
+
+    def test_probes_many_match_scalar(self):
+        for bf in (BloomFilter(1000, 7), BloomFilter_4k(), BloomFilter_32k()):
+            probes = bf.get_probes_many(self.words[:50])
+            expected = [list(bf.get_probes(word)) for word in self.words[:50]]
+            self.assertEqual(probes.tolist(), expected)
+
+    def test_add_many_matches_update(self):
+        for cls in (BloomFilter_4k, BloomFilter_32k):
+            scalar = cls(self.words)
+            batch = cls()
+            batch.add_many(self.words)
+            self.assertEqual(scalar.array, batch.array)
+
+    def test_add_many_small_batches(self):
+        scalar = BloomFilter(1500, 7, self.words)
+        batch = BloomFilter(1500, 7)
+        original, bloom_filter.BATCH_SIZE = bloom_filter.BATCH_SIZE, 7
+        try:
+            batch.add_many(iter(self.words))
+        finally:
+            bloom_filter.BATCH_SIZE = original
+        self.assertEqual(scalar.array, batch.array)
+
+    def test_contains_many(self):
+        bf = BloomFilter(1500, 7)
+        bf.add_many(self.words)
+        found = bf.contains_many(self.words + self.others)
+        self.assertEqual(found.dtype, bool)
+        self.assertEqual(len(found), 2000)
+        self.assertTrue(found[:1000].all())
+        expected = [word in bf for word in self.others]
+        self.assertEqual(found[1000:].tolist(), expected)
+
+    def test_contains_many_empty(self):
+        bf = BloomFilter(10, 3)
+        self.assertEqual(len(bf.contains_many([])), 0)
+
+    def test_bytes_keys(self):
+        bf = BloomFilter(100, 5)
+        bf.add_many([b'alpha', 'beta'])
+        self.assertIn(b'alpha', bf)
+        self.assertIn('beta', bf)
+        self.assertEqual(bf.contains_many(['alpha', b'beta']).tolist(), [True, True])
+
+
+class TestStrategies(TestCase):
+    words = random_words(200)
+    strategies = (
+        DoubleHashing(),
+        HashSlicing(),
+        HashSlicing('sha224'),
+        HashSlicing('blake2b'),
+        Xorshift(),
+        MersenneTwister(),
+    )
+
+    def test_probes_many_match_scalar(self):
+        for strategy in self.strategies:
+            for top in (7, 1000, 123_456_789):
+                probes = strategy.probes_many(self.words, 5, top)
+                expected = [list(strategy.probes(word, 5, top)) for word in self.words]
+                self.assertEqual(probes.tolist(), expected, strategy)
+                self.assertLess(probes.max(), top)
+
+    def test_filters(self):
+        for strategy in self.strategies:
+            bf = BloomFilter(500, 7, strategy=strategy)
+            bf.add_many(self.words)
+            self.assertTrue(all(word in bf for word in self.words))
+            found = bf.contains_many(random_words(1000, seed=3))
+            self.assertLess(found.mean(), 0.05, strategy)
+
+    def test_names(self):
+        for strategy in self.strategies + (Blocked(), Blocked(4)):
+            self.assertEqual(get_probe_strategy(strategy.name), strategy)
+        self.assertEqual(HashSlicing('sha224').name, 'hash-slicing:sha224')
+        with self.assertRaises(ValueError):
+            get_probe_strategy('random')
+
+    def test_hash_slicing_too_many_bits(self):
+        with self.assertRaisesRegex(ValueError, 'digest too short'):
+            HashSlicing('sha1').probes('apple', 11, 1_000_000)
+
+    def test_hash_slicing_unsupported(self):
+        with self.assertRaises(ValueError):
+            HashSlicing('md4')
+
+    def test_double_hashing_step_is_odd(self):
+        # Odd steps visit distinct bins of a power-of-two range
+        strategy = DoubleHashing()
+        for word in self.words:
+            self.assertEqual(len(set(strategy.probes(word, 16, 1024))), 16)
+
+    def test_default(self):
+        self.assertEqual(BloomFilter(10, 3).strategy, DoubleHashing())
+        self.assertEqual(BloomFilter_4k().strategy, HashSlicing('sha224'))
+
+
+class TestBlocked(TestCase):
+    words = random_words(2_000)
+
+    def test_probes_share_block(self):
+        bf = BlockedBloomFilter(64 * 100, 7)
+        for word in self.words[:100]:
+            probes = list(bf.get_probes(word))
+            self.assertEqual(len({probe // 512 for probe in probes}), 1)
+            self.assertEqual(len(set(probes)), 7)
+
+    def test_probes_many_match_scalar(self):
+        for strategy in (Blocked(), Blocked(4)):
+            for top in (512, 1024, 512 * 241_117):
+                probes = strategy.probes_many(self.words[:200], 5, top)
+                expected = [list(strategy.probes(word, 5, top)) for word in self.words[:200]]
+                self.assertEqual(probes.tolist(), expected, strategy)
+                self.assertLess(probes.max(), top)
+
+    def test_filter_with_plain_bloom_filter(self):
+        bf = BloomFilter(512, 7, strategy=Blocked())
+        bf.add_many(self.words[:200])
+        self.assertTrue(all(word in bf for word in self.words[:200]))
+        found = bf.contains_many(random_words(1000, seed=3))
+        self.assertLess(found.mean(), 0.05)
+
+    def test_block_size_follows_bin_width(self):
+        strategy = Blocked(4)
+        self.assertEqual(strategy.block_bins, 128)
+        for word in self.words[:100]:
+            probes = strategy.probes(word, 7, 128 * 10)
+            self.assertEqual(len({probe // 128 for probe in probes}), 1)
+            self.assertEqual(len(set(probes)), 7)
+        with self.assertRaises(ValueError):
+            Blocked(3)
+
+    def test_bin_width_mismatch(self):
+        with self.assertRaisesRegex(ValueError, '4-bit bins'):
+            CountingBloomFilter(640, 7, strategy=Blocked())
+        bf = CountingBloomFilter(640, 7, self.words[:100], strategy=Blocked(4))
+        self.assertTrue(bf.contains_many(self.words[:100]).all())
+
+    def test_rounds_up_size(self):
+        self.assertEqual(len(BlockedBloomFilter(100, 7).array), 128)
+        self.assertEqual(len(BlockedBloomFilter(0, 7).array), 64)
+
+    def test_bad_size(self):
+        with self.assertRaisesRegex(ValueError, 'multiple of 512'):
+            BloomFilter(100, 7, strategy=Blocked()).update(['apple'])
+
+    def test_membership(self):
+        num_bytes, num_probes = BloomFilter.calculate_parameters(2_000, error_rate=0.01)
+        bf = BlockedBloomFilter(num_bytes, num_probes)
+        bf.add_many(self.words)
+        self.assertTrue(all(word in bf for word in self.words))
+        self.assertTrue(bf.contains_many(self.words).all())
+        found = bf.contains_many(random_words(20_000, seed=3))
+        self.assertLess(found.mean(), 0.02)
+
+    def test_save_and_open(self):
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        path = os.path.join(folder.name, 'blocked.bloom')
+        BlockedBloomFilter(640, 7, self.words[:100]).save(path)
+        with BlockedBloomFilter.open(path) as opened:
+            self.assertEqual(opened.strategy, Blocked())
+            self.assertTrue(opened.contains_many(self.words[:100]).all())
+
+
+class TestSetAlgebra(TestCase):
+    words = random_words(1_000)
+
+    def test_union(self):
+        left = BloomFilter(1000, 7, self.words[:600])
+        right = BloomFilter(1000, 7, self.words[400:])
+        union = left | right
+        self.assertEqual(union.array, BloomFilter(1000, 7, self.words).array)
+        self.assertEqual(union.count, 1200)
+        self.assertEqual(left.array, BloomFilter(1000, 7, self.words[:600]).array)
+
+        left |= right
+        self.assertEqual(left.array, union.array)
+
+    def test_intersection(self):
+        left = BloomFilter(1000, 7, self.words[:600])
+        right = BloomFilter(1000, 7, self.words[400:])
+        intersection = left & right
+        self.assertTrue(intersection.contains_many(self.words[400:600]).all())
+        self.assertLess(intersection.contains_many(self.words[:400]).mean(), 0.1)
+        self.assertEqual(intersection.count, 600)
+
+        left &= right
+        self.assertEqual(left.array, intersection.array)
+
+    def test_incompatible(self):
+        bf = BloomFilter(1000, 7)
+        with self.assertRaises(ValueError):
+            bf | BloomFilter(1000, 6)
+        with self.assertRaises(ValueError):
+            bf | BloomFilter(1024, 7)
+        with self.assertRaises(ValueError):
+            bf & BloomFilter(1000, 7, strategy=Xorshift())
+        with self.assertRaises(TypeError):
+            bf | {'apple'}
+        with self.assertRaises(TypeError):
+            CountingBloomFilter(1000, 7) | CountingBloomFilter(1000, 7)
+
+
+class TestParallel(TestCase):
+    words = random_words(5_000)
+
+    def test_build_parallel(self):
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        paths = []
+        for index, offset in enumerate(range(0, len(self.words), 2_000)):
+            path = os.path.join(folder.name, f"words{index}.txt")
+            with open(path, 'wt') as fp:
+                fp.writelines(f"  {word}\n" for word in self.words[offset:offset+2_000])
+            paths.append(path)
+
+        bf = BloomFilter.build_parallel(paths, 6000, 7, max_workers=2, chunk_size=1000)
+        self.assertEqual(bf.count, 5_000)
+        self.assertEqual(bf.array, BloomFilter(6000, 7, self.words).array)
+
+    def test_build_parallel_subclass(self):
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        path = os.path.join(folder.name, 'words.txt')
+        with open(path, 'wt') as fp:
+            fp.writelines(f"{word}\n" for word in self.words)
+
+        bf = BlockedBloomFilter.build_parallel([path], 6000, 7, max_workers=2, chunk_size=5000)
+        self.assertIsInstance(bf, BlockedBloomFilter)
+        self.assertEqual(bf.strategy, Blocked())
+        self.assertEqual(bf.array, BlockedBloomFilter(6000, 7, self.words).array)
+
+    @skipUnless(os.path.isdir('/dev/shm'), 'needs /dev/shm')
+    def test_build_parallel_error_frees_shared_memory(self):
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        paths = []
+        for index, data in enumerate((b'apple\n', b'\xff\xfe\n', b'banana\n', b'cherry\n')):
+            path = os.path.join(folder.name, f"words{index}.txt")
+            with open(path, 'wb') as fp:
+                fp.write(data)
+            paths.append(path)
+
+        before = set(os.listdir('/dev/shm'))
+        with self.assertRaises(UnicodeDecodeError):
+            BloomFilter.build_parallel(paths, 6000, 7, max_workers=2)
+        self.assertEqual(set(os.listdir('/dev/shm')) - before, set())
+
+
+class TestPersistence(TestCase):
+    words = random_words(500)
+
+    def setUp(self):
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        self.path = os.path.join(folder.name, 'filter.bloom')
+
+    def test_save_and_open(self):
+        bf = BloomFilter(1000, 7, self.words)
+        bf.save(self.path)
+        self.assertEqual(os.path.getsize(self.path), 64 + 1000)
+
+        with BloomFilter.open(self.path) as opened:
+            self.assertEqual(opened.num_bins, 8000)
+            self.assertEqual(opened.num_probes, 7)
+            self.assertEqual(opened.count, 500)
+            self.assertEqual(opened.array, bf.array)
+            self.assertTrue(all(word in opened for word in self.words))
+            self.assertTrue(opened.contains_many(self.words).all())
+
+    def test_open_read_only(self):
+        BloomFilter(100, 3).save(self.path)
+        with BloomFilter.open(self.path) as opened:
+            with self.assertRaises(TypeError):
+                opened.update(['apple'])
+
+    def test_open_read_write(self):
+        BloomFilter(100, 3).save(self.path)
+        with BloomFilter.open(self.path, 'r+') as opened:
+            opened.add_many(['apple', 'banana'])
+        with BloomFilter.open(self.path) as opened:
+            self.assertEqual(opened.count, 2)
+            self.assertIn('apple', opened)
+            self.assertIn('banana', opened)
+
+    def test_open_copy_on_write(self):
+        BloomFilter(100, 3).save(self.path)
+        with BloomFilter.open(self.path, 'c') as opened:
+            opened.update(['apple'])
+            self.assertIn('apple', opened)
+        with BloomFilter.open(self.path) as opened:
+            self.assertEqual(opened.count, 0)
+            self.assertEqual(bytes(opened.array), bytes(100))
+
+    def test_open_subclass(self):
+        BloomFilter_4k(self.words).save(self.path)
+        with BloomFilter_4k.open(self.path) as opened:
+            self.assertTrue(all(word in opened for word in self.words))
+
+    def test_open_records_strategy(self):
+        BloomFilter(100, 5, self.words, strategy=Xorshift()).save(self.path)
+        with BloomFilter.open(self.path) as opened:
+            self.assertEqual(opened.strategy, Xorshift())
+            self.assertTrue(all(word in opened for word in self.words))
+
+    def test_open_unknown_strategy(self):
+        bf = BloomFilter(10, 3)
+        bf.strategy = Xorshift()
+        bf.strategy.name = 'bogus'
+        bf.save(self.path)
+        with self.assertRaisesRegex(ValueError, 'Unknown probe strategy'):
+            BloomFilter.open(self.path)
+
+    def test_open_bad_file(self):
+        with open(self.path, 'wb') as fp:
+            fp.write(b'Not a bloom filter' * 10)
+        with self.assertRaisesRegex(ValueError, 'Not a bloom filter'):
+            BloomFilter.open(self.path)
+
+    def test_open_bad_mode(self):
+        BloomFilter(10, 3).save(self.path)
+        with self.assertRaisesRegex(ValueError, 'Invalid mode'):
+            BloomFilter.open(self.path, 'w')
+
+
+class TestSizing(TestCase):
+    def test_error_rate(self):
+        num_bytes, num_probes = BloomFilter.calculate_parameters(10_000, error_rate=0.01)
+        self.assertEqual(num_bytes, 11_982)
+        self.assertEqual(num_probes, 7)
+
+    def test_megabytes(self):
+        num_bytes, num_probes = BloomFilter.calculate_parameters(1_000_000, megabytes=2)
+        self.assertEqual(num_bytes, 2 * 1024 * 1024)
+        self.assertEqual(num_probes, 12)
+
+    def test_default(self):
+        num_bytes, num_probes = BloomFilter.calculate_parameters(8_000)
+        self.assertEqual(num_bytes, 11_000)
+        self.assertEqual(num_probes, 8)
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            BloomFilter.calculate_parameters(100, error_rate=0.01, megabytes=1)
+        with self.assertRaises(ValueError):
+            BloomFilter.calculate_parameters(100, error_rate=1.5)
+        with self.assertRaises(ValueError):
+            BloomFilter.calculate_parameters(0, error_rate=0.01)
+
+    def test_from_capacity(self):
+        words = random_words(5_000)
+        bf = BloomFilter.from_capacity(5_000, error_rate=0.01, iterable=words)
+        error_rate = bf.expected_error_rate(bf.num_bins, bf.num_probes, bf.count)
+        self.assertAlmostEqual(error_rate, 0.01, places=3)
+        found = bf.contains_many(random_words(20_000, seed=7))
+        self.assertLess(found.mean(), 0.02)
+
+
+class TestScalable(TestCase):
+    def test_grows(self):
+        words = random_words(5_000)
+        sbf = ScalableBloomFilter(initial_capacity=500, error_rate=0.01)
+        sbf.add_many(words)
+        self.assertEqual(len(sbf.filters), 4)
+        self.assertEqual(sbf.capacities, [500, 1000, 2000, 4000])
+        self.assertTrue(sbf.contains_many(words).all())
+        self.assertTrue(all(word in sbf for word in words[::50]))
+
+        # Compound false-positive rate stays close to target
+        found = sbf.contains_many(random_words(20_000, seed=7))
+        self.assertLess(found.mean(), 0.02)
+
+    def test_update_skips_duplicates(self):
+        sbf = ScalableBloomFilter(initial_capacity=10, iterable=['apple'] * 100)
+        self.assertEqual(len(sbf), 1)
+        self.assertEqual(len(sbf.filters), 1)
+
+    def test_update_matches_add_many(self):
+        words = random_words(300)
+        scalar = ScalableBloomFilter(initial_capacity=100, iterable=words)
+        batch = ScalableBloomFilter(initial_capacity=100)
+        batch.add_many(words)
+        self.assertEqual(len(scalar), len(batch))
+        self.assertEqual(scalar.capacities, batch.capacities)
+        self.assertGreater(batch.num_bytes(), 0)
+
+
+class TestCounting(TestCase):
+    words = random_words(1_000)
+    others = random_words(1_000, seed=99)
+
+    def test_packed_counters(self):
+        cbf = CountingBloomFilter(100, 3)
+        self.assertEqual(cbf.num_bins, 200)
+        cbf.update(['apple'])
+        probes = list(cbf.get_probes('apple'))
+        self.assertEqual(sum(byte & 0xF for byte in cbf.array)
+                         + sum(byte >> 4 for byte in cbf.array), 3)
+        for i in probes:
+            self.assertEqual((cbf.array[i // 2] >> (4 * (i % 2))) & 0xF, probes.count(i))
+
+    def test_add_and_remove(self):
+        cbf = CountingBloomFilter(2000, 7, self.words)
+        self.assertTrue(all(word in cbf for word in self.words))
+        for word in self.words[:500]:
+            cbf.remove(word)
+        self.assertEqual(cbf.count, 500)
+        self.assertTrue(all(word in cbf for word in self.words[500:]))
+        self.assertLess(sum(word in cbf for word in self.words[:500]), 25)
+
+    def test_remove_all(self):
+        cbf = CountingBloomFilter(2000, 7, self.words)
+        for word in self.words:
+            cbf.remove(word)
+        self.assertEqual(bytes(cbf.array), bytes(2000))
+
+    def test_remove_missing(self):
+        cbf = CountingBloomFilter(100, 3, ['apple'])
+        with self.assertRaises(KeyError):
+            cbf.remove('banana')
+
+    def test_batch_matches_scalar(self):
+        scalar = CountingBloomFilter(2000, 7, self.words)
+        scalar.update(self.words[:100])
+        batch = CountingBloomFilter(2000, 7)
+        batch.add_many(self.words)
+        batch.add_many(self.words[:100])
+        self.assertEqual(scalar.array, batch.array)
+
+        for word in self.words[200:]:
+            scalar.remove(word)
+        batch.remove_many(self.words[200:])
+        self.assertEqual(scalar.array, batch.array)
+        self.assertEqual(scalar.count, batch.count)
+
+        lookups = self.words + self.others
+        self.assertEqual(batch.contains_many(lookups).tolist(), [w in scalar for w in lookups])
+
+    def test_remove_many_missing(self):
+        cbf = CountingBloomFilter(100, 3, ['apple'])
+        with self.assertRaisesRegex(KeyError, 'banana'):
+            cbf.remove_many(['apple', 'banana'])
+        self.assertIn('apple', cbf)
+
+    def test_saturation(self):
+        cbf = CountingBloomFilter(10, 2)
+        cbf.add_many(['apple'] * 20)
+        cbf.update(['apple'])
+        self.assertTrue(all(byte in (0x00, 0x0F, 0xF0, 0xFF) for byte in cbf.array))
+        cbf.remove_many(['apple'] * 20)
+        self.assertIn('apple', cbf)
+
+    def test_save_and_open(self):
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        path = os.path.join(folder.name, 'counting.bloom')
+        CountingBloomFilter(500, 5, self.words[:100]).save(path)
+        with self.assertRaisesRegex(ValueError, '4-bit bins'):
+            BloomFilter.open(path)
+        with CountingBloomFilter.open(path, 'r+') as opened:
+            self.assertEqual(opened.num_bins, 1000)
+            opened.remove_many(self.words[:50])
+        with CountingBloomFilter.open(path) as opened:
+            self.assertEqual(opened.count, 50)
+            self.assertTrue(opened.contains_many(self.words[50:100]).all())
@@ -0,0 +1,101 @@
+from unittest import TestCase
+
+from cuckoo_filter import CuckooFilter
+
+from .test_bloom_filter import random_words
+
+
+class TestCuckooFilter(TestCase):
+    words = random_words(5_000)
+    others = random_words(20_000, seed=99)
+
+    def test_sizing(self):
+        # Bucket count need not be a power of two, two bytes of padding
+        cf = CuckooFilter(1000)
+        self.assertEqual(cf.num_buckets, 264)
+        self.assertEqual(cf.num_bytes(), 264 * 4 * 2 + 2)
+        self.assertEqual(CuckooFilter(1000, fingerprint_bits=8).num_bytes(), 264 * 4 + 2)
+        self.assertEqual(CuckooFilter(1000, fingerprint_bits=12).num_bytes(), 264 * 6 + 2)
+        with self.assertRaises(ValueError):
+            CuckooFilter(1000, fingerprint_bits=17)
+
+    def test_alternate_is_own_inverse(self):
+        cf = CuckooFilter(1000)
+        for index in (0, 1, 100, cf.num_buckets - 1):
+            for fingerprint in (1, 2, 0xABC, 0xFFFF):
+                alternate = cf._alternate(index, fingerprint)
+                self.assertLess(alternate, cf.num_buckets)
+                self.assertEqual(cf._alternate(alternate, fingerprint), index)
+
+    def test_packed_fingerprints(self):
+        for bits in (5, 12, 13):
+            cf = CuckooFilter(5_000, fingerprint_bits=bits, seed=1)
+            cf.add_many(self.words)
+            self.assertTrue(all(word in cf for word in self.words))
+            self.assertTrue(cf.contains_many(self.words).all())
+            lookups = self.others[:2000]
+            self.assertEqual(cf.contains_many(lookups).tolist(), [word in cf for word in lookups])
+            cf.remove_many(self.words[:2_500])
+            self.assertTrue(cf.contains_many(self.words[2_500:]).all())
+            self.assertLessEqual(cf.num_bytes() * 8 / 5_000, bits / 0.95 + 0.1)
+
+    def test_membership(self):
+        cf = CuckooFilter(5_000, iterable=self.words, seed=1)
+        self.assertEqual(len(cf), 5_000)
+        self.assertTrue(all(word in cf for word in self.words))
+        false_positives = sum(word in cf for word in self.others)
+        self.assertLess(false_positives, 10)
+
+    def test_remove(self):
+        cf = CuckooFilter(5_000, iterable=self.words, seed=1)
+        for word in self.words[:2_500]:
+            cf.remove(word)
+        self.assertEqual(len(cf), 2_500)
+        self.assertTrue(all(word in cf for word in self.words[2_500:]))
+        self.assertLess(sum(word in cf for word in self.words[:2_500]), 5)
+        with self.assertRaises(KeyError):
+            cf.remove(self.others[0])
+
+    def test_batch_matches_scalar(self):
+        scalar = CuckooFilter(5_000, iterable=self.words, seed=1)
+        batch = CuckooFilter(5_000, seed=1)
+        batch.add_many(self.words)
+        self.assertEqual(scalar.table, batch.table)
+
+        lookups = self.words + self.others
+        found = batch.contains_many(lookups)
+        self.assertEqual(found.tolist(), [word in batch for word in lookups])
+        self.assertEqual(len(batch.contains_many([])), 0)
+
+        batch.remove_many(self.words[:1_000])
+        self.assertEqual(len(batch), 4_000)
+        self.assertFalse(batch.contains_many(self.words[:1_000]).any())
+        with self.assertRaisesRegex(KeyError, self.others[0]):
+            batch.remove_many([self.others[0]])
+
+    def test_eight_bit_fingerprints(self):
+        cf = CuckooFilter(5_000, fingerprint_bits=8)
+        cf.add_many(self.words)
+        self.assertTrue(cf.contains_many(self.words).all())
+        self.assertLess(cf.contains_many(self.others).mean(), 0.05)
+
+    def test_full(self):
+        cf = CuckooFilter(100, seed=1)
+        added = []
+        with self.assertRaisesRegex(RuntimeError, 'full'):
+            for word in self.words:
+                cf.add(word)
+                added.append(word)
+        self.assertGreater(cf.load_factor(), 0.9)
+        self.assertEqual(len(cf), len(added))
+
+        # Failed insert must not lose existing keys
+        self.assertTrue(all(word in cf for word in added))
+
+    def test_duplicates(self):
+        cf = CuckooFilter(100)
+        cf.update(['apple', 'apple'])
+        cf.remove('apple')
+        self.assertIn('apple', cf)
+        cf.remove('apple')
+        self.assertNotIn('apple', cf)
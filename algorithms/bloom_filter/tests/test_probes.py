@@ -13,6 +13,10 @@ class TestProbes(TestCase):
         func = bloom_filter.get_probes_using_random_stdlib
         self._check_probes(func, 'James B Grossweiner', count=7, top=10_000)
 
+    def test_get_probes_using_random_xorshift(self):
+        func = bloom_filter.get_probes_using_random_xorshift
+        self._check_probes(func, 'Justin Case', count=7, top=10_000)
+
     def test_get_probes_using_hash(self):
         func = bloom_filter.get_probes_using_hash
         self._check_probes(func, 'Yolanda Squatpump', count=7, top=10_000)
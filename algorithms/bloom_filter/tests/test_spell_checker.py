@@ -0,0 +1,79 @@
+import os
+import tempfile
+from unittest import TestCase
+
+from bloom_filter import Misspelling, SpellChecker
+
+
+WORDS = """
+a
+all
+and
+being
+don't
+his
+in
+is
+many
+parts
+players
+stage
+the
+world's
+"""
+
+
+class TestSpellChecker(TestCase):
+    def setUp(self):
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        self.folder = folder.name
+        path = os.path.join(self.folder, 'english.0')
+        with open(path, 'wt') as fp:
+            fp.write(WORDS)
+        self.checker = SpellChecker([path], estimated_word_count=100)
+
+    def test_find_misspellings(self):
+        found = self.checker.find_misspellings('All the werldz a stage')
+        self.assertEqual(found, ['werldz'])
+
+    def test_check_lines(self):
+        lines = [
+            "All the world's a stage,\n",
+            "\n",
+            "And all the mehn (and wwomen) merrely players.\n",
+            "Don't, 1999, dont_care\n",
+        ]
+        found = list(self.checker.check_lines(lines))
+        self.assertEqual(found, [
+            Misspelling(3, 13, 'mehn'),
+            Misspelling(3, 23, 'wwomen'),
+            Misspelling(3, 31, 'merrely'),
+            Misspelling(4, 14, 'dont'),
+            Misspelling(4, 19, 'care'),
+        ])
+
+    def test_check_lines_is_lazy(self):
+        def lines():
+            yield 'all the mehn\n'
+            raise AssertionError('Read too far')
+
+        found = self.checker.check_lines(lines())
+        self.assertEqual(next(found), Misspelling(1, 9, 'mehn'))
+
+    def test_check_lines_cache(self):
+        lines = ['the werldz the werldz\n'] * 100
+        found = list(self.checker.check_lines(lines, cache_size=2))
+        self.assertEqual(len(found), 200)
+        self.assertEqual(found[-1], Misspelling(100, 16, 'werldz'))
+
+    def test_check_file(self):
+        path = os.path.join(self.folder, 'text.txt')
+        with open(path, 'wt', encoding='utf-8') as fp:
+            fp.write('His acts being\nsevven ages\n')
+        found = list(self.checker.check_file(path))
+        self.assertEqual(found, [
+            Misspelling(1, 5, 'acts'),
+            Misspelling(2, 1, 'sevven'),
+            Misspelling(2, 8, 'ages'),
+        ])
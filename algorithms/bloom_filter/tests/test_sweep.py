@@ -0,0 +1,87 @@
+from unittest import TestCase
+
+from benchmarks import random_words
+from benchmarks.sweep import find_regressions, run_one, THROUGHPUTS
+
+
+def make_result(strategy='double-hashing', num_elements=1000, speed=1000.0, **speeds):
+    result = {
+        'num_elements': num_elements,
+        'bits_per_element': 12,
+        'num_probes': 8,
+        'strategy': strategy,
+    }
+    for measurement in THROUGHPUTS:
+        result[measurement] = speeds.get(measurement, speed)
+    return result
+
+
+class TestFindRegressions(TestCase):
+    def test_no_change(self):
+        results = [make_result(), make_result('xorshift')]
+        self.assertEqual(find_regressions(results, results, 0.1), [])
+
+    def test_within_tolerance(self):
+        baseline = [make_result(speed=1000.0)]
+        results = [make_result(speed=901.0)]
+        self.assertEqual(find_regressions(results, baseline, 0.1), [])
+
+    def test_exactly_at_tolerance(self):
+        baseline = [make_result(speed=1000.0)]
+        results = [make_result(speed=900.0)]
+        self.assertEqual(find_regressions(results, baseline, 0.1), [])
+
+    def test_beyond_tolerance(self):
+        baseline = [make_result(speed=1000.0)]
+        results = [make_result(lookup_per_second=899.0)]
+        regressions = find_regressions(results, baseline, 0.1)
+        self.assertEqual(regressions, [(results[0], 'lookup_per_second', 1000.0, 899.0)])
+
+    def test_every_measurement_checked(self):
+        baseline = [make_result(speed=1000.0)]
+        results = [make_result(speed=500.0)]
+        regressions = find_regressions(results, baseline, 0.1)
+        self.assertEqual([measurement for _, measurement, _, _ in regressions], list(THROUGHPUTS))
+
+    def test_zero_tolerance(self):
+        baseline = [make_result(speed=1000.0)]
+        self.assertEqual(len(find_regressions([make_result(speed=999.0)], baseline, 0.0)), 3)
+        self.assertEqual(find_regressions([make_result(speed=1000.0)], baseline, 0.0), [])
+
+    def test_faster_is_not_regression(self):
+        baseline = [make_result(speed=1000.0)]
+        results = [make_result(speed=5000.0)]
+        self.assertEqual(find_regressions(results, baseline, 0.1), [])
+
+    def test_missing_from_baseline(self):
+        # New configurations have nothing to compare against
+        baseline = [make_result('xorshift', speed=1000.0)]
+        results = [
+            make_result('double-hashing', speed=1.0),
+            make_result('xorshift', num_elements=5000, speed=1.0),
+        ]
+        self.assertEqual(find_regressions(results, baseline, 0.1), [])
+
+    def test_missing_from_results(self):
+        baseline = [make_result('xorshift'), make_result('double-hashing')]
+        self.assertEqual(find_regressions([], baseline, 0.1), [])
+
+    def test_matches_on_configuration(self):
+        baseline = [make_result('xorshift', speed=100.0), make_result('blocked', speed=1000.0)]
+        results = [make_result('blocked', speed=100.0), make_result('xorshift', speed=100.0)]
+        regressions = find_regressions(results, baseline, 0.1)
+        self.assertEqual({result['strategy'] for result, _, _, _ in regressions}, {'blocked'})
+
+
+class TestRunOne(TestCase):
+    keys = random_words(1000, seed=1)
+    missing = random_words(1000, seed=2)
+
+    def test_size_not_rounded(self):
+        # 1000 elements at 10 bits each is 1250 bytes, not a multiple of 64
+        result = run_one(1000, 10, None, 'double-hashing', keys=self.keys, missing=self.missing)
+        self.assertEqual(result['num_bytes'], 1250)
+
+    def test_blocked_size_rounded(self):
+        result = run_one(1000, 10, None, 'blocked', keys=self.keys, missing=self.missing)
+        self.assertEqual(result['num_bytes'], 1280)
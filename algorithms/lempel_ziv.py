@@ -1,20 +1,49 @@
 """
 Learn how Lempel-Ziv tokenisation works.
 
-We're not compressing data here, we're only experimenting with how to break
-input characters into an optimal token stream.
+Started as an experiment in how to break input characters into an optimal
+token stream, `tokenise()` and `untokenise()`, with LZW for comparison in
+`lzw_tokenise()`. The LZ77 tokens are bit-packed by the streaming
+`Compressor` and `Decompressor`, whose format is described in the 'Stream
+format' section, and by the parallel `compress_blocks()` in 'Block mode'.
 
-TODO:
-    * Implement look_back() function.
+Input is split, LZ77-style, into runs of literal characters and
+back-references to earlier input within a sliding window. Matches are found
+using hash chains, as in zlib: for every 3-character prefix we keep the most
+recent position it was seen at, and each position links back to the previous
+occurrence of the same prefix.
+
+Both `str` and `bytes` input are supported.
 """
 
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
 from dataclasses import dataclass
+import os
+import struct
+from typing import BinaryIO, Callable, Iterable, Iterator, Sequence
+import zlib
+
+
+# Shortest back-reference worth making
+MIN_MATCH = 3
+
+# Defaults, as used by deflate
+WINDOW_SIZE = 32_768
+LOOKAHEAD_SIZE = 258
+MAX_CHAIN = 128
 
 
 @dataclass
 class Token:
     """
     Encapsulate token data.
+
+    Tokens are either a run of literal characters, with an offset of zero and
+    the run's length, or a back-reference with no literal. A back-reference
+    copies `length` characters starting `offset` characters from the end of
+    the output so far. The length may exceed the offset, in which case the
+    copy overlaps the characters it is producing.
     """
     offset: int
     length: int
@@ -62,51 +91,209 @@ def look_back(needle: str, haystack: str, max_length: int|None = None) -> int|No
     Returns:
         Offset from end of string, or none if needle not found.
     """
-    return None
+    if not needle:
+        return None
+    start = 0 if max_length is None else max(0, len(haystack) - max_length)
+    index = haystack.rfind(needle, start)
+    if index == -1:
+        return None
+    return len(haystack) - index
 
 
-def tokenise(string) -> list[Token]:
+class MatchFinder:
     """
-    Convert string into list of tokens.
+    Hash-chain index of the 3-character prefixes in a sliding window.
 
-    Args:
-        string:
-            Input to break into tokens.
+    Chains are stored in a ring buffer the size of the window, so memory use
+    is bounded however long the input.
+    """
+    def __init__(
+        self,
+        data: Sequence,
+        window: int = WINDOW_SIZE,
+        lookahead: int = LOOKAHEAD_SIZE,
+        max_chain: int = MAX_CHAIN,
+    ):
+        """
+        Args:
+            data:
+                String or bytes to search.
+            window:
+                How far back to look for matches. Must be a power of two.
+            lookahead:
+                Longest match to find.
+            max_chain:
+                Give up after trying this many candidates for a position.
+        """
+        if window < 1 or window & (window - 1):
+            raise ValueError(f"Window size must be a power of two, given {window}")
+        if lookahead < MIN_MATCH:
+            raise ValueError(f"Lookahead must be at least {MIN_MATCH}, given {lookahead}")
+        self.data = data
+        self.window = window
+        self.lookahead = lookahead
+        self.max_chain = max_chain
+        self.head: dict = {}
+        self.previous = [-1] * window
 
-    Returns:
+    def find(self, position: int) -> tuple[int, int]:
+        """
+        Find longest earlier match for input starting at `position`.
+
+        Returns:
+            Tuple of `(offset, length)`, where length is zero if no match of
+            at least `MIN_MATCH` characters was found.
+        """
+        data = self.data
+        previous = self.previous
+        mask = self.window - 1
+        limit = max(0, position - self.window + 1)
+        max_length = min(self.lookahead, len(data) - position)
+        if max_length < MIN_MATCH:
+            return (0, 0)
+
+        best_length = MIN_MATCH - 1
+        best_offset = 0
+        candidate = self.head.get(data[position:position + MIN_MATCH], -1)
+        chain = self.max_chain
+        while candidate >= limit and chain:
+            # Cheap check: can this candidate beat the best so far?
+            if data[candidate + best_length] == data[position + best_length]:
+                length = _match_length(data, candidate, position, max_length)
+                if length > best_length:
+                    best_length, best_offset = length, position - candidate
+                    if length == max_length:
+                        break
+            next_candidate = previous[candidate & mask]
+            if next_candidate >= candidate:
+                # Slot reused by a newer position, so the chain ends here
+                break
+            candidate = next_candidate
+            chain -= 1
+
+        if best_offset == 0:
+            return (0, 0)
+        return (best_offset, best_length)
+
+    def insert(self, position: int) -> None:
+        """
+        Add the prefix starting at `position` to the index.
+        """
+        key = self.data[position:position + MIN_MATCH]
+        if len(key) == MIN_MATCH:
+            self.previous[position & (self.window - 1)] = self.head.get(key, -1)
+            self.head[key] = position
+
+
+def _match_length(data: Sequence, earlier: int, position: int, max_length: int) -> int:
     """
-    # Empty string
-    tokens: list[Token] = []
-    if not string:
-        return tokens
+    Count matching characters, comparing eight at a time while we can.
+    """
+    length = 0
+    while (length + 8 <= max_length
+            and data[earlier + length:earlier + length + 8]
+            == data[position + length:position + length + 8]):
+        length += 8
+    while length < max_length and data[earlier + length] == data[position + length]:
+        length += 1
+    return length
+
 
-    # First character
-    current = 0
-    word = string[current]
-    tokens.append(Token(current, len(word), word))
-    current += 1
-    length = 1
+def scan(
+    data: Sequence,
+    start: int = 0,
+    window: int = WINDOW_SIZE,
+    lookahead: int = LOOKAHEAD_SIZE,
+    lazy: bool = True,
+    max_chain: int = MAX_CHAIN,
+) -> Iterator[tuple[int, int]]:
+    """
+    Yield `(offset, length)` pairs covering `data[start:]`.
 
-    def longest_match(current) -> tuple[int, str]:
-        return (0, "")
-        # ~ while current < len(string):
-            # ~ length = 1
-            # ~ word = string[current:current+length]
+    An offset of zero is a run of `length` literal characters, anything else
+    a back-reference. Characters before `start` are never emitted, but
+    matches may refer back to them, so they act as a preset dictionary.
+    Plain tuples are much cheaper than `Token` objects, for compressors.
 
+    See `tokenise()` for the other arguments.
+    """
+    finder = MatchFinder(data, window, lookahead, max_chain)
+    find, insert = finder.find, finder.insert
+    size = len(data)
+    for position in range(max(0, start - window + 1), start):
+        insert(position)
+    literal_start = position = start
 
+    while position < size:
+        offset, length = find(position)
+        insert(position)
+        if not length:
+            position += 1
+            continue
 
+        if lazy:
+            while length < lookahead and position + 1 < size:
+                next_offset, next_length = find(position + 1)
+                if next_length <= length:
+                    break
+                position += 1
+                insert(position)
+                offset, length = next_offset, next_length
 
-            # ~ while (found := string.find(word, 0, current)) != -1:
-                # ~ length += 1
+        if literal_start < position:
+            yield (0, position - literal_start)
+        yield (offset, length)
+        for skipped in range(position + 1, position + length):
+            insert(skipped)
+        position += length
+        literal_start = position
 
-                # ~ current += 1
+    if literal_start < size:
+        yield (0, size - literal_start)
 
-    tokens.append(Token(current, length, word))
 
+def tokenise(
+    string: Sequence,
+    window: int = WINDOW_SIZE,
+    lookahead: int = LOOKAHEAD_SIZE,
+    lazy: bool = True,
+    max_chain: int = MAX_CHAIN,
+) -> list[Token]:
+    """
+    Convert string into list of tokens.
+
+    With lazy matching, as in deflate, a match is only taken once we've
+    checked that the match starting at the next character is no longer. If
+    it is longer, the current character becomes a literal instead.
+
+    Args:
+        string:
+            Input to break into tokens, `str` or `bytes`.
+        window:
+            How far back to look for matches. Must be a power of two.
+        lookahead:
+            Longest match to make.
+        lazy:
+            Use lazy matching. Slower, but makes fewer, longer matches.
+        max_chain:
+            Candidates to try per position. Lower is faster, higher
+            finds better matches.
+
+    Returns:
+        List of tokens, which `untokenise()` turns back into `string`.
+    """
+    tokens: list[Token] = []
+    position = 0
+    for offset, length in scan(string, 0, window, lookahead, lazy, max_chain):
+        if offset:
+            tokens.append(Token(offset, length))
+        else:
+            tokens.append(Token(0, length, string[position:position + length]))
+        position += length
     return tokens
 
 
-def untokenise(tokens: list[Token]) -> str:
+def untokenise(tokens: list[Token]) -> str|bytes:
     """
     Recreate original string from tokens.
 
@@ -115,13 +302,748 @@ def untokenise(tokens: list[Token]) -> str:
             Tokens produced from `tokenise()` function.
 
     Returns:
-        Plain string.
+        Plain string, or bytes if tokens came from bytes.
     """
-    string = ''
     if not tokens:
-        return string
+        return ''
 
+    is_bytes = isinstance(tokens[0].literal, (bytes, bytearray))
+    output: bytearray|list[str] = bytearray() if is_bytes else []
     for token in tokens:
-        string = f"{string}{token.literal}"
+        if token.literal is not None:
+            output.extend(token.literal)
+        elif token.length <= token.offset:
+            start = len(output) - token.offset
+            output.extend(output[start:start + token.length])
+        else:
+            # Overlapping copy, eg. a run of one repeated character
+            start = len(output) - token.offset
+            for index in range(start, start + token.length):
+                output.append(output[index])
+
+    return bytes(output) if is_bytes else ''.join(output)
+
+
+# LZW
+# ===
+#
+# The dictionary variant of Lempel-Ziv: instead of pointing back into a
+# window, each output code names a phrase from a dictionary that both ends
+# build up in step. Codes below the alphabet size are single characters.
+# Each code emitted adds a phrase: the one just emitted, plus the character
+# that follows it.
+
+LZW_MAX_SIZE = 4096
+LZW_RESET_POLICIES = ('freeze', 'reset')
+
+
+def lzw_tokenise(
+        string: Sequence, max_size: int = LZW_MAX_SIZE, reset: str = 'reset') -> list[int]:
+    """
+    Convert string into list of LZW codes.
+
+    The phrase dictionary is a trie whose nodes are the codes themselves:
+    `children[code]` maps each character that extends that code's phrase to
+    the code of the longer phrase.
+
+    Args:
+        string:
+            Input to break into codes, `str` or `bytes`.
+        max_size:
+            Most phrases to learn, not counting single characters.
+        reset:
+            What to do once the dictionary is full: 'freeze' to keep using
+            it as it is, or 'reset' to empty it and learn afresh, which
+            adapts better when the input changes character.
+
+    Returns:
+        List of codes, which `lzw_untokenise()` turns back into `string`.
+    """
+    if reset not in LZW_RESET_POLICIES:
+        raise ValueError(f"Invalid reset policy {reset!r}, expected one of {LZW_RESET_POLICIES}")
+    codes: list[int] = []
+    if not string:
+        return codes
+
+    symbols = iter(map(ord, string) if isinstance(string, str) else string)
+    # Single characters are every Unicode code point, or every byte
+    first_code = 0x110000 if isinstance(string, str) else 256
+    next_code = first_code
+    children: dict[int, dict[int, int]] = {}
+    current = next(symbols)
+    for symbol in symbols:
+        node = children.get(current)
+        if node is not None and symbol in node:
+            current = node[symbol]
+            continue
+        codes.append(current)
+        if next_code - first_code < max_size:
+            children.setdefault(current, {})[symbol] = next_code
+            next_code += 1
+        elif reset == 'reset':
+            children.clear()
+            next_code = first_code
+        current = symbol
+    codes.append(current)
+    return codes
+
+
+def lzw_untokenise(
+        codes: list[int], text: bool = True, max_size: int = LZW_MAX_SIZE,
+        reset: str = 'reset') -> str|bytes:
+    """
+    Recreate original string from LZW codes.
+
+    Args:
+        codes:
+            Codes produced by `lzw_tokenise()`.
+        text:
+            True if the codes came from `str`, false for `bytes`.
+        max_size, reset:
+            As given to `lzw_tokenise()`.
+
+    Raises:
+        ValueError: If a code could not have been produced by the tokeniser.
+
+    Returns:
+        Plain string, or bytes.
+    """
+    first_code = 0x110000 if text else 256
+    single = chr if text else (lambda code: bytes((code,)))
+    next_code = first_code
+    phrases: dict[int, str|bytes] = {}
+    output: list[str|bytes] = []
+    previous = None
+    for code in codes:
+        if code < first_code:
+            entry = single(code)
+        elif code in phrases:
+            entry = phrases[code]
+        elif code == next_code and previous is not None:
+            # Phrase being defined by this very code, eg. 'aaa' after 'a'
+            entry = previous + previous[:1]
+        else:
+            raise ValueError(f"Invalid LZW code: {code}")
+        output.append(entry)
+
+        if previous is not None:
+            if next_code - first_code < max_size:
+                phrases[next_code] = previous + entry[:1]
+                next_code += 1
+            elif reset == 'reset':
+                phrases.clear()
+                next_code = first_code
+        previous = entry
+
+    return ''.join(output) if text else b''.join(output)
+
+
+# Streaming compression
+# =====================
+#
+# A compressed stream is a header followed by frames, each holding up to
+# `FRAME_SIZE` bytes of input, then an empty frame to mark the end:
+#
+#     +--------+---------+---------+-----+-----------+
+#     | header | frame 1 | frame 2 | ... | end frame |
+#     +--------+---------+---------+-----+-----------+
+#
+# Each frame has a header giving the sizes of its input and payload, and the
+# CRC-32 of its input. The payload is the length of a bit stream of tokens,
+# the bit stream itself, then the bytes of every literal run. Back-references
+# may reach into earlier frames, up to the window size, so only a window's
+# worth of history need be kept in memory when compressing or decompressing.
+#
+# Tokens are packed least-significant bit first. A zero bit starts a literal
+# run, followed by its length. A one bit starts a back-reference, followed
+# by its length less two, then its offset in `window_bits` bits. Lengths are
+# Elias gamma codes: `n` written as `bit_length(n) - 1` zeros, a one, then the
+# remaining bits of `n`.
+
+STREAM_MAGIC = b'LZ77'
+STREAM_VERSION = 1
+STREAM_HEADER = struct.Struct('<4sBB')
+FRAME_HEADER = struct.Struct('<III')
+FRAME_SIZE = 262_144
+
+# Bytes read at a time from files
+CHUNK_SIZE = 1_048_576
+
+MASK64 = (1 << 64) - 1
+
+
+class BitWriter:
+    """
+    Pack variable-width integers into bytes, least-significant bit first.
+    """
+    def __init__(self):
+        self.buffer = bytearray()
+        self._bits = 0
+        self._count = 0
+
+    def getvalue(self) -> bytes:
+        """
+        Return all bits written so far, padded with zeros to a whole byte.
+        """
+        tail = self._bits.to_bytes((self._count + 7) // 8, 'little')
+        return bytes(self.buffer + tail)
+
+    def write(self, value: int, width: int) -> None:
+        self._bits |= value << self._count
+        self._count += width
+        if self._count >= 64:
+            self.buffer += (self._bits & MASK64).to_bytes(8, 'little')
+            self._bits >>= 64
+            self._count -= 64
+
+    def write_gamma(self, value: int) -> None:
+        """
+        Write positive integer as an Elias gamma code.
+        """
+        width = value.bit_length()
+        self.write(1 << (width - 1), width)
+        self.write(value & ((1 << (width - 1)) - 1), width - 1)
+
+
+class BitReader:
+    """
+    Unpack integers written by `BitWriter`.
+    """
+    def __init__(self, data: bytes):
+        self.data = data
+        self._index = 0
+        self._bits = 0
+        self._count = 0
+
+    def read(self, width: int) -> int:
+        if self._count < width:
+            self._refill()
+        value = self._bits & ((1 << width) - 1)
+        self._bits >>= width
+        self._count -= width
+        return value
+
+    def read_gamma(self) -> int:
+        if self._count < 64:
+            self._refill()
+        if not self._bits:
+            raise ValueError("Corrupt bit stream")
+        zeros = (self._bits & -self._bits).bit_length() - 1
+        self._bits >>= zeros + 1
+        self._count -= zeros + 1
+        return (1 << zeros) | self.read(zeros)
+
+    def _refill(self) -> None:
+        chunk = self.data[self._index:self._index + 8]
+        self._bits |= int.from_bytes(chunk, 'little') << self._count
+        self._count += 64
+        self._index += 8
+
+
+class Compressor:
+    """
+    Compress a stream of bytes, piece by piece, like `zlib.compressobj()`.
+
+    Memory use is bounded by the frame and window sizes, not the input size.
+    """
+    def __init__(
+        self,
+        window: int = WINDOW_SIZE,
+        lookahead: int = LOOKAHEAD_SIZE,
+        lazy: bool = True,
+        max_chain: int = MAX_CHAIN,
+        frame_size: int = FRAME_SIZE,
+    ):
+        """
+        Args:
+            frame_size:
+                Bytes of input per frame.
+
+        See `tokenise()` for the other arguments.
+        """
+        # Check arguments early, rather than with the first frame
+        MatchFinder(b'', window, lookahead, max_chain)
+        self.window = window
+        self.lookahead = lookahead
+        self.lazy = lazy
+        self.max_chain = max_chain
+        self.frame_size = frame_size
+        self._window_bits = window.bit_length() - 1
+        # History, then input not yet compressed
+        self._buffer = bytearray()
+        self._history = 0
+        self._started = False
+
+    def compress(self, data: bytes|memoryview) -> bytes:
+        """
+        Add data, returning any compressed output ready so far.
+        """
+        self._buffer += data
+        output = bytearray(self._start())
+        while len(self._buffer) - self._history >= self.frame_size:
+            output += self._frame(self.frame_size)
+        return bytes(output)
+
+    def flush(self) -> bytes:
+        """
+        Compress remaining input and end stream.
+        """
+        output = bytearray(self._start())
+        pending = len(self._buffer) - self._history
+        if pending:
+            output += self._frame(pending)
+        output += FRAME_HEADER.pack(0, 0, 0)
+        return bytes(output)
+
+    def _frame(self, size: int) -> bytes:
+        stop = self._history + size
+        frame = _encode_frame(
+            bytes(self._buffer[:stop]), self._history,
+            self.window, self.lookahead, self.lazy, self.max_chain)
+
+        # Keep just one window of history for the next frame
+        keep = min(self.window, stop)
+        del self._buffer[:stop - keep]
+        self._history = keep
+        return frame
+
+    def _start(self) -> bytes:
+        if self._started:
+            return b''
+        self._started = True
+        return STREAM_HEADER.pack(STREAM_MAGIC, STREAM_VERSION, self._window_bits)
 
-    return string
+
+class Decompressor:
+    """
+    Decompress a stream made by `Compressor`, piece by piece.
+
+    Input not yet decoded is kept internally, as for `bz2.BZ2Decompressor`,
+    rather than handed back.
+
+    Attributes:
+        eof: True once the end of the stream has been reached.
+        needs_input: False if output is ready without more input, so that
+            `decompress(b'', max_length)` should be called again.
+        unused_data: Any input found after the end of the stream.
+    """
+    def __init__(self):
+        self.eof = False
+        self.needs_input = True
+        self.unused_data = b''
+        self._input = bytearray()
+        # Decoded output not yet returned, less than one frame
+        self._output = bytearray()
+        self._history = bytearray()
+        self._window_bits: int|None = None
+
+    def decompress(self, data: bytes|memoryview, max_length: int = -1) -> bytes:
+        """
+        Add compressed data, returning as much output as can be decoded.
+
+        Args:
+            data:
+                More compressed input, possibly empty.
+            max_length:
+                Most bytes to return, or -1 for no limit. Frames are decoded
+                whole, and no more are decoded once this much output is
+                ready, so memory is bounded by this plus the frame size,
+                however well the input compresses.
+
+        Raises:
+            ValueError: If data is not a valid stream.
+        """
+        if self.eof:
+            self.unused_data += bytes(data)
+            return b''
+        self._input += data
+        if self._window_bits is None:
+            if len(self._input) < STREAM_HEADER.size:
+                return b''
+            magic, version, window_bits = STREAM_HEADER.unpack_from(self._input)
+            if magic != STREAM_MAGIC:
+                raise ValueError("Not a Lempel-Ziv stream")
+            if version != STREAM_VERSION:
+                raise ValueError(f"Unsupported Lempel-Ziv stream version: {version}")
+            self._window_bits = window_bits
+            del self._input[:STREAM_HEADER.size]
+
+        output = self._output
+        while max_length < 0 or len(output) < max_length:
+            if len(self._input) < FRAME_HEADER.size:
+                break
+            size, payload_size, crc = FRAME_HEADER.unpack_from(self._input)
+            end = FRAME_HEADER.size + payload_size
+            if size == 0:
+                self.eof = True
+                self.unused_data = bytes(self._input[FRAME_HEADER.size:])
+                self._input.clear()
+                break
+            if len(self._input) < end:
+                break
+            payload = bytes(self._input[FRAME_HEADER.size:end])
+            del self._input[:end]
+            output += self._frame(payload, size, crc)
+
+        if max_length < 0:
+            max_length = len(output)
+        result = bytes(output[:max_length])
+        del output[:max_length]
+        self.needs_input = not (self.eof or output or self._frame_ready())
+        return result
+
+    def _frame_ready(self) -> bool:
+        """
+        Is a whole frame, or the end of the stream, waiting to be decoded?
+        """
+        if len(self._input) < FRAME_HEADER.size:
+            return False
+        size, payload_size, _ = FRAME_HEADER.unpack_from(self._input)
+        return size == 0 or len(self._input) >= FRAME_HEADER.size + payload_size
+
+    def _frame(self, payload: bytes, size: int, crc: int) -> bytes:
+        return _decode_frame(payload, size, crc, self._history, self._window_bits)
+
+
+def compress(data: bytes|memoryview, **kwargs) -> bytes:
+    """
+    Compress bytes in one go. See `Compressor` for arguments.
+    """
+    compressor = Compressor(**kwargs)
+    return compressor.compress(data) + compressor.flush()
+
+
+def decompress(data: bytes|memoryview) -> bytes:
+    """
+    Decompress a whole stream in one go.
+
+    Raises:
+        ValueError: If data is not a complete, valid stream.
+    """
+    decompressor = Decompressor()
+    output = decompressor.decompress(data)
+    if not decompressor.eof:
+        raise ValueError("Lempel-Ziv stream is truncated")
+    return output
+
+
+def compress_file(source: BinaryIO, destination: BinaryIO, chunk_size: int = CHUNK_SIZE, **kwargs) -> None:
+    """
+    Compress one binary file object into another, a chunk at a time.
+
+    See `Compressor` for keyword arguments.
+    """
+    compressor = Compressor(**kwargs)
+    for chunk in _read_chunks(source, chunk_size):
+        destination.write(compressor.compress(chunk))
+    destination.write(compressor.flush())
+
+
+def decompress_file(source: BinaryIO, destination: BinaryIO, chunk_size: int = CHUNK_SIZE) -> None:
+    """
+    Decompress one binary file object into another, a chunk at a time.
+
+    At most `chunk_size` bytes of output are held at once, plus one frame,
+    no matter how much a chunk of input expands.
+
+    Raises:
+        ValueError: If source is not a complete, valid stream.
+    """
+    decompressor = Decompressor()
+    for chunk in _read_chunks(source, chunk_size):
+        destination.write(decompressor.decompress(chunk, chunk_size))
+        while not (decompressor.needs_input or decompressor.eof):
+            destination.write(decompressor.decompress(b'', chunk_size))
+    if not decompressor.eof:
+        raise ValueError("Lempel-Ziv stream is truncated")
+
+
+# Block mode
+# ==========
+#
+# For parallel compression and random access, input is split into blocks,
+# each encoded as one frame (see above) by a pool of processes. Frames are
+# written in order, followed by an index of where each one starts, and a
+# fixed-size trailer giving the position of the index:
+#
+#     +--------+---------+-----+---------+-------+---------+
+#     | header | block 0 | ... | block n | index | trailer |
+#     +--------+---------+-----+---------+-------+---------+
+#
+# Blocks are independent unless compressed with `dictionary=True`, when each
+# block is primed with the last window of the block before it. That improves
+# the ratio, but primed blocks must be decoded after the block before them.
+# Every `restart_interval`th block is left unprimed, so decoding can start at
+# any of those, in parallel, and reading one block decodes at most
+# `restart_interval` of them.
+
+BLOCK_MAGIC = b'LZ7B'
+BLOCK_VERSION = 1
+# Magic, version, window bits, dictionary flag, block size, restart interval
+BLOCK_HEADER = struct.Struct('<4sBBBxII')
+# Offset of each block's frame
+BLOCK_INDEX_ENTRY = struct.Struct('<Q')
+# Offset of index, number of blocks, magic
+BLOCK_TRAILER = struct.Struct('<QQ4s')
+BLOCK_SIZE = 1_048_576
+RESTART_INTERVAL = 16
+
+
+class BlockReader:
+    """
+    Random access to the blocks of a file written by `compress_blocks()`.
+    """
+    def __init__(self, source: BinaryIO):
+        """
+        Args:
+            source: Seekable binary file object, left open.
+
+        Raises:
+            ValueError: If source is not a block-mode file.
+        """
+        self.source = source
+        header = source.read(BLOCK_HEADER.size)
+        if len(header) < BLOCK_HEADER.size:
+            raise ValueError("File too short for Lempel-Ziv block header")
+        (magic, version, self.window_bits, dictionary,
+         self.block_size, self.restart_interval) = BLOCK_HEADER.unpack(header)
+        if magic != BLOCK_MAGIC:
+            raise ValueError("Not a Lempel-Ziv block file")
+        if version != BLOCK_VERSION:
+            raise ValueError(f"Unsupported Lempel-Ziv block file version: {version}")
+        self.dictionary = bool(dictionary)
+
+        source.seek(-BLOCK_TRAILER.size, os.SEEK_END)
+        index_offset, num_blocks, magic = BLOCK_TRAILER.unpack(source.read(BLOCK_TRAILER.size))
+        if magic != BLOCK_MAGIC:
+            raise ValueError("Lempel-Ziv block file has no index")
+        source.seek(index_offset)
+        index = source.read(num_blocks * BLOCK_INDEX_ENTRY.size)
+        self.offsets = [offset for offset, in BLOCK_INDEX_ENTRY.iter_unpack(index)]
+        self.offsets.append(index_offset)
+
+    def groups(self) -> list[range]:
+        """
+        Split blocks into runs which can be decoded independently.
+        """
+        step = self.restart_interval if self.dictionary else 1
+        return [range(start, min(start + step, len(self))) for start in range(0, len(self), step)]
+
+    def read_block(self, index: int) -> bytes:
+        """
+        Decode and return a single block.
+        """
+        if not 0 <= index < len(self):
+            raise IndexError(f"Block index out of range: {index}")
+        first = index - index % self.restart_interval if self.dictionary else index
+        history = bytearray()
+        for frame in self.read_frames(range(first, index + 1)):
+            data = _decode_frame(*frame, history, self.window_bits)
+        return data
+
+    def read_frames(self, blocks: range) -> list[tuple[bytes, int, int]]:
+        """
+        Read raw frames, as `(payload, size, crc)` tuples.
+        """
+        self.source.seek(self.offsets[blocks.start])
+        frames = []
+        for index in blocks:
+            frame = self.source.read(self.offsets[index + 1] - self.offsets[index])
+            size, _, crc = FRAME_HEADER.unpack_from(frame)
+            frames.append((frame[FRAME_HEADER.size:], size, crc))
+        return frames
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+
+def compress_blocks(
+    source: BinaryIO,
+    destination: BinaryIO,
+    block_size: int = BLOCK_SIZE,
+    dictionary: bool = False,
+    restart_interval: int = RESTART_INTERVAL,
+    max_workers: int|None = None,
+    window: int = WINDOW_SIZE,
+    lookahead: int = LOOKAHEAD_SIZE,
+    lazy: bool = True,
+    max_chain: int = MAX_CHAIN,
+) -> None:
+    """
+    Compress binary file object in blocks, across a pool of processes.
+
+    At most a couple of blocks per worker are held in memory at once.
+
+    Args:
+        source: Binary file object to read.
+        destination: Binary file object to write.
+        block_size: Bytes of input per block.
+        dictionary: Prime each block with the end of the one before it.
+        restart_interval: With a dictionary, leave every nth block unprimed.
+        max_workers: Size of process pool, defaults to CPU count.
+
+    See `tokenise()` for the other arguments.
+    """
+    # Check arguments early, rather than in the workers
+    MatchFinder(b'', window, lookahead, max_chain)
+    if restart_interval < 1:
+        raise ValueError(f"Restart interval must be positive, given {restart_interval}")
+    window_bits = window.bit_length() - 1
+    destination.write(BLOCK_HEADER.pack(
+        BLOCK_MAGIC, BLOCK_VERSION, window_bits, dictionary, block_size, restart_interval))
+
+    def jobs():
+        tail = b''
+        index = 0
+        while block := source.read(block_size):
+            if dictionary and index % restart_interval:
+                yield (tail + block, len(tail), window, lookahead, lazy, max_chain)
+            else:
+                yield (block, 0, window, lookahead, lazy, max_chain)
+            tail = block[-window:]
+            index += 1
+
+    offsets = []
+    position = BLOCK_HEADER.size
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        for frame in _ordered_map(executor, _encode_frame, jobs(), max_workers):
+            offsets.append(position)
+            destination.write(frame)
+            position += len(frame)
+
+    destination.write(b''.join(BLOCK_INDEX_ENTRY.pack(offset) for offset in offsets))
+    destination.write(BLOCK_TRAILER.pack(position, len(offsets), BLOCK_MAGIC))
+
+
+def decompress_blocks(source: BinaryIO, destination: BinaryIO, max_workers: int|None = None) -> None:
+    """
+    Decompress file written by `compress_blocks()`, across a pool of processes.
+
+    Args:
+        source: Seekable binary file object to read.
+        destination: Binary file object to write.
+        max_workers: Size of process pool, defaults to CPU count.
+
+    Raises:
+        ValueError: If source is not a valid block-mode file.
+    """
+    reader = BlockReader(source)
+    jobs = ((reader.read_frames(group), reader.window_bits) for group in reader.groups())
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        for data in _ordered_map(executor, _decode_frames, jobs, max_workers):
+            destination.write(data)
+
+
+def _decode_frame(
+        payload: bytes, size: int, crc: int, history: bytearray, window_bits: int) -> bytes:
+    """
+    Decode one frame's payload, returning its data.
+
+    Args:
+        payload: Frame after its header.
+        size: Length of data, from frame header.
+        crc: CRC-32 of data, from frame header.
+        history: Output so far. Extended, then trimmed to one window.
+        window_bits: Width of offsets.
+
+    Raises:
+        ValueError: If payload is corrupt.
+    """
+    bits_size = int.from_bytes(payload[:4], 'little')
+    reader = BitReader(payload[4:4 + bits_size])
+    read, read_gamma = reader.read, reader.read_gamma
+    literals = memoryview(payload)[4 + bits_size:]
+    literal_index = 0
+
+    output = history
+    start = len(output)
+    stop = start + size
+    while len(output) < stop:
+        if read(1):
+            length = read_gamma() + 2
+            offset = read(window_bits)
+            if not 0 < offset <= len(output):
+                raise ValueError("Corrupt Lempel-Ziv frame")
+            copy_start = len(output) - offset
+            if length <= offset:
+                output += output[copy_start:copy_start + length]
+            else:
+                pattern = output[copy_start:]
+                output += (pattern * (length // offset + 1))[:length]
+        else:
+            length = read_gamma()
+            output += literals[literal_index:literal_index + length]
+            literal_index += length
+
+    data = bytes(output[start:])
+    if len(data) != size or zlib.crc32(data) != crc:
+        raise ValueError("Lempel-Ziv frame failed CRC check")
+    del output[:max(0, len(output) - (1 << window_bits))]
+    return data
+
+
+def _decode_frames(frames: list[tuple[bytes, int, int]], window_bits: int) -> bytes:
+    """
+    Decode consecutive frames, each after the one before it.
+    """
+    history = bytearray()
+    return b''.join(
+        _decode_frame(payload, size, crc, history, window_bits)
+        for payload, size, crc in frames)
+
+
+def _encode_frame(
+        data: bytes, start: int, window: int, lookahead: int, lazy: bool, max_chain: int) -> bytes:
+    """
+    Encode `data[start:]` as one frame, header included.
+
+    Earlier data is history, which back-references may refer to.
+    """
+    writer = BitWriter()
+    write, write_gamma = writer.write, writer.write_gamma
+    window_bits = window.bit_length() - 1
+    literals = bytearray()
+    position = start
+    for offset, length in scan(data, start, window, lookahead, lazy, max_chain):
+        if offset:
+            write(1, 1)
+            write_gamma(length - 2)
+            write(offset, window_bits)
+        else:
+            write(0, 1)
+            write_gamma(length)
+            literals += data[position:position + length]
+        position += length
+
+    bits = writer.getvalue()
+    payload_size = 4 + len(bits) + len(literals)
+    header = FRAME_HEADER.pack(len(data) - start, payload_size, zlib.crc32(data[start:]))
+    return b''.join((header, len(bits).to_bytes(4, 'little'), bits, literals))
+
+
+def _ordered_map(
+        executor: Executor, function: Callable, jobs: Iterable[tuple], max_workers: int|None
+) -> Iterator:
+    """
+    Like `executor.map()`, but only submits a few jobs ahead of the results.
+
+    Keeps memory bounded when jobs carry large arguments.
+    """
+    prefetch = 2 * (max_workers or os.cpu_count() or 1)
+    pending: deque[Future] = deque()
+    for job in jobs:
+        pending.append(executor.submit(function, *job))
+        if len(pending) >= prefetch:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def _read_chunks(source: BinaryIO, chunk_size: int) -> Iterator[memoryview]:
+    """
+    Yield views of one reused buffer, filled from file object in turn.
+    """
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+    while size := source.readinto(buffer):
+        yield view[:size]
@@ -5,6 +5,8 @@ Reservoir sampling.
 
 Select a random element from a sequence of unknown length in only one pass.
 """
+from itertools import islice
+import math
 import random
 
 
@@ -34,6 +36,50 @@ def reservoir_samples(sequence, num_samples=10):
     return samples
 
 
+def reservoir_samples_skip(sequence, num_samples=10, rng=None):
+    """
+    Select samples as `reservoir_samples()`, but skip over most elements.
+
+    Uses Algorithm L, from Li, "Reservoir-Sampling Algorithms of Time
+    Complexity O(n(1 + log(N/n)))" (1994). Rather than drawing a random
+    number for every element, it draws the number of elements to skip before
+    the next replacement, from a geometric distribution. Skipped elements
+    are consumed by `itertools.islice()`, without any Python-level work, and
+    only about `num_samples * (1 + log(N / num_samples))` random numbers
+    are needed in total.
+
+    sequence
+        Sequence of elements with unknown length, ie. from generator.
+
+    num_samples
+        Number of samples to collect.
+
+    rng
+        Optional `random.Random` instance, for repeatable results.
+    """
+    rng = random if rng is None else rng
+    iterator = iter(sequence)
+    samples = list(islice(iterator, num_samples))
+    if len(samples) < num_samples or not num_samples:
+        return samples
+
+    def uniform():
+        # Open interval (0, 1), as the logarithm of zero is undefined
+        while not (value := rng.random()):
+            pass
+        return value
+
+    missing = object()
+    weight = math.exp(math.log(uniform()) / num_samples)
+    while True:
+        skip = math.floor(math.log(uniform()) / math.log1p(-weight))
+        element = next(islice(iterator, skip, None), missing)
+        if element is missing:
+            return samples
+        samples[rng.randrange(num_samples)] = element
+        weight *= math.exp(math.log(uniform()) / num_samples)
+
+
 if __name__ == '__main__':
     import sys
 
@@ -46,7 +92,7 @@ if __name__ == '__main__':
 
     # Sample lines from text file
     with open(path, 'rt') as f:
-        samples = reservoir_samples(f, num_samples=30)
+        samples = reservoir_samples_skip(f, num_samples=30)
 
     # Show results
     for line in sorted(samples):
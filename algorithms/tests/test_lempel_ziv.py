@@ -1,8 +1,18 @@
 
-from pprint import pprint as pp
-from unittest import skip, TestCase
+import io
+from pathlib import Path
+from random import Random
+from unittest import TestCase
 
-from ..lempel_ziv import look_back, Token, tokenise, untokenise
+from ..lempel_ziv import (
+    BitReader, BitWriter, BlockReader, compress, compress_blocks,
+    compress_file, Compressor, decompress, decompress_blocks, decompress_file,
+    Decompressor, look_back, lzw_tokenise, lzw_untokenise, MatchFinder, Token,
+    tokenise, untokenise,
+)
+
+
+SCRABBLE = Path(__file__).parents[2] / 'data' / 'scrabble.txt'
 
 
 # ~ def load_tests(loader, tests, ignore):
@@ -14,11 +24,55 @@ class LookBackTest(TestCase):
     def test_empty(self) -> None:
         self.assertIsNone(look_back('', ''))
 
-    @skip('todo')
     def test_easy(self) -> None:
         index = look_back('t', 'Hamlet')
         self.assertEqual(index, 1)
 
+    def test_docstring(self) -> None:
+        self.assertEqual(look_back('a', 'Bubba'), 1)
+        self.assertEqual(look_back('ub', 'Bubba'), 4)
+        self.assertIsNone(look_back('Z', 'Bubba'))
+
+    def test_most_recent(self) -> None:
+        self.assertEqual(look_back('b', 'Bubba'), 2)
+
+    def test_max_length(self) -> None:
+        self.assertEqual(look_back('ub', 'Bubba', max_length=4), 4)
+        self.assertIsNone(look_back('ub', 'Bubba', max_length=3))
+
+
+class MatchFinderTest(TestCase):
+    def test_finds_longest(self) -> None:
+        data = 'abcdXabcdeYabcdeZ'
+        finder = MatchFinder(data)
+        for position in range(11):
+            finder.insert(position)
+        self.assertEqual(finder.find(11), (6, 5))
+
+    def test_no_match(self) -> None:
+        finder = MatchFinder('abcdef')
+        for position in range(3):
+            finder.insert(position)
+        self.assertEqual(finder.find(3), (0, 0))
+
+    def test_window(self) -> None:
+        data = 'abc' + 'x' * 20 + 'abc'
+        finder = MatchFinder(data, window=16)
+        for position in range(23):
+            finder.insert(position)
+        self.assertEqual(finder.find(23), (0, 0))
+
+    def test_lookahead(self) -> None:
+        data = 'abcdefgh' * 2
+        finder = MatchFinder(data, lookahead=5)
+        for position in range(8):
+            finder.insert(position)
+        self.assertEqual(finder.find(8), (8, 5))
+
+    def test_window_power_of_two(self) -> None:
+        with self.assertRaises(ValueError):
+            MatchFinder('', window=1000)
+
 
 class TokenTest(TestCase):
     def test_repr(self) -> None:
@@ -35,17 +89,134 @@ class TokeniseTest(TestCase):
         tokens = tokenise('')
         self.assertEqual(tokens, [])
 
-    @skip('todo')
     def test_single_character(self) -> None:
         string = 't'
         tokens = tokenise(string)
         self.assertEqual(tokens, [Token(0, 1, 't')])
 
-    @skip('todo')
     def test_soliloquy(self) -> None:
         string = 'to be or not to be'
         tokens = tokenise(string)
-        pp(tokens)
+        self.assertEqual(tokens, [Token(0, 13, 'to be or not '), Token(13, 5)])
+
+    def test_overlapping(self) -> None:
+        tokens = tokenise('a' * 11 + 'b')
+        self.assertEqual(tokens, [Token(0, 1, 'a'), Token(1, 10), Token(0, 1, 'b')])
+
+    def test_lazy(self) -> None:
+        # Greedy takes 'abc' at 'abcdef', lazy waits for 'bcdef'
+        string = 'abcXXbcdefYYabcdef'
+        greedy = tokenise(string, lazy=False)
+        lazy = tokenise(string, lazy=True)
+        self.assertEqual(greedy[1:], [Token(12, 3), Token(8, 3)])
+        self.assertEqual(lazy, [Token(0, 13, 'abcXXbcdefYYa'), Token(8, 5)])
+
+    def test_lookahead(self) -> None:
+        tokens = tokenise('x' * 100, lookahead=10)
+        self.assertEqual(tokens[0], Token(0, 1, 'x'))
+        self.assertTrue(all(token.length <= 10 for token in tokens))
+
+
+class RoundTripHarness:
+    """
+    Check that tokenising then untokenising gives back the input.
+
+    Mixed into a `TestCase` for each tokeniser, which must define
+    `round_trip(data, **kwargs)`, and runs every check once per set of
+    keyword arguments in `variants`.
+    """
+    variants: tuple[dict, ...] = ({},)
+
+    def check(self, data) -> None:
+        for kwargs in self.variants:
+            with self.subTest(**kwargs):
+                self.assertEqual(self.round_trip(data, **kwargs), data)
+
+    def test_single_character(self) -> None:
+        self.check('t')
+        self.check(b't')
+
+    def test_repetitive(self) -> None:
+        self.check('a' * 1000)
+        self.check(b'abc' * 1000 + b'abd')
+
+    def test_text(self) -> None:
+        self.check(SCRABBLE.read_text()[:20_000])
+
+    def test_unicode(self) -> None:
+        self.check('naïve café, ñandú; 東京 ' * 100)
+
+    def test_bytes(self) -> None:
+        self.check(SCRABBLE.read_bytes()[:20_000])
+
+    def test_random_bytes(self) -> None:
+        random = Random(1)
+        self.check(bytes(random.choice(b'ab') for _ in range(5000)))
+        self.check(random.randbytes(5000))
+
+
+class RoundTripTest(RoundTripHarness, TestCase):
+    variants = ({'lazy': False}, {'lazy': True}, {'window': 64, 'lookahead': 4})
+
+    def round_trip(self, data, **kwargs):
+        return untokenise(tokenise(data, **kwargs))
+
+    def test_compresses(self) -> None:
+        text = SCRABBLE.read_text()[:20_000]
+        tokens = tokenise(text)
+        literals = sum(token.length for token in tokens if token.literal is not None)
+        self.assertLess(literals, len(text) // 4)
+
+
+class LZWRoundTripTest(RoundTripHarness, TestCase):
+    variants = (
+        {},
+        {'max_size': 16, 'reset': 'reset'},
+        {'max_size': 16, 'reset': 'freeze'},
+    )
+
+    def round_trip(self, data, **kwargs):
+        codes = lzw_tokenise(data, **kwargs)
+        return lzw_untokenise(codes, isinstance(data, str), **kwargs)
+
+
+class LZWTest(TestCase):
+    def test_empty(self) -> None:
+        self.assertEqual(lzw_tokenise(''), [])
+        self.assertEqual(lzw_untokenise([]), '')
+        self.assertEqual(lzw_untokenise([], text=False), b'')
+
+    def test_codes(self) -> None:
+        # Classic example: 24 characters become 16 codes
+        codes = lzw_tokenise(b'TOBEORNOTTOBEORTOBEORNOT')
+        self.assertEqual(codes, [
+            84, 79, 66, 69, 79, 82, 78, 79, 84, 256, 258, 260, 265, 259, 261, 263])
+
+    def test_phrase_defined_by_itself(self) -> None:
+        codes = lzw_tokenise(b'aaaaaa')
+        self.assertEqual(codes, [97, 256, 257])
+        self.assertEqual(lzw_untokenise(codes, text=False), b'aaaaaa')
+
+    def test_max_size(self) -> None:
+        data = SCRABBLE.read_bytes()[:20_000]
+        for reset in ('freeze', 'reset'):
+            codes = lzw_tokenise(data, max_size=100, reset=reset)
+            self.assertLess(max(codes), 256 + 100)
+
+    def test_reset_adapts(self) -> None:
+        # A frozen dictionary keeps only phrases from the first half
+        data = b'ab' * 500 + b'xyz' * 500
+        frozen = lzw_tokenise(data, max_size=32, reset='freeze')
+        reset = lzw_tokenise(data, max_size=32, reset='reset')
+        self.assertLess(len(reset), len(frozen) / 2)
+
+    def test_invalid_code(self) -> None:
+        with self.assertRaises(ValueError):
+            lzw_untokenise([97, 300], text=False)
+
+    def test_invalid_policy(self) -> None:
+        with self.assertRaises(ValueError):
+            lzw_tokenise('abc', reset='sometimes')
 
 
 class UntokeniseTest(TestCase):
@@ -58,3 +229,184 @@ class UntokeniseTest(TestCase):
         tokens = [Token(0, 1, 't')]
         string = untokenise(tokens)
         self.assertEqual(string, 't')
+
+    def test_back_reference(self) -> None:
+        tokens = [Token(0, 5, 'Bubba'), Token(4, 2), Token(3, 6)]
+        self.assertEqual(untokenise(tokens), 'Bubbaubaubaub')
+
+    def test_bytes(self) -> None:
+        tokens = [Token(0, 2, b'ab'), Token(2, 5)]
+        self.assertEqual(untokenise(tokens), b'abababa')
+
+
+class BitPackingTest(TestCase):
+    def test_round_trip(self) -> None:
+        random = Random(1)
+        values = [(random.getrandbits(width), width) for width in range(1, 40)] * 3
+        gammas = [random.randint(1, 1 << random.randint(0, 30)) for _ in range(100)]
+        writer = BitWriter()
+        for (value, width), gamma in zip(values, gammas):
+            writer.write(value, width)
+            writer.write_gamma(gamma)
+
+        reader = BitReader(writer.getvalue())
+        for (value, width), gamma in zip(values, gammas):
+            self.assertEqual(reader.read(width), value)
+            self.assertEqual(reader.read_gamma(), gamma)
+
+    def test_gamma_size(self) -> None:
+        writer = BitWriter()
+        writer.write_gamma(1)
+        writer.write_gamma(5)
+        # One bit, then five bits
+        self.assertEqual(writer.getvalue(), bytes([0b011001]))
+
+
+class StreamTest(TestCase):
+    def test_empty(self) -> None:
+        self.assertEqual(decompress(compress(b'')), b'')
+
+    def test_round_trip(self) -> None:
+        data = SCRABBLE.read_bytes()[:50_000]
+        compressed = compress(data)
+        self.assertLess(len(compressed), len(data) // 2)
+        self.assertEqual(decompress(compressed), data)
+
+    def test_matches_across_frames(self) -> None:
+        data = Random(2).randbytes(3000) * 4
+        compressed = compress(data, frame_size=1000, window=4096)
+        self.assertLess(len(compressed), 4000)
+        self.assertEqual(decompress(compressed), data)
+
+    def test_incompressible(self) -> None:
+        data = Random(3).randbytes(20_000)
+        compressed = compress(data)
+        self.assertLess(len(compressed), len(data) * 1.01)
+        self.assertEqual(decompress(compressed), data)
+
+    def test_piece_by_piece(self) -> None:
+        data = SCRABBLE.read_bytes()[:10_000]
+        compressor = Compressor(frame_size=999, window=1024)
+        pieces = [compressor.compress(memoryview(data)[start:start + 77])
+                  for start in range(0, len(data), 77)]
+        pieces.append(compressor.flush())
+        compressed = b''.join(pieces)
+
+        decompressor = Decompressor()
+        output = b''.join(decompressor.decompress(compressed[index:index + 1])
+                          for index in range(len(compressed)))
+        self.assertTrue(decompressor.eof)
+        self.assertEqual(output, data)
+
+    def test_unused_data(self) -> None:
+        decompressor = Decompressor()
+        self.assertEqual(decompressor.decompress(compress(b'hello') + b'extra'), b'hello')
+        self.assertTrue(decompressor.eof)
+        self.assertEqual(decompressor.unused_data, b'extra')
+
+    def test_max_length(self) -> None:
+        data = bytes(100_000)
+        compressed = compress(data, frame_size=1000)
+        decompressor = Decompressor()
+        output = decompressor.decompress(compressed, 2500)
+        self.assertEqual(len(output), 2500)
+        self.assertFalse(decompressor.needs_input)
+        self.assertFalse(decompressor.eof)
+        # Only enough frames were decoded to fill the request
+        self.assertLess(len(decompressor._output), 1000)
+
+        while not decompressor.needs_input and not decompressor.eof:
+            piece = decompressor.decompress(b'', 2500)
+            self.assertLessEqual(len(piece), 2500)
+            output += piece
+        self.assertTrue(decompressor.eof)
+        self.assertEqual(output, data)
+
+    def test_needs_input(self) -> None:
+        compressed = compress(b'hello, world')
+        decompressor = Decompressor()
+        self.assertEqual(decompressor.decompress(compressed[:5], 5), b'')
+        self.assertTrue(decompressor.needs_input)
+        self.assertEqual(decompressor.decompress(compressed[5:], 5), b'hello')
+        self.assertFalse(decompressor.needs_input)
+        self.assertEqual(decompressor.decompress(b'', 5), b', wor')
+        self.assertEqual(decompressor.decompress(b''), b'ld')
+        self.assertTrue(decompressor.eof)
+
+    def test_files(self) -> None:
+        data = SCRABBLE.read_bytes()[:30_000]
+        compressed = io.BytesIO()
+        compress_file(io.BytesIO(data), compressed, chunk_size=4096, frame_size=8192)
+        output = io.BytesIO()
+        decompress_file(io.BytesIO(compressed.getvalue()), output, chunk_size=1000)
+        self.assertEqual(output.getvalue(), data)
+
+    def test_not_a_stream(self) -> None:
+        with self.assertRaises(ValueError):
+            decompress(b'PK\x03\x04 not ours')
+
+    def test_truncated(self) -> None:
+        compressed = compress(b'to be or not to be')
+        with self.assertRaises(ValueError):
+            decompress(compressed[:-1])
+
+    def test_corrupt(self) -> None:
+        compressed = bytearray(compress(b'to be or not to be, that is the question'))
+        # Flip a bit in the literals at the end of the only frame
+        compressed[-20] ^= 1
+        with self.assertRaises(ValueError):
+            decompress(compressed)
+
+
+class BlockModeTest(TestCase):
+    block_size = 4000
+
+    def compress(self, data, **kwargs) -> bytes:
+        output = io.BytesIO()
+        compress_blocks(
+            io.BytesIO(data), output, block_size=self.block_size, max_workers=2, **kwargs)
+        return output.getvalue()
+
+    def check(self, data, **kwargs) -> None:
+        compressed = self.compress(data, **kwargs)
+        output = io.BytesIO()
+        decompress_blocks(io.BytesIO(compressed), output, max_workers=2)
+        self.assertEqual(output.getvalue(), data)
+
+        reader = BlockReader(io.BytesIO(compressed))
+        self.assertEqual(len(reader), -(-len(data) // self.block_size))
+        for index in range(len(reader)):
+            start = index * self.block_size
+            self.assertEqual(reader.read_block(index), data[start:start + self.block_size])
+
+    def test_independent(self) -> None:
+        self.check(SCRABBLE.read_bytes()[:30_000])
+
+    def test_dictionary(self) -> None:
+        self.check(SCRABBLE.read_bytes()[:30_000], dictionary=True, restart_interval=3)
+
+    def test_empty(self) -> None:
+        self.check(b'')
+
+    def test_dictionary_improves_ratio(self) -> None:
+        # Every block repeats the one before, which only a dictionary can see
+        data = Random(4).randbytes(self.block_size) * 6
+        independent = self.compress(data)
+        primed = self.compress(data, dictionary=True, window=8192)
+        self.assertLess(len(primed), len(independent) / 2)
+
+    def test_groups(self) -> None:
+        data = b'x' * (self.block_size * 7)
+        reader = BlockReader(io.BytesIO(self.compress(data)))
+        self.assertEqual(len(reader.groups()), 7)
+        reader = BlockReader(io.BytesIO(self.compress(data, dictionary=True, restart_interval=3)))
+        self.assertEqual(reader.groups(), [range(0, 3), range(3, 6), range(6, 7)])
+
+    def test_read_block_range(self) -> None:
+        reader = BlockReader(io.BytesIO(self.compress(b'abc')))
+        with self.assertRaises(IndexError):
+            reader.read_block(1)
+
+    def test_not_block_file(self) -> None:
+        with self.assertRaises(ValueError):
+            BlockReader(io.BytesIO(compress(b'stream, not blocks')))
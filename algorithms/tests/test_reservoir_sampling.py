@@ -0,0 +1,89 @@
+from random import Random
+from unittest import TestCase
+
+from ..reservoir_sampling import reservoir_samples, reservoir_samples_skip
+
+
+# Chi-squared critical value for 49 degrees of freedom, at p = 0.001
+CHI_SQUARED_49 = 85.35
+
+
+class CountingRandom(Random):
+    """
+    Count calls to `random()`, which every other method here is built on.
+    """
+    calls = 0
+
+    def random(self):
+        self.calls += 1
+        return super().random()
+
+
+class ReservoirSamplesTest(TestCase):
+    def test_short_sequence(self) -> None:
+        self.assertEqual(reservoir_samples(range(3), num_samples=5), [0, 1, 2])
+
+    def test_num_samples(self) -> None:
+        samples = reservoir_samples(range(1000), num_samples=10)
+        self.assertEqual(len(set(samples)), 10)
+
+
+class ReservoirSamplesSkipTest(TestCase):
+    def test_short_sequence(self) -> None:
+        self.assertEqual(reservoir_samples_skip(range(3), num_samples=5), [0, 1, 2])
+        self.assertEqual(reservoir_samples_skip(range(5), num_samples=5), [0, 1, 2, 3, 4])
+
+    def test_no_samples(self) -> None:
+        self.assertEqual(reservoir_samples_skip(range(10), num_samples=0), [])
+
+    def test_num_samples(self) -> None:
+        samples = reservoir_samples_skip(range(100_000), num_samples=30, rng=Random(1))
+        self.assertEqual(len(set(samples)), 30)
+        self.assertTrue(all(0 <= sample < 100_000 for sample in samples))
+
+    def test_generator(self) -> None:
+        lines = (f"line {index}" for index in range(1000))
+        samples = reservoir_samples_skip(lines, num_samples=3, rng=Random(2))
+        self.assertEqual(len(samples), 3)
+        self.assertTrue(all(sample.startswith('line ') for sample in samples))
+
+    def test_repeatable(self) -> None:
+        first = reservoir_samples_skip(range(10_000), rng=Random(3))
+        second = reservoir_samples_skip(range(10_000), rng=Random(3))
+        self.assertEqual(first, second)
+
+    def test_skips(self) -> None:
+        rng = CountingRandom(4)
+        reservoir_samples_skip(range(1_000_000), num_samples=10, rng=rng)
+        # About 3 * 10 * (1 + log(100,000)) calls, not a million
+        self.assertLess(rng.calls, 1000)
+
+    def test_uniform(self) -> None:
+        """
+        Every element is equally likely to be chosen, by chi-squared test.
+        """
+        rng = Random(5)
+        population, num_samples, trials = 50, 5, 20_000
+        counts = [0] * population
+        for _ in range(trials):
+            for sample in reservoir_samples_skip(range(population), num_samples, rng=rng):
+                counts[sample] += 1
+
+        expected = trials * num_samples / population
+        chi_squared = sum((count - expected) ** 2 / expected for count in counts)
+        self.assertLess(chi_squared, CHI_SQUARED_49)
+
+    def test_uniform_positions(self) -> None:
+        """
+        Late elements are as likely as early ones, in a longer stream.
+        """
+        rng = Random(6)
+        population, trials = 10_000, 5_000
+        buckets = [0] * 50
+        for _ in range(trials):
+            for sample in reservoir_samples_skip(range(population), 2, rng=rng):
+                buckets[sample * 50 // population] += 1
+
+        expected = trials * 2 / 50
+        chi_squared = sum((count - expected) ** 2 / expected for count in buckets)
+        self.assertLess(chi_squared, CHI_SQUARED_49)
@@ -0,0 +1,81 @@
+"""
+Whole-array `BitArray` operations versus a loop over every bit.
+
+    $ python3 -m structures.benchmarks.bitarray [NUM_BITS]
+"""
+
+from random import Random
+import sys
+
+from ..bitarray import BitArray
+from . import timed
+
+
+def random_bits(length, seed):
+    bits = BitArray(length)
+    bits.data[:] = Random(seed).randbytes(len(bits.data))
+    return bits
+
+
+def loop_or(a, b):
+    result = BitArray(len(a))
+    for index in range(len(a)):
+        result[index] = a[index] or b[index]
+    return result
+
+
+def loop_count(a):
+    return sum(1 for index in range(len(a)) if a[index])
+
+
+def loop_set_bits(a):
+    return [index for index in range(len(a)) if a[index]]
+
+
+def loop_fill(length, start, stop):
+    result = BitArray(length)
+    for index in range(start, stop):
+        result[index] = True
+    return result
+
+
+def loop_copy(a, start, stop):
+    result = BitArray(stop - start)
+    for index in range(start, stop):
+        result[index - start] = a[index]
+    return result
+
+
+def fill(length, start, stop):
+    result = BitArray(length)
+    result[start:stop] = True
+    return result
+
+
+def main(length):
+    a = random_bits(length, 1)
+    b = random_bits(length, 2)
+    print(f"{length:,} bits")
+
+    rows = (
+        ('a | b', lambda: loop_or(a, b), lambda: a | b),
+        ('count()', lambda: loop_count(a), a.count),
+        ('iter_set_bits()', lambda: loop_set_bits(a), lambda: list(a.iter_set_bits())),
+        ('ba[3:-3] = True', lambda: loop_fill(length, 3, length - 3),
+            lambda: fill(length, 3, length - 3)),
+        ('ba[3:-3]', lambda: loop_copy(a, 3, length - 3), lambda: a[3:length - 3]),
+    )
+    for name, loop, whole in rows:
+        expected, loop_seconds = timed(loop)
+        result, whole_seconds = timed(whole)
+        if isinstance(expected, BitArray):
+            assert expected.data == result.data
+        else:
+            assert expected == result
+        print(f"{name:<16} loop {loop_seconds * 1000:>9.1f} ms   "
+              f"whole {whole_seconds * 1000:>9.3f} ms   "
+              f"x{loop_seconds / whole_seconds:,.0f}")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,59 @@
+"""
+`Trie.fuzzy()` versus computing edit distance to every word in the list.
+
+    $ python3 -m structures.benchmarks.fuzzy [WORD_LIST]
+"""
+
+import sys
+
+from ..dawg import Dawg
+from ..trie import Trie
+from . import timed
+
+
+QUERIES = ('recieve', 'pythno', 'zymurgy', 'antidisestablishmentarianism')
+
+
+def levenshtein(a, b):
+    """
+    Edit distance between two strings, one row of the table at a time.
+    """
+    row = list(range(len(b) + 1))
+    for i, x in enumerate(a, 1):
+        previous, row = row, [i]
+        for j, y in enumerate(b, 1):
+            row.append(min(row[j - 1] + 1, previous[j] + 1, previous[j - 1] + (x != y)))
+    return row[-1]
+
+
+def brute_force(words, query, max_distance):
+    matches = []
+    for word in words:
+        distance = levenshtein(query, word)
+        if distance <= max_distance:
+            matches.append((word, distance))
+    return matches
+
+
+def main(path):
+    with open(path, 'rt') as fp:
+        words = sorted({line.strip().lower() for line in fp} - {''})
+    trie = Trie.from_words(words)
+    dawg = Dawg.from_words(words)
+    print(f"{len(words):,} words from {path}")
+
+    for max_distance in (1, 2):
+        for query in QUERIES:
+            expected, brute_seconds = timed(brute_force, words, query, max_distance)
+            found, trie_seconds = timed(lambda: list(trie.fuzzy(query, max_distance)))
+            assert found == expected, (found, expected)
+            _, dawg_seconds = timed(lambda: list(dawg.fuzzy(query, max_distance)))
+            print(f"k={max_distance} {query:<30} {len(found):>3} matches   "
+                  f"brute force {brute_seconds * 1000:>8.1f} ms   "
+                  f"Trie {trie_seconds * 1000:>6.1f} ms   "
+                  f"Dawg {dawg_seconds * 1000:>6.1f} ms   "
+                  f"x{brute_seconds / trie_seconds:,.0f}")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1] if len(sys.argv) > 1 else 'data/scrabble.txt')
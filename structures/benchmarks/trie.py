@@ -0,0 +1,80 @@
+"""
+Load time and memory of the word-list structures, and of saved snapshots.
+
+    $ python3 -m structures.benchmarks.trie [WORD_LIST]
+
+Load time is measured on its own, as tracing slows building down several
+times over. Memory is then the peak traced by `tracemalloc` while building
+again, which includes the Python objects making up each structure, not just
+its buffers. Both are also given relative to `Trie`.
+"""
+
+import gc
+import os
+from random import Random
+import sys
+import tempfile
+import tracemalloc
+
+from ..dawg import Dawg
+from ..trie import RadixTrie, Trie
+from . import timed
+
+
+def measure(cls, words):
+    """
+    Build structure from words, returning it, its load time and peak memory.
+    """
+    _, seconds = timed(cls.from_words, words)
+    tracemalloc.start()
+    try:
+        structure = cls.from_words(words)
+        size, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return structure, seconds, size, peak
+
+
+def main(path):
+    with open(path, 'rt') as fp:
+        words = fp.readlines()
+    print(f"{len(words):,} words from {path}")
+
+    shuffled = words[:]
+    Random(1).shuffle(shuffled)
+    rows = (
+        ('Trie', Trie, words),
+        ('RadixTrie', RadixTrie, words),
+        ('RadixTrie, shuffled', RadixTrie, shuffled),
+        ('Dawg', Dawg, words),
+    )
+    baseline = None
+    for name, cls, ordered in rows:
+        structure, seconds, size, peak = measure(cls, ordered)
+        assert all(structure.is_word(word.strip()) for word in words[::97])
+        if baseline is None:
+            baseline = (seconds, size)
+        print(f"{name:<20} load {seconds * 1000:>8.1f} ms ({seconds / baseline[0]:>4.2f}x)   "
+              f"size {size / 1e6:>7.2f} MB ({size / baseline[1]:>4.2f}x)   "
+              f"peak {peak / 1e6:>7.2f} MB")
+        # Free it, or garbage collection while building the next one will
+        # keep walking its objects, slowing that down
+        del structure
+        gc.collect()
+
+    with tempfile.TemporaryDirectory() as folder:
+        snapshot = os.path.join(folder, 'words.dawg')
+        Trie.from_words(words).save(snapshot)
+        _, parse_seconds = timed(Trie.from_file, path)
+        _, rebuild_seconds = timed(Trie.from_snapshot, snapshot)
+        mapped, map_seconds = timed(Trie.load, snapshot)
+        with mapped:
+            assert all(mapped.is_word(word.strip()) for word in words[::97])
+        print(f"Trie.from_file() {parse_seconds * 1000:>8.1f} ms   "
+              f"Trie.from_snapshot() {rebuild_seconds * 1000:>8.1f} ms   "
+              f"Trie.load() {map_seconds * 1000:>6.3f} ms   "
+              f"file {os.path.getsize(snapshot) / 1e6:.2f} MB")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1] if len(sys.argv) > 1 else 'data/scrabble.txt')
@@ -1,11 +1,207 @@
 
+from array import array
+from bisect import bisect_right
 import math
+import mmap
+import operator
+import os
+
+
+# Offsets of the set bits in every possible byte value
+_BYTE_BITS = tuple(
+    tuple(offset for offset in range(8) if byte & (1 << offset))
+    for byte in range(256)
+)
+
+# Rank index granularity, in bits. Blocks are one 64-byte cache line.
+BLOCK_BITS = 512
+SUPERBLOCK_BITS = 65_536
+
+# Bytes copied at a time when iterating, so mapped files are never read whole
+CHUNK_SIZE = 65_536
+
+FILE_MODES = {
+    'r': mmap.ACCESS_READ,
+    'r+': mmap.ACCESS_WRITE,
+    'w+': mmap.ACCESS_WRITE,
+    'c': mmap.ACCESS_COPY,
+}
 
 
 class BitArray:
+    """
+    Array of bits, packed eight to a byte, least-significant bit first.
+
+    Whole-array operations convert the buffer into Python integers using
+    `int.from_bytes()`, so that the work is done in C rather than in a loop
+    over every bit. They work a chunk at a time, so that even huge arrays
+    backed by a file (see `open()`) are never copied into memory whole.
+    """
     def __init__(self, length):
         self.length = length
         self.data = bytearray(math.ceil(self.length/8))
+        self._rank_index = None
+
+    @classmethod
+    def open(cls, path, length, mode='r+'):
+        """
+        Create array backed by a memory-mapped file, rather than a bytearray.
+
+        The file holds just the raw bytes, `ceil(length / 8)` of them. Pages
+        are only read when touched, and changes are shared with every other
+        process mapping the same file. Call `flush()` to write changes to disk,
+        and `close()` when finished.
+
+        Args:
+            path: Path to file.
+            length: Number of bits.
+            mode:
+                'r' read-only, 'r+' read-write, 'c' copy-on-write, or 'w+' to
+                create a new, sparse file, or truncate an existing one.
+
+        Raises:
+            ValueError: If mode invalid, or file has the wrong size.
+        """
+        try:
+            access = FILE_MODES[mode]
+        except KeyError:
+            raise ValueError(f"Invalid mode {mode!r}, expected one of {list(FILE_MODES)}")
+
+        bits = cls(0)
+        bits.length = length
+        size = math.ceil(length / 8)
+        with open(path, 'w+b' if mode == 'w+' else 'r+b' if mode == 'r+' else 'rb') as fp:
+            if mode == 'w+':
+                fp.truncate(size)
+            elif os.fstat(fp.fileno()).st_size != size:
+                raise ValueError(f"{length:,} bits needs a file of {size:,} bytes: {path}")
+            if size:
+                bits.data = mmap.mmap(fp.fileno(), size, access=access)
+        return bits
+
+    @classmethod
+    def frombytes(cls, data, length=None):
+        """
+        Create new array from a copy of the given bytes.
+
+        Args:
+            data: Bytes-like object.
+            length: Number of bits, defaults to eight per byte.
+        """
+        if length is None:
+            length = len(data) * 8
+        bits = cls(length)
+        if len(data) != len(bits.data):
+            raise ValueError(f"{length} bits needs {len(bits.data)} bytes, given {len(data)}")
+        bits.data[:] = data
+        if length & 7:
+            bits.data[-1] &= (1 << (length & 7)) - 1
+        return bits
+
+    @classmethod
+    def from_indexes(cls, length, indexes):
+        """
+        Create new array with only the bits at the given indexes set.
+        """
+        bits = cls(length)
+        data = bits.data
+        for index in indexes:
+            if not 0 <= index < length:
+                raise IndexError(f'{cls.__name__} index out of range')
+            data[index >> 3] |= 1 << (index & 7)
+        return bits
+
+    def all(self):
+        """
+        Are all bits set?
+        """
+        return all(number == mask for _, number, mask in self._iter_ints())
+
+    def any(self):
+        """
+        Is any bit set?
+        """
+        return any(number for _, number, _ in self._iter_ints())
+
+    def close(self):
+        """
+        Flush and unmap file opened by `open()`. Does nothing otherwise.
+        """
+        if isinstance(self.data, mmap.mmap) and not self.data.closed:
+            self.flush()
+            self.data.close()
+
+    def count(self, value=True):
+        """
+        Count the number of bits that equal `value`, ie. the population count.
+        """
+        ones = sum(number.bit_count() for _, number, _ in self._iter_ints())
+        return ones if value else self.length - ones
+
+    def fill(self, value=True, start=0, stop=None):
+        """
+        Set every bit in `range(start, stop)` to `value`.
+
+        Whole bytes are overwritten at once, only the partial bytes at either
+        end are updated bit by bit.
+        """
+        self._rank_index = None
+        start, stop, _ = slice(start, stop).indices(self.length)
+        if start >= stop:
+            return
+
+        data = self.data
+        first, last = start >> 3, (stop - 1) >> 3
+        if first == last:
+            masks = [((1 << (stop - start)) - 1) << (start & 7)]
+            ends = [first]
+        else:
+            fill = b'\xff' if value else b'\x00'
+            data[first + 1:last] = fill * (last - first - 1)
+            masks = [(0xFF << (start & 7)) & 0xFF, 0xFF >> (7 - ((stop - 1) & 7))]
+            ends = [first, last]
+
+        for index, mask in zip(ends, masks):
+            if value:
+                data[index] |= mask
+            else:
+                data[index] &= ~mask & 0xFF
+
+    def flush(self):
+        """
+        Write changes to file opened by `open()`. Does nothing otherwise.
+        """
+        if isinstance(self.data, mmap.mmap):
+            self.data.flush()
+
+    def find_first(self, value=True):
+        """
+        Return index of the first bit that equals `value`, or -1 if none.
+        """
+        for start, number, mask in self._iter_ints():
+            if not value:
+                number ^= mask
+            if number:
+                return start * 8 + (number & -number).bit_length() - 1
+        return -1
+
+    def iter_set_bits(self):
+        """
+        Iterate over the indexes of set bits, in ascending order.
+
+        Zero bytes are skipped without examining their bits.
+        """
+        length = self.length
+        for start, chunk in self._iter_chunks():
+            if chunk.count(0) == len(chunk):
+                continue
+            for index, byte in enumerate(chunk, start):
+                if byte:
+                    base = index * 8
+                    for offset in _BYTE_BITS[byte]:
+                        if base + offset >= length:
+                            return
+                        yield base + offset
 
     def iter_string(self):
         """
@@ -17,11 +213,18 @@ class BitArray:
         may be less than 8 characters long.
         """
         last, fragment = divmod(self.length, 8)
-        for index, byte in enumerate(self.data):
-            string = format(byte, '0>8b')
-            if index == last:
-                string = string[:fragment]
-            yield string
+        for start, chunk in self._iter_chunks():
+            for index, byte in enumerate(chunk, start):
+                string = format(byte, '0>8b')
+                if index == last:
+                    string = string[:fragment]
+                yield string
+
+    def invalidate(self):
+        """
+        Discard rank index. Only needed after changing `data` directly.
+        """
+        self._rank_index = None
 
     def num_bytes(self):
         """
@@ -29,21 +232,239 @@ class BitArray:
         """
         return len(self.data)
 
+    def rank(self, index):
+        """
+        Number of set bits before `index`, ie. in `range(0, index)`.
+
+        Runs in constant time, using a rank index that is built on first use
+        and discarded whenever the array is changed. The index holds absolute
+        counts for every superblock of 65,536 bits and relative 16-bit counts
+        for every 512-bit block, about 3% extra memory.
+        """
+        if not 0 <= index <= self.length:
+            raise IndexError(f'{self.__class__.__name__} index out of range')
+        superblocks, blocks, _ = self._get_rank_index()
+        block, remainder = divmod(index, BLOCK_BITS)
+        count = superblocks[index // SUPERBLOCK_BITS] + blocks[block]
+        start = block * (BLOCK_BITS // 8)
+        full, bits = divmod(remainder, 8)
+        count += int.from_bytes(self.data[start:start + full], 'little').bit_count()
+        if bits:
+            count += (self.data[start + full] & ((1 << bits) - 1)).bit_count()
+        return count
+
+    def select(self, rank):
+        """
+        Index of the set bit with the given `rank`, counting from zero.
+
+        The inverse of `rank()`, so that `rank(select(k)) == k`. Uses binary
+        searches over the rank index, so runs in logarithmic time.
+        """
+        superblocks, blocks, total = self._get_rank_index()
+        if not 0 <= rank < total:
+            raise IndexError(f'{self.__class__.__name__} rank out of range')
+
+        superblock = bisect_right(superblocks, rank) - 1
+        rank -= superblocks[superblock]
+        per_superblock = SUPERBLOCK_BITS // BLOCK_BITS
+        low = superblock * per_superblock
+        high = min(low + per_superblock, len(blocks))
+        block = bisect_right(blocks, rank, low, high) - 1
+        rank -= blocks[block]
+
+        index = block * (BLOCK_BITS // 8)
+        while True:
+            byte = self.data[index]
+            offsets = _BYTE_BITS[byte]
+            if rank < len(offsets):
+                return index * 8 + offsets[rank]
+            rank -= len(offsets)
+            index += 1
+
+    def tobytes(self):
+        """
+        Return copy of data as bytes.
+        """
+        return bytes(self.data)
+
+    def _check_length(self, other):
+        if not isinstance(other, BitArray):
+            raise TypeError(f"Expected {self.__class__.__name__}, given {type(other).__name__}")
+        if other.length != self.length:
+            raise ValueError(f"Lengths differ: {self.length} and {other.length}")
+
+    def _get_slice(self, key):
+        start, stop, step = key.indices(self.length)
+        if step != 1:
+            return self.from_indexes(
+                len(range(start, stop, step)),
+                (index for index, bit in enumerate(range(start, stop, step)) if self[bit]))
+
+        length = max(0, stop - start)
+        bits = self.__class__(length)
+        if not length:
+            return bits
+        chunk = self.data[start >> 3:(stop + 7) >> 3]
+        if start & 7:
+            number = int.from_bytes(chunk, 'little') >> (start & 7)
+            chunk = number.to_bytes(len(chunk), 'little')
+        bits.data[:] = chunk[:len(bits.data)]
+        if length & 7:
+            bits.data[-1] &= (1 << (length & 7)) - 1
+        return bits
+
+    def _set_slice(self, key, value):
+        start, stop, step = key.indices(self.length)
+        if not isinstance(value, BitArray):
+            if not isinstance(value, int):
+                raise TypeError(
+                    f"Can only assign bool or {self.__class__.__name__} to slice, "
+                    f"given {type(value).__name__}")
+            if step == 1:
+                self.fill(value, start, stop)
+            else:
+                for index in range(start, stop, step):
+                    self[index] = value
+            return
+
+        indexes = range(start, stop, step)
+        if len(value) != len(indexes):
+            raise ValueError(
+                f"Cannot assign {len(value)} bits to slice of {len(indexes)} bits")
+        if step != 1:
+            for index, bit in zip(indexes, range(len(value))):
+                self[index] = value[bit]
+            return
+        if not indexes:
+            return
+
+        # Splice into affected bytes as an integer, keeping bits either side
+        first, last = start >> 3, (stop + 7) >> 3
+        chunk = int.from_bytes(self.data[first:last], 'little')
+        shift = start & 7
+        mask = ((1 << len(value)) - 1) << shift
+        incoming = (value._to_int() << shift) & mask
+        chunk = (chunk & ~mask) | incoming
+        self.data[first:last] = chunk.to_bytes(last - first, 'little')
+        self._rank_index = None
+
+    def _combine(self, other, function, out):
+        """
+        Write `function(self, other)` into `out`, a chunk at a time.
+        """
+        self._check_length(other)
+        data = out.data
+        for start, chunk in self._iter_chunks():
+            end = start + len(chunk)
+            number = function(
+                int.from_bytes(chunk, 'little'),
+                int.from_bytes(other.data[start:end], 'little'))
+            data[start:end] = number.to_bytes(len(chunk), 'little')
+        out._rank_index = None
+        return out
+
+    def _get_rank_index(self):
+        """
+        Build rank index, if needed.
+
+        Returns:
+            Tuple of superblock counts, block counts, and total set bits.
+        """
+        if self._rank_index is None:
+            superblocks = array('Q')
+            blocks = array('H')
+            view = memoryview(self.data)
+            step = BLOCK_BITS // 8
+            per_superblock = SUPERBLOCK_BITS // BLOCK_BITS
+            total = 0
+            for block, start in enumerate(range(0, len(view), step)):
+                if block % per_superblock == 0:
+                    superblocks.append(total)
+                blocks.append(total - superblocks[-1])
+                total += int.from_bytes(view[start:start + step], 'little').bit_count()
+            # Sentinel block, so that `rank(length)` needs no special case
+            if len(blocks) % per_superblock == 0:
+                superblocks.append(total)
+            blocks.append(total - superblocks[-1])
+            view.release()
+            self._rank_index = (superblocks, blocks, self.count())
+        return self._rank_index
+
+    def _iter_chunks(self):
+        """
+        Yield `(offset, bytes)` pairs covering data, a chunk at a time.
+
+        Iterating over an `mmap` directly produces bytes objects rather than
+        integers, and holding a `memoryview` would stop it from being closed.
+        """
+        data = self.data
+        for start in range(0, len(data), CHUNK_SIZE):
+            yield start, data[start:start + CHUNK_SIZE]
+
+    def _iter_ints(self):
+        """
+        Yield `(offset, number, mask)` for data, a chunk at a time.
+
+        Each chunk is converted to an integer, with any bits beyond the end of
+        the array cleared. The mask has every valid bit in the chunk set.
+        """
+        length = self.length
+        for start, chunk in self._iter_chunks():
+            valid = min(len(chunk) * 8, length - start * 8)
+            mask = (1 << valid) - 1
+            yield start, int.from_bytes(chunk, 'little') & mask, mask
+
+    def _to_int(self):
+        """
+        Whole array as a single integer, with bit `i` of the array as bit `i`.
+        """
+        return int.from_bytes(self.data, 'little')
+
+    def __and__(self, other):
+        return self._combine(other, operator.and_, self.__class__(self.length))
+
+    def __iand__(self, other):
+        return self._combine(other, operator.and_, self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
     def __getitem__(self, key):
         """
         Fetch value of bit at given `key` as boolean value.
+
+        Slices return a new `BitArray`.
         """
+        if isinstance(key, slice):
+            return self._get_slice(key)
         if key > self.length:
             raise IndexError(f'{self.__class__.__name__} index out of range')
         index, offset = divmod(key, 8)
         return True if (self.data[index] >> offset) & 1 else False
 
+    def __invert__(self):
+        bits = self.__class__(self.length)
+        data = bits.data
+        for start, number, mask in self._iter_ints():
+            size = (mask.bit_length() + 7) // 8
+            data[start:start + size] = (number ^ mask).to_bytes(size, 'little')
+        return bits
+
     def __len__(self):
         """
         Return the number of bits in the array.
         """
         return self.length
 
+    def __or__(self, other):
+        return self._combine(other, operator.or_, self.__class__(self.length))
+
+    def __ior__(self, other):
+        return self._combine(other, operator.or_, self)
+
     def __repr__(self):
         """
         Class name plus enough formatted data to fit on a line.
@@ -52,11 +473,19 @@ class BitArray:
         return "<{}:{}>".format(name, self.__str__()[:68])
 
     def __setitem__(self, key, value):
+        """
+        Set bit at `key`, or a slice to a single boolean or another `BitArray`.
+        """
+        if isinstance(key, slice):
+            self._set_slice(key, value)
+            return
+
         if key > self.length:
             raise IndexError(f'{self.__class__.__name__} index out of range')
 
         index, offset = divmod(key, 8)
         byte = self.data[index]
+        self._rank_index = None
 
         value = bool(value)
         if value:
@@ -80,3 +509,9 @@ class BitArray:
             if len(parts) > 8:
                 break
         return ''.join(parts)
+
+    def __xor__(self, other):
+        return self._combine(other, operator.xor, self.__class__(self.length))
+
+    def __ixor__(self, other):
+        return self._combine(other, operator.xor, self)
@@ -0,0 +1,581 @@
+"""
+Directed acyclic word graph, stored in a few flat buffers.
+
+A DAWG is a trie in which identical subtrees are merged, so that common
+suffixes (eg. '-ing', '-ness', '-s') are stored just once, as well as common
+prefixes. It is built in a single pass over sorted words, using the
+incremental algorithm from Daciuk, Mihov, Watson & Watson, "Incremental
+Construction of Minimal Acyclic Finite-State Automata" (2000).
+
+Once built the graph is flattened, with the edges of each node stored
+contiguously and sorted by label:
+
+    * `first_edge`, array of unsigned ints. The edges of node `n` are those
+      from `first_edge[n]` up to `first_edge[n + 1]`. Node zero is the root.
+    * `labels`, bytes. One byte per edge, an index into `alphabet`.
+    * `targets`, array of unsigned ints. The node each edge leads to.
+    * `finals`, bytes. One byte per node, non-zero if a word ends there.
+
+`save()` writes these buffers to a file, after a short header, and `open()`
+maps them back into memory. A mapped graph is queried in place, without
+reading or parsing anything up-front, and every process that opens the same
+file shares one copy in the page cache:
+
+    +--------+------------+---------+--------+--------+----------+---------+--------+
+    | header | first_edge | targets | labels | finals | alphabet | weights | counts |
+    +--------+------------+---------+--------+--------+----------+---------+--------+
+
+Integers are little-endian, and the header is 32 bytes long so that the
+arrays that follow are aligned. The last two sections are optional, for
+`top()`. `weights` holds one double per word, in sorted word order, and
+`counts` the number of words reachable from each node. Counting past the
+words before a node gives the index of its first word, and the words below
+it take up the next `counts[node]` entries of `weights`.
+"""
+
+from array import array
+import heapq
+from itertools import islice
+import mmap
+import struct
+import sys
+
+from .trie import Trie, _fuzzy_search
+
+
+FILE_MAGIC = b'DAWG'
+FILE_VERSION = 1
+# Magic, version, alphabet size in bytes, words, nodes, edges, and whether
+# weights and counts follow. Files written before weights were added have a zero there.
+FILE_HEADER = struct.Struct('<4sHHQII?')
+FILE_HEADER_SIZE = 32
+
+# Weights per block in the best-first search of `Dawg.top()`
+TOP_BLOCK = 64
+
+
+class Dawg:
+    """
+    Compact, read-only alternative to `Trie`.
+
+    Supports the same queries, including `top()` if built with weights, but
+    stores the scrabble word list in around a megabyte, rather than tens of
+    megabytes.
+    """
+    def __init__(
+        self, alphabet, first_edge, labels, targets, finals, num_words, weights=None,
+        counts=None,
+    ):
+        self.alphabet = alphabet
+        self.first_edge = first_edge
+        self.labels = labels
+        self.targets = targets
+        self.finals = finals
+        self.num_words = num_words
+        # Optional weight of every word, in sorted order, and number of words
+        # reachable from every node, both used only by `top()`
+        self.weights = weights
+        self.counts = counts
+        self._maxima = None
+        self._codes = {letter: bytes((code,)) for code, letter in enumerate(alphabet)}
+        # Offset of first label within `labels`, non-zero when mapped
+        self._label_base = 0
+        self._mmap = None
+
+    @classmethod
+    def from_file(cls, path):
+        """
+        Create new `Dawg` object from words in the given path.
+        """
+        return cls.from_words(Trie._read_file(path))
+
+    @classmethod
+    def from_words(cls, words, weights=None):
+        """
+        Create new `Dawg` object from given words.
+
+        Words are normalised as for `Trie`, then sorted, so they may be given
+        in any order.
+
+        Args:
+            words:
+                Iterable of words.
+            weights:
+                Optional iterable of numbers, one per word, kept in `weights`
+                in sorted word order. For repeated words the last one wins.
+
+        Raises:
+            ValueError:
+                If words use more than 256 distinct characters.
+        """
+        if weights is None:
+            words = sorted({word for word in (word.strip().lower() for word in words) if word})
+        else:
+            weighted = {}
+            for word, weight in zip(words, weights, strict=True):
+                if word := word.strip().lower():
+                    weighted[word] = weight
+            words = sorted(weighted)
+            weights = array('d', (weighted[word] for word in words))
+        alphabet = ''.join(sorted({letter for word in words for letter in word}))
+        if len(alphabet) > 256:
+            raise ValueError(f"Too many distinct characters: {len(alphabet)}")
+        first_edge, labels, targets, finals = _flatten(_build(words), alphabet)
+        counts = None if weights is None else _word_counts(first_edge, targets, finals)
+        return cls(alphabet, first_edge, labels, targets, finals, len(words), weights, counts)
+
+    @classmethod
+    def open(cls, path):
+        """
+        Open graph saved by `save()`, backed by a read-only memory map.
+
+        Raises:
+            ValueError: If file is not a compatible graph.
+
+        Returns:
+            New graph instance. Call `close()` when finished with it.
+        """
+        with open(path, 'rb') as fp:
+            header = fp.read(FILE_HEADER_SIZE)
+            if len(header) < FILE_HEADER_SIZE:
+                raise ValueError(f"File too short for word graph header: {path}")
+            magic, version, alphabet_size, num_words, num_nodes, num_edges, weighted = (
+                FILE_HEADER.unpack_from(header))
+            if magic != FILE_MAGIC:
+                raise ValueError(f"Not a word graph file: {path}")
+            if version != FILE_VERSION:
+                raise ValueError(f"Unsupported word graph file version: {version}")
+            mapped = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+
+        offsets = _file_offsets(num_nodes, num_edges, alphabet_size, num_words, weighted)
+        if len(mapped) != offsets[-1]:
+            mapped.close()
+            raise ValueError(f"Word graph file has wrong length: {path}")
+
+        view = memoryview(mapped)
+        first_edge, targets, labels, finals, alphabet, weights, counts = (
+            view[start:stop] for start, stop in zip(offsets, offsets[1:]))
+        alphabet = bytes(alphabet).decode('utf-8')
+        first_edge, targets = _uint_array(first_edge), _uint_array(targets)
+        if weighted:
+            weights, counts = _double_array(weights), _uint_array(counts)
+        else:
+            weights = counts = None
+
+        dawg = cls(alphabet, first_edge, mapped, targets, finals, num_words, weights, counts)
+        dawg._label_base = offsets[2]
+        dawg._mmap = mapped
+        return dawg
+
+    def close(self):
+        """
+        Release memory map, if graph was opened from a file.
+        """
+        if self._mmap is not None:
+            for buffer in (
+                    self.first_edge, self.targets, self.finals, self.weights, self.counts):
+                if isinstance(buffer, memoryview):
+                    buffer.release()
+            self._mmap.close()
+            self._mmap = None
+
+    def fuzzy(self, word, max_distance=1):
+        """
+        Yield `(word, distance)` for words within an edit distance of `word`.
+
+        As `Trie.fuzzy()`, with matches in lexicographic order.
+        """
+        return _fuzzy_search(word, max_distance, 0, self._edges, self.finals.__getitem__)
+
+    def is_word(self, word):
+        """
+        Does the whole `word` exist in graph?
+        """
+        node = self._prefix(word)
+        return node != -1 and bool(self.finals[node])
+
+    def is_prefix(self, word):
+        """
+        Is the given `word` found as prefix, or as whole word?
+        """
+        return bool(word) and self._prefix(word) != -1
+
+    def prefixes(self, prefix='', limit=None):
+        """
+        Yield full words that start with `prefix`, in lexicographic order.
+
+        Args:
+            prefix:
+                Start of words to find.
+            limit:
+                Maximum number of words to yield, or None for all of them.
+        """
+        node = self._prefix(prefix)
+        if node == -1:
+            return
+        yield from islice(self._generate_words(prefix, node), limit)
+
+    def top(self, prefix='', limit=10):
+        """
+        Yield `(word, weight)` for the heaviest words starting with `prefix`.
+
+        As `Trie.top()`, but the weights of the words below a node are a
+        contiguous run of `weights`, rather than stored in the graph, so
+        this is a best-first search of that run. Whole blocks of weights are
+        ranked by their maximum, and only split into words when they reach
+        the front of the queue.
+
+        Args:
+            prefix:
+                Start of words to find.
+            limit:
+                Maximum number of words to yield, or None for all of them.
+
+        Raises:
+            ValueError:
+                If the graph was built without weights.
+        """
+        if self.weights is None:
+            raise ValueError("Word graph was built without weights")
+        node, first = self._locate(prefix)
+        if node == -1:
+            return
+        weights, maxima = self.weights, self._block_maxima()
+        stop = first + self.counts[node]
+
+        # Heap of (-weight, index, size), of single words, or whole blocks
+        # ranked by their heaviest word. Index order is lexicographic order.
+        heap = []
+        index = first
+        while index < stop:
+            if index % TOP_BLOCK == 0 and index + TOP_BLOCK <= stop:
+                heap.append((-maxima[index // TOP_BLOCK], index, TOP_BLOCK))
+                index += TOP_BLOCK
+            else:
+                heap.append((-weights[index], index, 1))
+                index += 1
+        heapq.heapify(heap)
+
+        found = 0
+        while heap and (limit is None or found < limit):
+            weight, index, size = heapq.heappop(heap)
+            if size == 1:
+                yield self._word_at(prefix, node, index - first), -weight
+                found += 1
+                continue
+            for index in range(index, index + size):
+                heapq.heappush(heap, (-weights[index], index, 1))
+
+    def num_bytes(self):
+        """
+        Size of the flat buffers, in bytes.
+        """
+        return (len(self.first_edge) * self.first_edge.itemsize
+                + len(self.targets) * (self.targets.itemsize + 1)
+                + len(self.finals))
+
+    def save(self, path):
+        """
+        Write graph to `path`, in the format read by `open()`.
+        """
+        alphabet = self.alphabet.encode('utf-8')
+        header = FILE_HEADER.pack(
+            FILE_MAGIC,
+            FILE_VERSION,
+            len(alphabet),
+            self.num_words,
+            len(self.finals),
+            len(self.targets),
+            self.weights is not None,
+        )
+        base = self._label_base
+        with open(path, 'wb') as fp:
+            fp.write(header.ljust(FILE_HEADER_SIZE, b'\0'))
+            for numbers in (self.first_edge, self.targets):
+                fp.write(_uint_bytes(numbers))
+            fp.write(self.labels[base:base + len(self.targets)])
+            fp.write(self.finals)
+            fp.write(alphabet)
+            if self.weights is not None:
+                fp.write(_double_bytes(self.weights))
+                fp.write(_uint_bytes(self.counts))
+
+    def _block_maxima(self):
+        """
+        Greatest weight in each block of `TOP_BLOCK` words, found on first use.
+        """
+        if self._maxima is None:
+            weights = self.weights
+            self._maxima = array('d', (
+                max(weights[start:start + TOP_BLOCK])
+                for start in range(0, len(weights), TOP_BLOCK)))
+        return self._maxima
+
+    def _edges(self, node):
+        """
+        Yield `(letter, target)` for each edge out of node, in sorted order.
+        """
+        alphabet, labels, targets = self.alphabet, self.labels, self.targets
+        base = self._label_base
+        for edge in range(self.first_edge[node], self.first_edge[node + 1]):
+            yield alphabet[labels[base + edge]], targets[edge]
+
+    def _generate_words(self, prefix, node):
+        """
+        Yield whole words reachable from `node`, depth-first, in sorted order.
+        """
+        stack = [(prefix, node)]
+        while stack:
+            prefix, node = stack.pop()
+            if self.finals[node]:
+                yield prefix
+            stack.extend(
+                (prefix + letter, target)
+                for letter, target in reversed(list(self._edges(node))))
+
+    def _locate(self, word):
+        """
+        Return node reached by following `word`, and the index of its first
+        word in sorted order, or `(-1, 0)`.
+        """
+        codes, first_edge, labels, targets, counts, finals = (
+            self._codes, self.first_edge, self.labels, self.targets, self.counts, self.finals)
+        base = self._label_base
+        node = index = 0
+        for letter in word:
+            code = codes.get(letter)
+            if code is None:
+                return -1, 0
+            start = first_edge[node]
+            edge = labels.find(code, base + start, base + first_edge[node + 1])
+            if edge == -1:
+                return -1, 0
+            # Skip the word ending here, and those below earlier edges
+            index += finals[node] + sum(counts[target] for target in targets[start:edge - base])
+            node = targets[edge - base]
+        return node, index
+
+    def _prefix(self, word):
+        """
+        Return node reached by following `word` from root, or -1.
+        """
+        codes, first_edge, labels, targets = (
+            self._codes, self.first_edge, self.labels, self.targets)
+        base = self._label_base
+        node = 0
+        for letter in word:
+            code = codes.get(letter)
+            if code is None:
+                return -1
+            edge = labels.find(code, base + first_edge[node], base + first_edge[node + 1])
+            if edge == -1:
+                return -1
+            node = targets[edge - base]
+        return node
+
+    def _word_at(self, prefix, node, index):
+        """
+        Return the word with the given index among those below `node`.
+        """
+        counts, finals = self.counts, self.finals
+        while True:
+            if finals[node]:
+                if index == 0:
+                    return prefix
+                index -= 1
+            for letter, target in self._edges(node):
+                if index < counts[target]:
+                    prefix += letter
+                    node = target
+                    break
+                index -= counts[target]
+
+    def __contains__(self, word):
+        return self.is_word(word)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __iter__(self):
+        """
+        Yield every word, in sorted order.
+        """
+        return self._generate_words('', 0)
+
+    def __len__(self):
+        return self.num_words
+
+    def __repr__(self):
+        return (f"<{self.__class__.__qualname__}: {self.num_words:,} words, "
+                f"{len(self.finals):,} nodes, {len(self.targets):,} edges>")
+
+
+class _Node:
+    """
+    Mutable graph node, used only while building.
+    """
+    __slots__ = ('edges', 'final')
+
+    def __init__(self):
+        self.edges = {}
+        self.final = False
+
+    def signature(self):
+        """
+        Key equal for nodes whose subtrees are identical.
+
+        Children are always minimised before their parents, so they can be
+        compared by identity.
+        """
+        return (self.final, tuple((letter, id(child)) for letter, child in self.edges.items()))
+
+
+def _build(words):
+    """
+    Build minimal graph from sorted, unique words, returning root node.
+    """
+    root = _Node()
+    register = {}
+    # Path of (parent, letter, child) for the previous word, not yet minimised
+    unchecked = []
+
+    def minimise(depth):
+        while len(unchecked) > depth:
+            parent, letter, child = unchecked.pop()
+            parent.edges[letter] = register.setdefault(child.signature(), child)
+
+    previous = ''
+    for word in words:
+        common = 0
+        for a, b in zip(word, previous):
+            if a != b:
+                break
+            common += 1
+        minimise(common)
+
+        node = unchecked[-1][2] if unchecked else root
+        for letter in word[common:]:
+            child = _Node()
+            node.edges[letter] = child
+            unchecked.append((node, letter, child))
+            node = child
+        node.final = True
+        previous = word
+
+    minimise(0)
+    return root
+
+
+def _file_offsets(num_nodes, num_edges, alphabet_size, num_words=0, weighted=False):
+    """
+    Offsets of the start of each section of a saved file, then its end.
+    """
+    sizes = (
+        4 * (num_nodes + 1), 4 * num_edges, num_edges, num_nodes, alphabet_size,
+        8 * num_words * weighted, 4 * num_nodes * weighted)
+    offsets = [FILE_HEADER_SIZE]
+    for size in sizes:
+        offsets.append(offsets[-1] + size)
+    return offsets
+
+
+def _word_counts(first_edge, targets, finals):
+    """
+    Number of words reachable from each node, including any ending there.
+
+    Nodes may be shared, and are not numbered in topological order, so
+    this is a depth-first walk that finishes every child before its parent.
+    """
+    counts = array('I', bytes(4 * len(finals)))
+    done = bytearray(len(finals))
+    stack = [0]
+    while stack:
+        node = stack[-1]
+        if done[node]:
+            stack.pop()
+            continue
+        children = targets[first_edge[node]:first_edge[node + 1]]
+        pending = [child for child in children if not done[child]]
+        if pending:
+            stack.extend(pending)
+            continue
+        counts[node] = finals[node] + sum(counts[child] for child in children)
+        done[node] = 1
+        stack.pop()
+    return counts
+
+
+def _uint_array(view):
+    """
+    Read little-endian unsigned 32-bit integers, in place if possible.
+    """
+    if sys.byteorder == 'little':
+        return view.cast('I')
+    numbers = array('I')
+    numbers.frombytes(view)
+    numbers.byteswap()
+    return numbers
+
+
+def _double_array(view):
+    """
+    Read little-endian doubles, in place if possible.
+    """
+    if sys.byteorder == 'little':
+        return view.cast('d')
+    numbers = array('d')
+    numbers.frombytes(view)
+    numbers.byteswap()
+    return numbers
+
+
+def _double_bytes(numbers):
+    """
+    Pack doubles as little-endian bytes.
+    """
+    numbers = array('d', numbers)
+    if sys.byteorder != 'little':
+        numbers.byteswap()
+    return numbers.tobytes()
+
+
+def _uint_bytes(numbers):
+    """
+    Pack unsigned 32-bit integers as little-endian bytes.
+    """
+    numbers = array('I', numbers)
+    if sys.byteorder != 'little':
+        numbers.byteswap()
+    return numbers.tobytes()
+
+
+def _flatten(root, alphabet):
+    """
+    Number nodes breadth-first and pack their edges into flat buffers.
+
+    Returns:
+        Tuple of `(first_edge, labels, targets, finals)`.
+    """
+    codes = {letter: code for code, letter in enumerate(alphabet)}
+    numbers = {id(root): 0}
+    order = [root]
+    first_edge = array('I', [0])
+    labels = bytearray()
+    targets = array('I')
+    finals = bytearray()
+
+    for node in order:
+        for letter, child in node.edges.items():
+            number = numbers.get(id(child))
+            if number is None:
+                number = numbers[id(child)] = len(order)
+                order.append(child)
+            labels.append(codes[letter])
+            targets.append(number)
+        first_edge.append(len(targets))
+        finals.append(node.final)
+
+    return first_edge, bytes(labels), targets, bytes(finals)
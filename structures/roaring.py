@@ -0,0 +1,636 @@
+"""
+Compressed bitmap, after Roaring Bitmaps.
+
+See Chambi, Lemire, Kaser & Godin, "Better bitmap performance with Roaring
+bitmaps" (2016), and Lemire et al, "Consistently faster and smaller compressed
+bitmaps with Roaring" (2016) for run containers.
+
+The index space is split into chunks of 2^16 bits, keyed by the high bits of
+the index. Each chunk that has any bits set is stored in whichever container
+is smallest for its contents:
+
+    * `ArrayContainer`, a sorted array of 16-bit values, for sparse chunks.
+    * `BitmapContainer`, a plain 8 KiB bitmap, for dense chunks.
+    * `RunContainer`, sorted pairs of first and last values, for long runs.
+"""
+
+from array import array
+from bisect import bisect_left, bisect_right
+import math
+
+from .bitarray import _BYTE_BITS, BitArray
+
+
+CHUNK_BITS = 1 << 16
+CHUNK_BYTES = CHUNK_BITS // 8
+CHUNK_MASK = CHUNK_BITS - 1
+
+# Beyond this many values a bitmap is smaller than an array
+ARRAY_MAX = 4096
+
+
+def int_to_values(number):
+    """
+    Sorted list of the positions of the set bits in a chunk's integer.
+    """
+    values = []
+    data = number.to_bytes(CHUNK_BYTES, 'little')
+    # Skip empty 64-bit words, then look up each byte of the rest
+    for word_index, word in enumerate(array('Q', data)):
+        if word:
+            for index in range(word_index * 8, word_index * 8 + 8):
+                base = index * 8
+                values.extend(base + offset for offset in _BYTE_BITS[data[index]])
+    return values
+
+
+def best_container(number):
+    """
+    Build smallest container for the bits in a chunk's integer.
+
+    Returns:
+        New container, or None if no bits are set.
+    """
+    if not number:
+        return None
+    cardinality = number.bit_count()
+    starts = number & ~(number << 1)
+    num_runs = starts.bit_count()
+    sizes = {
+        ArrayContainer: 2 * cardinality,
+        BitmapContainer: CHUNK_BYTES,
+        RunContainer: 4 * num_runs,
+    }
+    cls = min(sizes, key=sizes.get)
+    return cls.from_int(number)
+
+
+class ArrayContainer:
+    """
+    Sorted array of 16-bit values.
+    """
+    def __init__(self, values=()):
+        self.values = array('H', values)
+
+    @classmethod
+    def from_int(cls, number):
+        return cls(int_to_values(number))
+
+    def add(self, value):
+        """
+        Add value, returning the container to use from now on.
+        """
+        values = self.values
+        index = bisect_left(values, value)
+        if index < len(values) and values[index] == value:
+            return self
+        values.insert(index, value)
+        if len(values) > ARRAY_MAX:
+            return BitmapContainer.from_int(self.to_int())
+        return self
+
+    def cardinality(self):
+        return len(self.values)
+
+    def contains(self, value):
+        values = self.values
+        index = bisect_left(values, value)
+        return index < len(values) and values[index] == value
+
+    def copy(self):
+        return self.__class__(self.values)
+
+    def discard(self, value):
+        """
+        Remove value, returning the container to use, or None if now empty.
+        """
+        values = self.values
+        index = bisect_left(values, value)
+        if index < len(values) and values[index] == value:
+            del values[index]
+        return self if values else None
+
+    def num_bytes(self):
+        return len(self.values) * self.values.itemsize
+
+    def rank(self, value):
+        """
+        Number of values less than `value`.
+        """
+        return bisect_left(self.values, value)
+
+    def select(self, rank):
+        return self.values[rank]
+
+    def to_int(self):
+        data = bytearray(CHUNK_BYTES)
+        for value in self.values:
+            data[value >> 3] |= 1 << (value & 7)
+        return int.from_bytes(data, 'little')
+
+    def __iter__(self):
+        return iter(self.values)
+
+
+class BitmapContainer:
+    """
+    Plain bitmap of 2^16 bits, with its cardinality kept up to date.
+    """
+    def __init__(self, data=None):
+        self.data = bytearray(CHUNK_BYTES) if data is None else bytearray(data)
+        self._cardinality = int.from_bytes(self.data, 'little').bit_count()
+
+    @classmethod
+    def from_int(cls, number):
+        return cls(number.to_bytes(CHUNK_BYTES, 'little'))
+
+    def add(self, value):
+        index, mask = value >> 3, 1 << (value & 7)
+        if not self.data[index] & mask:
+            self.data[index] |= mask
+            self._cardinality += 1
+        return self
+
+    def cardinality(self):
+        return self._cardinality
+
+    def contains(self, value):
+        return bool(self.data[value >> 3] & (1 << (value & 7)))
+
+    def copy(self):
+        return self.__class__(self.data)
+
+    def discard(self, value):
+        index, mask = value >> 3, 1 << (value & 7)
+        if self.data[index] & mask:
+            self.data[index] &= ~mask & 0xFF
+            self._cardinality -= 1
+            if self._cardinality <= ARRAY_MAX:
+                return best_container(self.to_int())
+        return self
+
+    def num_bytes(self):
+        return CHUNK_BYTES
+
+    def rank(self, value):
+        full, bits = value >> 3, value & 7
+        count = int.from_bytes(self.data[:full], 'little').bit_count()
+        if bits:
+            count += (self.data[full] & ((1 << bits) - 1)).bit_count()
+        return count
+
+    def select(self, rank):
+        for index, byte in enumerate(self.data):
+            offsets = _BYTE_BITS[byte]
+            if rank < len(offsets):
+                return index * 8 + offsets[rank]
+            rank -= len(offsets)
+        raise IndexError('rank out of range')
+
+    def to_int(self):
+        return int.from_bytes(self.data, 'little')
+
+    def __iter__(self):
+        return iter(int_to_values(self.to_int()))
+
+
+class RunContainer:
+    """
+    Runs of consecutive values, as parallel arrays of first and last values.
+    """
+    def __init__(self, starts=(), lasts=()):
+        self.starts = array('H', starts)
+        self.lasts = array('H', lasts)
+
+    @classmethod
+    def from_int(cls, number):
+        starts = int_to_values(number & ~(number << 1))
+        lasts = int_to_values(number & ~(number >> 1))
+        return cls(starts, lasts)
+
+    def add(self, value):
+        if self.contains(value):
+            return self
+        return best_container(self.to_int() | (1 << value))
+
+    def cardinality(self):
+        return sum(self.lasts) - sum(self.starts) + len(self.starts)
+
+    def contains(self, value):
+        index = bisect_right(self.starts, value) - 1
+        return index >= 0 and value <= self.lasts[index]
+
+    def copy(self):
+        return self.__class__(self.starts, self.lasts)
+
+    def discard(self, value):
+        if not self.contains(value):
+            return self
+        return best_container(self.to_int() & ~(1 << value))
+
+    def num_bytes(self):
+        return 2 * len(self.starts) * self.starts.itemsize
+
+    def rank(self, value):
+        count = 0
+        for start, last in zip(self.starts, self.lasts):
+            if start >= value:
+                break
+            count += min(last + 1, value) - start
+        return count
+
+    def select(self, rank):
+        for start, last in zip(self.starts, self.lasts):
+            size = last - start + 1
+            if rank < size:
+                return start + rank
+            rank -= size
+        raise IndexError('rank out of range')
+
+    def to_int(self):
+        number = 0
+        for start, last in zip(self.starts, self.lasts):
+            number |= ((1 << (last - start + 1)) - 1) << start
+        return number
+
+    def __iter__(self):
+        for start, last in zip(self.starts, self.lasts):
+            yield from range(start, last + 1)
+
+
+class RoaringBitArray:
+    """
+    Compressed alternative to `BitArray`, for sparse bitmaps or long runs.
+
+    Supports the same reads and writes as `BitArray`, plus fast union,
+    intersection and cardinality. Chunks with no bits set take no space.
+    """
+    def __init__(self, length):
+        self.length = length
+        self.containers = {}
+
+    @classmethod
+    def from_bitarray(cls, bits):
+        """
+        Compress an existing `BitArray`.
+        """
+        roaring = cls(len(bits))
+        for key, number in enumerate(_bitarray_chunks(bits)):
+            if container := best_container(number):
+                roaring.containers[key] = container
+        return roaring
+
+    @classmethod
+    def from_indexes(cls, length, indexes):
+        """
+        Create new array with only the bits at the given indexes set.
+        """
+        roaring = cls(length)
+        for index in indexes:
+            roaring[index] = True
+        return roaring
+
+    def all(self):
+        """
+        Are all bits set?
+        """
+        return self.count() == self.length
+
+    def any(self):
+        """
+        Is any bit set?
+        """
+        return bool(self.containers)
+
+    def count(self, value=True):
+        """
+        Count the number of bits that equal `value`.
+        """
+        ones = sum(container.cardinality() for container in self.containers.values())
+        return ones if value else self.length - ones
+
+    def fill(self, value=True, start=0, stop=None):
+        """
+        Set every bit in `range(start, stop)` to `value`.
+
+        Works on whole chunks at a time, so long ranges become run containers.
+        """
+        start, stop, _ = slice(start, stop).indices(self.length)
+        if start >= stop:
+            return
+        for key in range(start >> 16, ((stop - 1) >> 16) + 1):
+            base = key << 16
+            low = max(start, base) - base
+            high = min(stop, base + CHUNK_BITS) - base
+            mask = ((1 << (high - low)) - 1) << low
+            number = self._chunk_int(key)
+            self._put(key, number | mask if value else number & ~mask)
+
+    def find_first(self, value=True):
+        """
+        Return index of the first bit that equals `value`, or -1 if none.
+        """
+        if value:
+            if not self.containers:
+                return -1
+            key = min(self.containers)
+            return (key << 16) + next(iter(self.containers[key]))
+
+        for key in range(math.ceil(self.length / CHUNK_BITS)):
+            container = self.containers.get(key)
+            if container is None:
+                return key << 16
+            gaps = ~container.to_int() & self._chunk_mask(key)
+            if gaps:
+                return (key << 16) + (gaps & -gaps).bit_length() - 1
+        return -1
+
+    def iter_set_bits(self):
+        """
+        Iterate over the indexes of set bits, in ascending order.
+        """
+        for key in sorted(self.containers):
+            base = key << 16
+            for value in self.containers[key]:
+                yield base + value
+
+    def num_bytes(self):
+        """
+        Approximate size of the compressed data, in bytes.
+        """
+        return sum(container.num_bytes() + 4 for container in self.containers.values())
+
+    def rank(self, index):
+        """
+        Number of set bits before `index`, ie. in `range(0, index)`.
+
+        As `BitArray.rank()`, but without an index: sums the cardinalities of
+        the chunks before `index`, so runs in time linear in their number.
+        """
+        if not 0 <= index <= self.length:
+            raise IndexError(f'{self.__class__.__name__} index out of range')
+        high, low = index >> 16, index & CHUNK_MASK
+        count = sum(container.cardinality()
+                    for key, container in self.containers.items() if key < high)
+        container = self.containers.get(high)
+        if container is not None:
+            count += container.rank(low)
+        return count
+
+    def select(self, rank):
+        """
+        Index of the set bit with the given `rank`, counting from zero.
+
+        The inverse of `rank()`, so that `rank(select(k)) == k`.
+        """
+        if rank >= 0:
+            for key in sorted(self.containers):
+                container = self.containers[key]
+                cardinality = container.cardinality()
+                if rank < cardinality:
+                    return (key << 16) + container.select(rank)
+                rank -= cardinality
+        raise IndexError(f'{self.__class__.__name__} rank out of range')
+
+    def to_bitarray(self):
+        """
+        Decompress into a new `BitArray`.
+        """
+        bits = BitArray(self.length)
+        for key, container in self.containers.items():
+            start = key * CHUNK_BYTES
+            size = min(CHUNK_BYTES, len(bits.data) - start)
+            bits.data[start:start + size] = container.to_int().to_bytes(CHUNK_BYTES, 'little')[:size]
+        return bits
+
+    def tobytes(self):
+        """
+        Return data as bytes, in the same layout as `BitArray.tobytes()`.
+        """
+        return self.to_bitarray().tobytes()
+
+    def _check_index(self, index):
+        if not 0 <= index < self.length:
+            raise IndexError(f'{self.__class__.__name__} index out of range')
+
+    def _check_length(self, other):
+        if not isinstance(other, RoaringBitArray):
+            raise TypeError(f"Expected {self.__class__.__name__}, given {type(other).__name__}")
+        if other.length != self.length:
+            raise ValueError(f"Lengths differ: {self.length} and {other.length}")
+
+    def _chunk_int(self, key):
+        container = self.containers.get(key)
+        return 0 if container is None else container.to_int()
+
+    def _chunk_mask(self, key):
+        """
+        Integer with every valid bit in chunk set.
+        """
+        valid = min(CHUNK_BITS, self.length - (key << 16))
+        return (1 << valid) - 1
+
+    def _get_slice(self, key):
+        start, stop, step = key.indices(self.length)
+        if step != 1:
+            return self.from_indexes(
+                len(range(start, stop, step)),
+                (index for index, bit in enumerate(range(start, stop, step)) if self[bit]))
+
+        # Each chunk of the result straddles at most two chunks of this array
+        roaring = self.__class__(max(0, stop - start))
+        first, shift = start >> 16, start & CHUNK_MASK
+        for key in range(math.ceil(len(roaring) / CHUNK_BITS)):
+            number = self._chunk_int(first + key) >> shift
+            if shift:
+                number |= self._chunk_int(first + key + 1) << (CHUNK_BITS - shift)
+            roaring._put(key, number & roaring._chunk_mask(key))
+        return roaring
+
+    def _set_slice(self, key, value):
+        """
+        Copy bits of `value`, a `RoaringBitArray` or `BitArray`, into a range.
+        """
+        start, stop, _ = key.indices(self.length)
+        if isinstance(value, BitArray):
+            value = RoaringBitArray.from_bitarray(value)
+        elif not isinstance(value, RoaringBitArray):
+            raise TypeError(
+                f"Can only assign bool, BitArray or {self.__class__.__name__} to slice, "
+                f"given {type(value).__name__}")
+        elif value is self:
+            value = self._get_slice(slice(None))
+        length = max(0, stop - start)
+        if len(value) != length:
+            raise ValueError(f"Cannot assign {len(value)} bits to slice of {length} bits")
+
+        # Clear range, then shift each chunk of value into the one or two it straddles
+        self.fill(False, start, stop)
+        first, shift = start >> 16, start & CHUNK_MASK
+        low_bits = (1 << CHUNK_BITS) - 1
+        for key, container in value.containers.items():
+            number = container.to_int() << shift
+            self._put(first + key, self._chunk_int(first + key) | (number & low_bits))
+            if number >> CHUNK_BITS:
+                self._put(first + key + 1,
+                          self._chunk_int(first + key + 1) | (number >> CHUNK_BITS))
+
+    def _new(self, containers):
+        roaring = self.__class__(self.length)
+        roaring.containers = containers
+        return roaring
+
+    def _put(self, key, number):
+        container = best_container(number)
+        if container is None:
+            self.containers.pop(key, None)
+        else:
+            self.containers[key] = container
+
+    def _union(self, other, containers):
+        """
+        Merge `other` into `containers`, which must be owned by the result.
+
+        Containers taken from `other` are copied, so that later writes to the
+        result never change either operand.
+        """
+        self._check_length(other)
+        for key, theirs in other.containers.items():
+            ours = containers.get(key)
+            if ours is None:
+                containers[key] = theirs.copy()
+            elif (isinstance(ours, ArrayContainer) and isinstance(theirs, ArrayContainer)
+                    and ours.cardinality() + theirs.cardinality() <= ARRAY_MAX):
+                containers[key] = ArrayContainer(sorted(set(ours.values).union(theirs.values)))
+            else:
+                containers[key] = best_container(ours.to_int() | theirs.to_int())
+        return containers
+
+    def _intersection(self, other):
+        self._check_length(other)
+        containers = {}
+        for key in self.containers.keys() & other.containers.keys():
+            ours, theirs = self.containers[key], other.containers[key]
+            if isinstance(theirs, ArrayContainer):
+                ours, theirs = theirs, ours
+            if isinstance(ours, ArrayContainer):
+                values = [value for value in ours.values if theirs.contains(value)]
+                container = ArrayContainer(values) if values else None
+            else:
+                container = best_container(ours.to_int() & theirs.to_int())
+            if container is not None:
+                containers[key] = container
+        return containers
+
+    def _difference(self, other):
+        self._check_length(other)
+        containers = {}
+        for key in self.containers.keys() | other.containers.keys():
+            number = self._chunk_int(key) ^ other._chunk_int(key)
+            if container := best_container(number):
+                containers[key] = container
+        return containers
+
+    def __and__(self, other):
+        return self._new(self._intersection(other))
+
+    def __iand__(self, other):
+        self.containers = self._intersection(other)
+        return self
+
+    def __eq__(self, other):
+        if not isinstance(other, RoaringBitArray):
+            return NotImplemented
+        return (self.length == other.length
+                and self.containers.keys() == other.containers.keys()
+                and all(container.to_int() == other.containers[key].to_int()
+                        for key, container in self.containers.items()))
+
+    def __getitem__(self, key):
+        """
+        Fetch value of bit at given `key` as boolean value.
+
+        Slices return a new `RoaringBitArray`.
+        """
+        if isinstance(key, slice):
+            return self._get_slice(key)
+        self._check_index(key)
+        container = self.containers.get(key >> 16)
+        return container is not None and container.contains(key & CHUNK_MASK)
+
+    def __invert__(self):
+        containers = {}
+        for key in range(math.ceil(self.length / CHUNK_BITS)):
+            number = ~self._chunk_int(key) & self._chunk_mask(key)
+            if container := best_container(number):
+                containers[key] = container
+        return self._new(containers)
+
+    def __len__(self):
+        """
+        Return the number of bits in the array.
+        """
+        return self.length
+
+    def __or__(self, other):
+        containers = {key: container.copy() for key, container in self.containers.items()}
+        return self._new(self._union(other, containers))
+
+    def __ior__(self, other):
+        self._union(other, self.containers)
+        return self
+
+    def __repr__(self):
+        kinds = {}
+        for container in self.containers.values():
+            name = container.__class__.__name__
+            kinds[name] = kinds.get(name, 0) + 1
+        name = self.__class__.__qualname__
+        return f"<{name}: {self.count():,} of {self.length:,} bits set, {kinds}>"
+
+    def __setitem__(self, key, value):
+        """
+        Set single bit, or a slice (with no step) to a boolean or to the bits
+        of a `RoaringBitArray` or `BitArray` of the same length.
+        """
+        if isinstance(key, slice):
+            if key.step not in (None, 1):
+                raise ValueError(f"{self.__class__.__name__} slices cannot have a step")
+            if isinstance(value, int):
+                self.fill(value, key.start, key.stop)
+            else:
+                self._set_slice(key, value)
+            return
+
+        self._check_index(key)
+        high, low = key >> 16, key & CHUNK_MASK
+        container = self.containers.get(high)
+        if value:
+            if container is None:
+                container = ArrayContainer()
+            self.containers[high] = container.add(low)
+        elif container is not None:
+            container = container.discard(low)
+            if container is None:
+                del self.containers[high]
+            else:
+                self.containers[high] = container
+
+    def __xor__(self, other):
+        return self._new(self._difference(other))
+
+    def __ixor__(self, other):
+        self.containers = self._difference(other)
+        return self
+
+
+def _bitarray_chunks(bits):
+    """
+    Yield each 2^16-bit chunk of a `BitArray` as an integer.
+    """
+    data = bits.data
+    length = len(bits)
+    for start in range(0, len(data), CHUNK_BYTES):
+        number = int.from_bytes(data[start:start + CHUNK_BYTES], 'little')
+        valid = min(CHUNK_BITS, length - start * 8)
+        yield number & ((1 << valid) - 1)
@@ -1,9 +1,19 @@
 
+import os
+import tempfile
 from unittest import TestCase
 
+from .. import bitarray
 from ..bitarray import BitArray
 
 
+def make_bits(length, indexes):
+    bits = BitArray(length)
+    for index in indexes:
+        bits[index] = True
+    return bits
+
+
 class TestBitArray(TestCase):
     def test_empty(self):
         b = BitArray(0)
@@ -110,3 +120,317 @@ class TestBitArray(TestCase):
         b = BitArray(100)
         s = str(b)
         self.assertTrue(s.startswith('000000000000000000000'))
+
+
+class TestBitArrayWhole(TestCase):
+    def test_and(self):
+        a = make_bits(20, [1, 2, 3, 15])
+        b = make_bits(20, [2, 3, 4, 19])
+        self.assertEqual(list((a & b).iter_set_bits()), [2, 3])
+        a &= b
+        self.assertEqual(list(a.iter_set_bits()), [2, 3])
+
+    def test_or(self):
+        a = make_bits(20, [1, 2, 3, 15])
+        b = make_bits(20, [2, 3, 4, 19])
+        self.assertEqual(list((a | b).iter_set_bits()), [1, 2, 3, 4, 15, 19])
+        data = a.data
+        a |= b
+        self.assertIs(a.data, data)
+        self.assertEqual(list(a.iter_set_bits()), [1, 2, 3, 4, 15, 19])
+
+    def test_xor(self):
+        a = make_bits(20, [1, 2, 3, 15])
+        b = make_bits(20, [2, 3, 4, 19])
+        self.assertEqual(list((a ^ b).iter_set_bits()), [1, 4, 15, 19])
+        a ^= b
+        self.assertEqual(list(a.iter_set_bits()), [1, 4, 15, 19])
+
+    def test_invert(self):
+        a = make_bits(10, [0, 9])
+        inverted = ~a
+        self.assertEqual(list(inverted.iter_set_bits()), [1, 2, 3, 4, 5, 6, 7, 8])
+        self.assertEqual(inverted.data, bytearray([0b11111110, 0b00000001]))
+
+    def test_length_mismatch(self):
+        with self.assertRaises(ValueError):
+            BitArray(10) | BitArray(11)
+        with self.assertRaises(TypeError):
+            BitArray(10) & 0
+
+    def test_count(self):
+        a = make_bits(100, range(0, 100, 3))
+        self.assertEqual(a.count(), 34)
+        self.assertEqual(a.count(False), 66)
+        self.assertEqual(BitArray(0).count(), 0)
+
+    def test_any_all(self):
+        a = BitArray(12)
+        self.assertFalse(a.any())
+        self.assertFalse(a.all())
+        a[11] = True
+        self.assertTrue(a.any())
+        a = ~BitArray(12)
+        self.assertTrue(a.all())
+        self.assertTrue(BitArray(0).all())
+        self.assertFalse(BitArray(0).any())
+
+    def test_find_first(self):
+        a = make_bits(30, [17, 25])
+        self.assertEqual(a.find_first(), 17)
+        self.assertEqual(a.find_first(False), 0)
+        self.assertEqual((~a).find_first(False), 17)
+        self.assertEqual(BitArray(30).find_first(), -1)
+        self.assertEqual((~BitArray(30)).find_first(False), -1)
+
+    def test_small_chunks(self):
+        original, bitarray.CHUNK_SIZE = bitarray.CHUNK_SIZE, 3
+        self.addCleanup(setattr, bitarray, 'CHUNK_SIZE', original)
+        a = make_bits(100, [1, 30, 50, 99])
+        b = make_bits(100, [30, 60])
+        self.assertEqual(list((a | b).iter_set_bits()), [1, 30, 50, 60, 99])
+        self.assertEqual(list((a & b).iter_set_bits()), [30])
+        self.assertEqual((~a).count(), 96)
+        self.assertEqual(a.find_first(), 1)
+        self.assertEqual(make_bits(100, [99]).find_first(), 99)
+        self.assertEqual((~make_bits(100, [0, 1, 2, 3, 4, 5, 6, 7, 8, 9])).find_first(), 10)
+        self.assertFalse(BitArray(100).any())
+        self.assertTrue((~BitArray(100)).all())
+        self.assertEqual(len(''.join(a.iter_string())), 100)
+
+    def test_iter_set_bits(self):
+        indexes = [0, 7, 8, 63, 64, 99]
+        a = make_bits(100, indexes)
+        self.assertEqual(list(a.iter_set_bits()), indexes)
+        self.assertEqual(list(BitArray(100).iter_set_bits()), [])
+
+
+class TestBitArraySlices(TestCase):
+    def bools(self, bits):
+        return [bits[index] for index in range(len(bits))]
+
+    def test_get_slice(self):
+        indexes = [1, 5, 8, 9, 20, 33, 34, 35, 60]
+        bits = make_bits(64, indexes)
+        expected = self.bools(bits)
+        for start in range(0, 20):
+            for stop in range(start, 64, 3):
+                part = bits[start:stop]
+                self.assertEqual(len(part), stop - start)
+                self.assertEqual(self.bools(part), expected[start:stop])
+                self.assertEqual(part.count(), sum(expected[start:stop]))
+
+    def test_get_slice_step(self):
+        bits = make_bits(20, [0, 3, 6, 9, 10])
+        self.assertEqual(list(bits[::3].iter_set_bits()), [0, 1, 2, 3])
+        self.assertEqual(len(bits[::-1]), 20)
+        self.assertEqual(list(bits[::-1].iter_set_bits()), [9, 10, 13, 16, 19])
+
+    def test_fill(self):
+        for start in range(0, 20):
+            for stop in range(start, 40):
+                bits = BitArray(40)
+                bits.fill(True, start, stop)
+                self.assertEqual(list(bits.iter_set_bits()), list(range(start, stop)))
+                bits = ~BitArray(40)
+                bits.fill(False, start, stop)
+                self.assertEqual(bits.count(False), stop - start)
+
+    def test_fill_all(self):
+        bits = BitArray(1000)
+        bits.fill()
+        self.assertTrue(bits.all())
+        self.assertEqual(bits.data[-1], 0xFF)
+
+    def test_set_slice_bool(self):
+        bits = BitArray(10_000)
+        bits[10:9_000] = True
+        self.assertEqual(bits.count(), 8_990)
+        self.assertEqual(bits.find_first(), 10)
+        bits[100:200] = False
+        self.assertEqual(bits.count(), 8_890)
+        bits[::1000] = True
+        self.assertEqual(bits.count(), 8_892)
+
+    def test_set_slice_bitarray(self):
+        source = make_bits(13, [0, 4, 5, 12])
+        for start in range(0, 30):
+            bits = ~BitArray(50)
+            bits[start:start + 13] = source
+            expected = [True] * 50
+            expected[start:start + 13] = self.bools(source)
+            self.assertEqual(self.bools(bits), expected)
+
+    def test_set_slice_step(self):
+        bits = BitArray(10)
+        bits[::2] = make_bits(5, [0, 4])
+        self.assertEqual(list(bits.iter_set_bits()), [0, 8])
+
+    def test_set_slice_wrong_length(self):
+        bits = BitArray(10)
+        with self.assertRaises(ValueError):
+            bits[0:5] = BitArray(4)
+
+    def test_set_slice_wrong_type(self):
+        bits = BitArray(10)
+        for value in ([0] * 10, b'\x00\x00', '0000000000', None):
+            with self.assertRaises(TypeError):
+                bits[0:10] = value
+            with self.assertRaises(TypeError):
+                bits[::2] = value
+        self.assertFalse(bits.any())
+
+    def test_bytes(self):
+        bits = BitArray.frombytes(b'\x01\x80')
+        self.assertEqual(len(bits), 16)
+        self.assertEqual(list(bits.iter_set_bits()), [0, 15])
+        self.assertEqual(bits.tobytes(), b'\x01\x80')
+        self.assertEqual(len(BitArray.frombytes(b'\x01\x80', length=12)), 12)
+        with self.assertRaises(ValueError):
+            BitArray.frombytes(b'\x01\x80', length=20)
+
+    def test_bytes_partial(self):
+        # Bits past the end of the array are dropped
+        bits = BitArray.frombytes(b'\xff', length=4)
+        self.assertEqual(bits.tobytes(), b'\x0f')
+        self.assertEqual(bits.count(False), 0)
+        self.assertEqual((~bits).tobytes(), b'\x00')
+
+    def test_from_indexes(self):
+        bits = BitArray.from_indexes(100, {99, 0, 50})
+        self.assertEqual(list(bits.iter_set_bits()), [0, 50, 99])
+        with self.assertRaises(IndexError):
+            BitArray.from_indexes(100, [100])
+
+
+class TestBitArrayRankSelect(TestCase):
+    def check(self, bits):
+        indexes = list(bits.iter_set_bits())
+        for rank, index in enumerate(indexes):
+            self.assertEqual(bits.select(rank), index)
+            self.assertEqual(bits.rank(index), rank)
+            self.assertEqual(bits.rank(index + 1), rank + 1)
+        self.assertEqual(bits.rank(len(bits)), len(indexes))
+        with self.assertRaises(IndexError):
+            bits.select(len(indexes))
+
+    def test_empty(self):
+        bits = BitArray(0)
+        self.assertEqual(bits.rank(0), 0)
+        with self.assertRaises(IndexError):
+            bits.select(0)
+
+    def test_small(self):
+        bits = make_bits(20, [0, 3, 19])
+        self.assertEqual([bits.rank(i) for i in range(21)],
+                         [0, 1, 1, 1, 2] + [2] * 15 + [3])
+        self.check(bits)
+        with self.assertRaises(IndexError):
+            bits.rank(21)
+
+    def test_whole_blocks(self):
+        self.check(BitArray.from_indexes(1024, [0, 511, 512, 1023]))
+
+    def test_superblocks(self):
+        length = 3 * 65_536
+        indexes = list(range(0, 2 * 65_536, 997)) + [2 * 65_536 + 5, length - 1]
+        self.check(BitArray.from_indexes(length, indexes))
+        self.check(BitArray.from_indexes(length + 100, indexes))
+
+    def test_dense(self):
+        bits = BitArray(70_000)
+        bits.fill()
+        self.assertEqual(bits.rank(70_000), 70_000)
+        self.assertEqual(bits.select(65_536 + 17), 65_536 + 17)
+        self.assertEqual(bits.rank(65_536 + 512), 65_536 + 512)
+
+    def test_invalidated_by_writes(self):
+        bits = BitArray(1000)
+        self.assertEqual(bits.rank(1000), 0)
+        bits[500] = True
+        self.assertEqual(bits.rank(1000), 1)
+        bits.fill(True, 0, 10)
+        self.assertEqual(bits.rank(1000), 11)
+        bits[0:10] = BitArray(10)
+        self.assertEqual(bits.rank(1000), 1)
+        bits |= BitArray.from_indexes(1000, [1])
+        self.assertEqual(bits.select(0), 1)
+        bits.data[0] = 0
+        bits.invalidate()
+        self.assertEqual(bits.select(0), 500)
+
+    def test_index_size(self):
+        bits = BitArray(10_000_000)
+        bits.rank(0)
+        superblocks, blocks, _ = bits._rank_index
+        extra = superblocks.itemsize * len(superblocks) + blocks.itemsize * len(blocks)
+        self.assertLess(extra / bits.num_bytes(), 0.04)
+
+
+class TestBitArrayFile(TestCase):
+    def setUp(self):
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        self.path = os.path.join(folder.name, 'bits.bin')
+
+    def test_create_sparse(self):
+        length = 8 * 1024 * 1024 * 1024
+        with BitArray.open(self.path, length, 'w+') as bits:
+            self.assertEqual(len(bits), length)
+            self.assertEqual(bits.num_bytes(), 1024 * 1024 * 1024)
+            bits[length - 1] = True
+            bits[12345] = True
+        stat = os.stat(self.path)
+        self.assertEqual(stat.st_size, 1024 * 1024 * 1024)
+        self.assertLess(stat.st_blocks * 512, 1024 * 1024)
+
+    def test_round_trip(self):
+        with BitArray.open(self.path, 100, 'w+') as bits:
+            bits[3:90] = True
+            bits[50] = False
+        with open(self.path, 'rb') as fp:
+            self.assertEqual(len(fp.read()), 13)
+        with BitArray.open(self.path, 100, 'r') as bits:
+            self.assertEqual(bits.count(), 86)
+            self.assertFalse(bits[50])
+            with self.assertRaises(TypeError):
+                bits[0] = True
+
+    def test_operations(self):
+        indexes = [0, 7, 8, 77, 99]
+        with BitArray.open(self.path, 100, 'w+') as bits:
+            bits |= BitArray.from_indexes(100, indexes)
+            self.assertEqual(list(bits.iter_set_bits()), indexes)
+            self.assertEqual(''.join(bits.iter_string())[:16], '1000000100000001')
+            self.assertEqual(bits.count(), 5)
+            self.assertEqual(bits.find_first(False), 1)
+            self.assertEqual(bits.rank(80), 4)
+            self.assertEqual(bits.select(3), 77)
+            self.assertEqual(list(bits[5:10].iter_set_bits()), [2, 3])
+            self.assertEqual(bits.tobytes()[0], 0b10000001)
+            bits.fill(False, 0, 8)
+            bits ^= ~BitArray(100)
+            self.assertEqual(bits.count(), 97)
+            self.assertNotIsInstance(bits.data, bytearray)
+
+    def test_copy_on_write(self):
+        with BitArray.open(self.path, 16, 'w+') as bits:
+            bits[0] = True
+        with BitArray.open(self.path, 16, 'c') as bits:
+            bits[1] = True
+            self.assertEqual(bits.count(), 2)
+        with BitArray.open(self.path, 16) as bits:
+            self.assertEqual(bits.count(), 1)
+
+    def test_wrong_size(self):
+        with open(self.path, 'wb') as fp:
+            fp.write(bytes(10))
+        with self.assertRaisesRegex(ValueError, '2 bytes'):
+            BitArray.open(self.path, 16)
+        with self.assertRaisesRegex(ValueError, 'Invalid mode'):
+            BitArray.open(self.path, 80, 'w')
+
+    def test_empty(self):
+        with BitArray.open(self.path, 0, 'w+') as bits:
+            self.assertEqual(len(bits), 0)
+            self.assertEqual(bits.count(), 0)
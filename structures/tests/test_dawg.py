@@ -0,0 +1,173 @@
+import os
+from pathlib import Path
+from random import Random
+import tempfile
+from unittest import TestCase
+
+from ..dawg import Dawg
+
+
+SCRABBLE = Path(__file__).parents[2] / 'data' / 'scrabble.txt'
+
+
+class TestDawg(TestCase):
+    words = (
+        'apple',
+        'applecart',
+        'applecarts',
+        'applejack',
+        'applejacks',
+        'apples',
+        'applesauce',
+        'applesauces',
+    )
+
+    def test_is_word(self):
+        dawg = Dawg.from_words(self.words)
+        self.assertFalse(dawg.is_word('banana'))
+        self.assertFalse(dawg.is_word(''))
+
+        self.assertTrue(dawg.is_word('apple'))
+        self.assertFalse(dawg.is_word('appl'))
+
+        self.assertTrue(dawg.is_word('applejacks'))
+        self.assertTrue(dawg.is_word('applejack'))
+        self.assertFalse(dawg.is_word('applejac'))
+        self.assertIn('applesauce', dawg)
+
+    def test_is_prefix(self):
+        dawg = Dawg.from_words(self.words)
+        self.assertTrue(dawg.is_prefix('a'))
+        self.assertTrue(dawg.is_prefix('appl'))
+        self.assertTrue(dawg.is_prefix('apple'))
+
+        self.assertFalse(dawg.is_prefix(''))
+        self.assertFalse(dawg.is_prefix('appleton'))
+        self.assertFalse(dawg.is_prefix('banana'))
+
+    def test_iterate(self):
+        dawg = Dawg.from_words(reversed(self.words))
+        self.assertEqual(list(dawg), sorted(self.words))
+        self.assertEqual(len(dawg), len(self.words))
+
+    def test_normalises_words(self):
+        dawg = Dawg.from_words(['Apple\n', ' pie ', '', 'apple'])
+        self.assertEqual(list(dawg), ['apple', 'pie'])
+
+    def test_shares_suffixes(self):
+        # A trie would need nine nodes, but the 's' and its parent are shared
+        dawg = Dawg.from_words(['cats', 'dogs'])
+        self.assertEqual(len(dawg.finals), 7)
+
+    def test_empty(self):
+        dawg = Dawg.from_words([])
+        self.assertEqual(list(dawg), [])
+        self.assertFalse(dawg.is_word('a'))
+        self.assertFalse(dawg.is_prefix('a'))
+
+    def test_scrabble(self):
+        dawg = Dawg.from_file(SCRABBLE)
+        self.assertEqual(len(dawg), 172_820)
+        self.assertTrue(dawg.is_word('zymurgy'))
+        self.assertTrue(dawg.is_prefix('zymurg'))
+        self.assertFalse(dawg.is_word('zymurg'))
+        # Nested dictionaries take about 80MB
+        self.assertLess(dawg.num_bytes(), 2_000_000)
+
+    def test_fuzzy(self):
+        dawg = Dawg.from_words(self.words)
+        self.assertEqual(list(dawg.fuzzy('appel', 2)), [('apple', 2), ('apples', 2)])
+        self.assertEqual(list(dawg.fuzzy('applecarst', 1)), [('applecart', 1)])
+        self.assertEqual(list(dawg.fuzzy('banana', 2)), [])
+
+    def test_prefixes(self):
+        dawg = Dawg.from_words(self.words)
+        self.assertEqual(list(dawg.prefixes('b')), [])
+        self.assertEqual(list(dawg.prefixes('apples')),
+                         ['apples', 'applesauce', 'applesauces'])
+        self.assertEqual(list(dawg.prefixes('apple', limit=2)), ['apple', 'applecart'])
+
+
+class TestDawgFile(TestCase):
+    def setUp(self):
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        self.path = os.path.join(folder.name, 'words.dawg')
+
+    def test_round_trip(self):
+        words = ['apple', 'apples', 'banana', 'bananas', 'cherry']
+        Dawg.from_words(words).save(self.path)
+        with Dawg.open(self.path) as dawg:
+            self.assertEqual(list(dawg), words)
+            self.assertEqual(len(dawg), 5)
+            self.assertTrue(dawg.is_word('bananas'))
+            self.assertFalse(dawg.is_word('banan'))
+            self.assertTrue(dawg.is_prefix('banan'))
+            self.assertFalse(dawg.is_prefix('durian'))
+            self.assertEqual(list(dawg.prefixes('app')), ['apple', 'apples'])
+
+    def test_resave_mapped(self):
+        Dawg.from_words(['ant', 'bee', 'beetle']).save(self.path)
+        copy = self.path + '.copy'
+        with Dawg.open(self.path) as dawg:
+            dawg.save(copy)
+        with open(self.path, 'rb') as original, open(copy, 'rb') as saved:
+            self.assertEqual(original.read(), saved.read())
+
+    def test_weights(self):
+        # Odd alphabet length, so the weights are not 8-byte aligned
+        words = ['cherry', 'apple', 'banana', 'apple']
+        dawg = Dawg.from_words(words, [3, 1, 2.5, 4])
+        self.assertEqual(list(dawg.weights), [4.0, 2.5, 3.0])
+        dawg.save(self.path)
+        with Dawg.open(self.path) as dawg:
+            self.assertEqual(list(dawg), ['apple', 'banana', 'cherry'])
+            self.assertEqual(list(dawg.weights), [4.0, 2.5, 3.0])
+
+    def test_no_weights(self):
+        Dawg.from_words(['ant', 'bee']).save(self.path)
+        with Dawg.open(self.path) as dawg:
+            self.assertIsNone(dawg.weights)
+            with self.assertRaises(ValueError):
+                list(dawg.top())
+
+    def test_top(self):
+        # Enough words for whole blocks of weights, with many ties
+        rng = Random(3)
+        words = sorted({''.join(rng.choices('abc', k=rng.randrange(1, 9))) for _ in range(2000)})
+        weights = [rng.randrange(50) for _ in words]
+        Dawg.from_words(words, weights).save(self.path)
+        with Dawg.open(self.path) as dawg:
+            for prefix in ('', 'a', 'ab', 'cab', 'ccccc', 'd'):
+                expected = sorted(
+                    ((word, weight) for word, weight in zip(words, weights)
+                     if word.startswith(prefix)),
+                    key=lambda item: (-item[1], item[0]))
+                self.assertEqual(list(dawg.top(prefix, limit=None)), expected)
+                self.assertEqual(list(dawg.top(prefix, limit=5)), expected[:5])
+
+    def test_unicode(self):
+        words = ['café', 'naïve', 'ñandú']
+        Dawg.from_words(words).save(self.path)
+        with Dawg.open(self.path) as dawg:
+            self.assertEqual(list(dawg), words)
+            self.assertTrue(dawg.is_word('ñandú'))
+
+    def test_not_a_dawg(self):
+        with open(self.path, 'wb') as fp:
+            fp.write(b'\0' * 64)
+        with self.assertRaises(ValueError):
+            Dawg.open(self.path)
+
+    def test_truncated(self):
+        Dawg.from_words(['apple', 'banana']).save(self.path)
+        with open(self.path, 'r+b') as fp:
+            fp.truncate(os.path.getsize(self.path) - 1)
+        with self.assertRaises(ValueError):
+            Dawg.open(self.path)
+
+    def test_scrabble_size(self):
+        Dawg.from_file(SCRABBLE).save(self.path)
+        self.assertLess(os.path.getsize(self.path), 1_000_000)
+        with Dawg.open(self.path) as dawg:
+            self.assertTrue(dawg.is_word('zymurgy'))
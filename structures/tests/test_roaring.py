@@ -0,0 +1,294 @@
+from random import Random
+from unittest import TestCase
+
+from ..bitarray import BitArray
+from ..roaring import (
+    ARRAY_MAX, CHUNK_BITS, ArrayContainer, BitmapContainer, RoaringBitArray,
+    RunContainer,
+)
+
+
+def random_roaring(length, num_set, seed):
+    indexes = Random(seed).sample(range(length), num_set)
+    return RoaringBitArray.from_indexes(length, indexes), set(indexes)
+
+
+class TestRoaringBitArray(TestCase):
+    def test_empty(self):
+        r = RoaringBitArray(100)
+        self.assertEqual(len(r), 100)
+        self.assertEqual(r.count(), 0)
+        self.assertFalse(r.any())
+        self.assertEqual(r.find_first(), -1)
+        self.assertEqual(r.num_bytes(), 0)
+
+    def test_get_set(self):
+        r = RoaringBitArray(3 * CHUNK_BITS)
+        for index in (0, 5, CHUNK_BITS - 1, CHUNK_BITS, 3 * CHUNK_BITS - 1):
+            self.assertFalse(r[index])
+            r[index] = True
+            self.assertTrue(r[index])
+        self.assertEqual(r.count(), 5)
+        self.assertEqual(sorted(r.containers), [0, 1, 2])
+        r[5] = False
+        self.assertFalse(r[5])
+        self.assertEqual(r.count(), 4)
+
+    def test_index_error(self):
+        r = RoaringBitArray(10)
+        with self.assertRaises(IndexError):
+            r[10]
+        with self.assertRaises(IndexError):
+            r[-1] = True
+
+    def test_clearing_last_bit_drops_container(self):
+        r = RoaringBitArray(CHUNK_BITS * 2)
+        r[CHUNK_BITS + 1] = True
+        r[CHUNK_BITS + 1] = False
+        self.assertEqual(r.containers, {})
+
+    def test_iterate(self):
+        r = RoaringBitArray(7)
+        r[2] = True
+        self.assertEqual(list(r), [False, False, True, False, False, False, False])
+
+    def test_iter_set_bits(self):
+        r, indexes = random_roaring(300_000, 2000, seed=1)
+        self.assertEqual(list(r.iter_set_bits()), sorted(indexes))
+
+    def mixed(self):
+        """
+        Array with every kind of container, and its `BitArray` equivalent.
+        """
+        r, _ = random_roaring(4 * CHUNK_BITS + 77, 3000, seed=5)
+        r.fill(True, CHUNK_BITS + 100, 2 * CHUNK_BITS - 100)
+        for index in range(2 * CHUNK_BITS, 3 * CHUNK_BITS, 3):
+            r[index] = True
+        return r, r.to_bitarray()
+
+    def test_get_slice(self):
+        r, bits = self.mixed()
+        for start, stop, step in (
+            (0, len(r), 1),
+            (5, CHUNK_BITS + 1000, 1),
+            (CHUNK_BITS + 99, 3 * CHUNK_BITS + 1, 1),
+            (3 * CHUNK_BITS, None, 1),
+            (7, 7, 1),
+            (1, 100_000, 7),
+        ):
+            sliced = r[start:stop:step]
+            self.assertIsInstance(sliced, RoaringBitArray)
+            self.assertEqual(sliced.tobytes(), bits[start:stop:step].tobytes())
+
+    def test_set_slice(self):
+        r, bits = self.mixed()
+        for start, stop in ((0, 10), (3, CHUNK_BITS + 500), (CHUNK_BITS - 7, 3 * CHUNK_BITS + 5)):
+            for value in (r[0:stop - start], bits[0:stop - start],
+                          RoaringBitArray(stop - start), BitArray(stop - start)):
+                target, expected = self.mixed()
+                target[start:stop] = value
+                expected[start:stop] = (value if isinstance(value, BitArray)
+                                        else value.to_bitarray())
+                self.assertEqual(target.tobytes(), expected.tobytes())
+
+    def test_set_slice_pattern(self):
+        r = RoaringBitArray(100)
+        r[0:10] = RoaringBitArray(10)
+        self.assertEqual(r.count(), 0)
+        r[90:100] = RoaringBitArray.from_indexes(10, [0, 3, 9])
+        self.assertEqual(list(r.iter_set_bits()), [90, 93, 99])
+        r[:] = r
+        self.assertEqual(list(r.iter_set_bits()), [90, 93, 99])
+
+    def test_set_slice_errors(self):
+        r = RoaringBitArray(100)
+        with self.assertRaises(ValueError):
+            r[0:10] = RoaringBitArray(9)
+        with self.assertRaises(ValueError):
+            r[0:10] = BitArray(11)
+        for value in ([0] * 10, b'\x00\x00', None):
+            with self.assertRaises(TypeError):
+                r[0:10] = value
+        self.assertFalse(r.any())
+
+    def test_rank_and_select(self):
+        r, bits = self.mixed()
+        for index in (0, 1, 100, CHUNK_BITS, CHUNK_BITS + 150, 2 * CHUNK_BITS + 4,
+                      3 * CHUNK_BITS + 17, len(r)):
+            self.assertEqual(r.rank(index), bits.rank(index))
+        for rank in (0, 1, 2000, 50_000, r.count() - 1):
+            self.assertEqual(r.select(rank), bits.select(rank))
+            self.assertEqual(r.rank(r.select(rank)), rank)
+        with self.assertRaises(IndexError):
+            r.select(r.count())
+        with self.assertRaises(IndexError):
+            r.rank(len(r) + 1)
+
+    def test_tobytes(self):
+        r, bits = self.mixed()
+        self.assertEqual(r.tobytes(), bits.tobytes())
+
+
+class TestContainers(TestCase):
+    def test_sparse_uses_array(self):
+        r = RoaringBitArray.from_indexes(CHUNK_BITS, range(0, CHUNK_BITS, 100))
+        self.assertIsInstance(r.containers[0], ArrayContainer)
+
+    def test_array_grows_into_bitmap(self):
+        r = RoaringBitArray(CHUNK_BITS)
+        for index in range(0, 2 * (ARRAY_MAX + 1), 2):
+            r[index] = True
+        self.assertIsInstance(r.containers[0], BitmapContainer)
+        self.assertEqual(r.count(), ARRAY_MAX + 1)
+
+    def test_bitmap_shrinks_into_array(self):
+        r = RoaringBitArray.from_indexes(CHUNK_BITS, range(0, 2 * (ARRAY_MAX + 1), 2))
+        r[0] = False
+        self.assertIsInstance(r.containers[0], ArrayContainer)
+        self.assertEqual(r.count(), ARRAY_MAX)
+
+    def test_fill_uses_runs(self):
+        r = RoaringBitArray(10 * CHUNK_BITS)
+        r.fill(True, 1000, 9 * CHUNK_BITS + 7)
+        self.assertEqual(r.count(), 9 * CHUNK_BITS + 7 - 1000)
+        for container in r.containers.values():
+            self.assertIsInstance(container, RunContainer)
+        self.assertLess(r.num_bytes(), 100)
+        self.assertFalse(r[999])
+        self.assertTrue(r[1000])
+        self.assertTrue(r[9 * CHUNK_BITS + 6])
+        self.assertFalse(r[9 * CHUNK_BITS + 7])
+
+    def test_run_add_and_discard(self):
+        r = RoaringBitArray(CHUNK_BITS)
+        r[10:20] = True
+        r[20] = True
+        r[12] = False
+        container = r.containers[0]
+        self.assertIsInstance(container, RunContainer)
+        self.assertEqual(list(container.starts), [10, 13])
+        self.assertEqual(list(container.lasts), [11, 20])
+        self.assertEqual(r.count(), 10)
+
+    def test_fill_false(self):
+        r = RoaringBitArray(3 * CHUNK_BITS)
+        r.fill()
+        r.fill(False, 10, 3 * CHUNK_BITS - 10)
+        self.assertEqual(list(r.iter_set_bits()),
+                         list(range(10)) + list(range(3 * CHUNK_BITS - 10, 3 * CHUNK_BITS)))
+        r.fill(False)
+        self.assertEqual(r.containers, {})
+
+
+class TestRoaringOperations(TestCase):
+    length = 5 * CHUNK_BITS + 123
+
+    def operands(self):
+        a, a_set = random_roaring(self.length, 6000, seed=1)
+        b, b_set = random_roaring(self.length, 6000, seed=2)
+        # A dense chunk in each, and runs overlapping them
+        a.fill(True, CHUNK_BITS, CHUNK_BITS + 30_000)
+        b.fill(True, CHUNK_BITS + 20_000, 2 * CHUNK_BITS + 50)
+        a_set |= set(range(CHUNK_BITS, CHUNK_BITS + 30_000))
+        b_set |= set(range(CHUNK_BITS + 20_000, 2 * CHUNK_BITS + 50))
+        for index in range(3 * CHUNK_BITS, 4 * CHUNK_BITS, 3):
+            b[index] = True
+            b_set.add(index)
+        return a, a_set, b, b_set
+
+    def test_and(self):
+        a, a_set, b, b_set = self.operands()
+        self.assertEqual(list((a & b).iter_set_bits()), sorted(a_set & b_set))
+
+    def test_or(self):
+        a, a_set, b, b_set = self.operands()
+        c = a | b
+        self.assertEqual(list(c.iter_set_bits()), sorted(a_set | b_set))
+        self.assertEqual(c.count(), len(a_set | b_set))
+
+    def test_xor(self):
+        a, a_set, b, b_set = self.operands()
+        self.assertEqual(list((a ^ b).iter_set_bits()), sorted(a_set ^ b_set))
+
+    def test_in_place(self):
+        a, a_set, b, b_set = self.operands()
+        a |= b
+        self.assertEqual(a.count(), len(a_set | b_set))
+        a &= b
+        self.assertEqual(a, b)
+        a ^= b
+        self.assertFalse(a.any())
+
+    def test_operands_unchanged(self):
+        a, a_set, b, b_set = self.operands()
+        a | b
+        a & b
+        self.assertEqual(list(a.iter_set_bits()), sorted(a_set))
+        self.assertEqual(list(b.iter_set_bits()), sorted(b_set))
+
+    def test_writes_to_result_leave_operands_unchanged(self):
+        a, a_set, b, b_set = self.operands()
+        for result in (a | b, a | RoaringBitArray(self.length), RoaringBitArray(self.length) | b):
+            for index in (5, CHUNK_BITS + 5, 3 * CHUNK_BITS + 1, 3 * CHUNK_BITS + 3):
+                result[index] = True
+            for index in list(result.iter_set_bits())[:100]:
+                result[index] = False
+        self.assertEqual(list(a.iter_set_bits()), sorted(a_set))
+        self.assertEqual(list(b.iter_set_bits()), sorted(b_set))
+
+    def test_in_place_union_leaves_other_unchanged(self):
+        a, a_set, b, b_set = self.operands()
+        empty = RoaringBitArray(self.length)
+        empty |= b
+        empty[3 * CHUNK_BITS] = False
+        empty[4 * CHUNK_BITS + 1] = True
+        self.assertEqual(list(b.iter_set_bits()), sorted(b_set))
+
+    def test_invert(self):
+        a, a_set, _, _ = self.operands()
+        inverted = ~a
+        self.assertEqual(inverted.count(), self.length - len(a_set))
+        self.assertFalse(any(inverted[index] for index in a_set))
+        self.assertTrue(inverted[self.length - 1] != a[self.length - 1])
+
+    def test_mismatched_length(self):
+        with self.assertRaises(ValueError):
+            RoaringBitArray(10) | RoaringBitArray(11)
+        with self.assertRaises(TypeError):
+            RoaringBitArray(10) & BitArray(10)
+
+    def test_all_and_find_first(self):
+        r = RoaringBitArray(CHUNK_BITS + 5)
+        self.assertEqual(r.find_first(False), 0)
+        r.fill()
+        self.assertTrue(r.all())
+        self.assertEqual(r.find_first(False), -1)
+        r[CHUNK_BITS + 2] = False
+        self.assertFalse(r.all())
+        self.assertEqual(r.find_first(False), CHUNK_BITS + 2)
+        self.assertEqual(r.find_first(True), 0)
+
+
+class TestBitArrayConversion(TestCase):
+    def test_round_trip(self):
+        length = 3 * CHUNK_BITS + 77
+        rng = Random(3)
+        bits = BitArray(length)
+        bits.data[:] = rng.randbytes(len(bits.data))
+        # Clear the padding bits, which are not part of the array
+        bits.data[-1] &= (1 << (length % 8)) - 1
+        bits.fill(False, 0, CHUNK_BITS)
+        bits.fill(True, CHUNK_BITS, CHUNK_BITS + 1000)
+
+        roaring = RoaringBitArray.from_bitarray(bits)
+        self.assertEqual(roaring.count(), bits.count())
+        self.assertEqual(list(roaring.iter_set_bits()), list(bits.iter_set_bits()))
+        self.assertEqual(roaring.to_bitarray().tobytes(), bits.tobytes())
+
+    def test_sparse_is_smaller(self):
+        length = 10_000_000
+        roaring, _ = random_roaring(length, 1000, seed=4)
+        bits = roaring.to_bitarray()
+        self.assertEqual(bits.count(), 1000)
+        self.assertLess(roaring.num_bytes() * 100, bits.num_bytes())
+        self.assertEqual(RoaringBitArray.from_bitarray(bits), roaring)
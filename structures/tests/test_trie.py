@@ -1,11 +1,25 @@
 
+import os
 from pprint import pprint as pp
-from unittest import skip, TestCase
+from random import Random
+import tempfile
+from unittest import TestCase
 
-from ..trie import Trie
+from ..trie import RadixTrie, Trie
+
+
+def levenshtein(a, b):
+    if not a or not b:
+        return len(a) + len(b)
+    return min(
+        levenshtein(a[1:], b) + 1,
+        levenshtein(a, b[1:]) + 1,
+        levenshtein(a[1:], b[1:]) + (a[0] != b[0]),
+    )
 
 
 class TestTrie(TestCase):
+    cls = Trie
     words = (
         'apple',
         'applecart',
@@ -21,7 +35,7 @@ class TestTrie(TestCase):
         """
         Whole-word matches only
         """
-        trie = Trie.from_words(self.words)
+        trie = self.cls.from_words(self.words)
 
         pp(trie._count_dicts())
 
@@ -36,7 +50,7 @@ class TestTrie(TestCase):
         self.assertFalse(trie.is_word('applejac'))
 
     def test_is_prefix(self):
-        trie = Trie.from_words(self.words)
+        trie = self.cls.from_words(self.words)
         self.assertTrue(trie.is_prefix('a'))
         self.assertTrue(trie.is_prefix('ap'))
         self.assertTrue(trie.is_prefix('app'))
@@ -46,12 +60,189 @@ class TestTrie(TestCase):
         self.assertFalse(trie.is_prefix('appleton'))
         self.assertFalse(trie.is_prefix('banana'))
 
-    @skip('Not implemented')
     def test_prefixes(self):
-        trie = Trie.from_words(self.words)
+        trie = self.cls.from_words(self.words)
 
-        words = trie.prefixes('b')
+        words = list(trie.prefixes('b'))
         self.assertEqual(words, [])
 
-        words = trie.prefixes('apples')
-        pp(words)
+        words = list(trie.prefixes('apples'))
+        self.assertEqual(words, ['apples', 'applesauce', 'applesauces'])
+
+        words = list(trie.prefixes('applec'))
+        self.assertEqual(words, ['applecart', 'applecarts'])
+
+    def test_prefixes_sorted(self):
+        trie = self.cls.from_words(reversed(self.words))
+        self.assertEqual(list(trie.prefixes()), sorted(self.words))
+
+    def test_prefixes_limit(self):
+        trie = self.cls.from_words(self.words)
+        words = list(trie.prefixes('apple', limit=3))
+        self.assertEqual(words, ['apple', 'applecart', 'applecarts'])
+        self.assertEqual(list(trie.prefixes('apple', limit=0)), [])
+
+    def test_fuzzy(self):
+        trie = self.cls.from_words(self.words)
+        self.assertEqual(list(trie.fuzzy('apple', 0)), [('apple', 0)])
+        self.assertEqual(list(trie.fuzzy('appel', 1)), [])
+        self.assertEqual(list(trie.fuzzy('appel', 2)), [('apple', 2), ('apples', 2)])
+        self.assertEqual(list(trie.fuzzy('applejak', 1)), [('applejack', 1)])
+        self.assertEqual(list(trie.fuzzy('aplesauc', 2)),
+                         [('applesauce', 2)])
+
+    def test_fuzzy_brute_force(self):
+        words = ('a', 'ab', 'abc', 'b', 'ba', 'bad', 'bed', 'bead', 'bread', 'cab', 'dab')
+        trie = self.cls.from_words(words)
+        for query in ('', 'a', 'bd', 'bread', 'xyz', 'abcd'):
+            for max_distance in range(4):
+                expected = [
+                    (word, levenshtein(query, word)) for word in sorted(words)
+                    if levenshtein(query, word) <= max_distance]
+                self.assertEqual(list(trie.fuzzy(query, max_distance)), expected)
+
+    def test_save_load(self):
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, 'words.dawg')
+            self.cls.from_words(self.words).save(path)
+            with self.cls.load(path) as loaded:
+                self.assertTrue(loaded.is_word('applejack'))
+                self.assertFalse(loaded.is_word('applejac'))
+                self.assertTrue(loaded.is_prefix('applejac'))
+                self.assertEqual(list(loaded.prefixes()), sorted(self.words))
+
+    def test_save_load_round_trip(self):
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, 'words.dawg')
+            self.cls.from_words(self.words).save(path)
+            loaded = self.cls.from_snapshot(path)
+        self.assertIsInstance(loaded, self.cls)
+        self.assertTrue(loaded.is_word('applejack'))
+        self.assertFalse(loaded.is_word('applejac'))
+        self.assertTrue(loaded.is_prefix('applejac'))
+        self.assertEqual(list(loaded.prefixes('apples')),
+                         ['apples', 'applesauce', 'applesauces'])
+        self.assertEqual(list(loaded.fuzzy('applejak', 1)), [('applejack', 1)])
+
+    def test_prefixes_lazy(self):
+        trie = self.cls.from_words(self.words)
+        words = trie.prefixes('apple')
+        self.assertEqual(next(words), 'apple')
+        self.assertEqual(next(words), 'applecart')
+
+
+class TestTrieWeights(TestCase):
+    weights = {
+        'apple': 50,
+        'applecart': 3,
+        'applecarts': 1,
+        'applejack': 7,
+        'applejacks': 2,
+        'apples': 40,
+        'applesauce': 12,
+        'applesauces': 1,
+        'banana': 45,
+    }
+
+    def make_trie(self):
+        return Trie.from_words(self.weights, self.weights.values())
+
+    def test_top(self):
+        trie = self.make_trie()
+        self.assertEqual(list(trie.top('app', limit=3)),
+                         [('apple', 50), ('apples', 40), ('applesauce', 12)])
+        self.assertEqual(list(trie.top(limit=2)), [('apple', 50), ('banana', 45)])
+
+    def test_top_all(self):
+        trie = self.make_trie()
+        expected = sorted(self.weights.items(), key=lambda item: (-item[1], item[0]))
+        self.assertEqual(list(trie.top(limit=None)), expected)
+
+    def test_top_missing_prefix(self):
+        trie = self.make_trie()
+        self.assertEqual(list(trie.top('cherry')), [])
+
+    def test_top_visits_only_best_subtrees(self):
+        trie = self.make_trie()
+        # Expanding the 'applej' subtree, whose best weight is only 7, would fail
+        trie._prefix('applej')['x'] = None
+        self.assertEqual([word for word, _ in trie.top('apple', limit=3)],
+                         ['apple', 'apples', 'applesauce'])
+
+    def test_top_needs_weights(self):
+        trie = Trie.from_words(self.weights)
+        with self.assertRaises(ValueError):
+            list(trie.top('app'))
+
+    def test_save_load_keeps_weights(self):
+        expected = sorted(self.weights.items(), key=lambda item: (-item[1], item[0]))
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, 'words.dawg')
+            self.make_trie().save(path)
+            with Trie.load(path) as mapped:
+                self.assertEqual(list(mapped.top('app', limit=3)),
+                                 [('apple', 50), ('apples', 40), ('applesauce', 12)])
+                self.assertEqual(list(mapped.top(limit=None)), expected)
+            loaded = Trie.from_snapshot(path)
+            radix = RadixTrie.from_snapshot(path)
+        self.assertIsInstance(loaded, Trie)
+        self.assertEqual(list(loaded.top('app', limit=3)),
+                         [('apple', 50), ('apples', 40), ('applesauce', 12)])
+        self.assertEqual(list(loaded.top(limit=None)), expected)
+        # Weights are dropped, as a radix trie cannot hold them
+        self.assertIsInstance(radix, RadixTrie)
+        self.assertEqual(list(radix.prefixes()), sorted(self.weights))
+
+    def test_weights_length(self):
+        with self.assertRaises(ValueError):
+            Trie.from_words(['apple', 'banana'], [1])
+
+
+class TestRadixTrie(TestTrie):
+    """
+    Same queries as `Trie`, plus checks of the compressed structure.
+    """
+    cls = RadixTrie
+
+    def test_edges_hold_labels(self):
+        trie = RadixTrie.from_words(self.words)
+        self.assertEqual(list(trie._trie), ['a'])
+        label, apple = trie._trie['a']
+        self.assertEqual(label, 'apple')
+        self.assertEqual(apple['c'], ('cart', {None: None, 's': 's'}))
+        # Root, then apple, applecart, applejack, apples and applesauce
+        self.assertEqual(trie._count_dicts(), 6)
+
+    def test_sorted_and_unsorted_agree(self):
+        words = ('romane', 'romanus', 'romulus', 'rubens', 'ruber', 'rubicon',
+                 'rubicundus', 'rom', 'r', 'rubicon', 'a')
+        expected = RadixTrie()
+        for word in words:
+            expected._insert(word)
+        self.assertEqual(RadixTrie.from_words(sorted(words))._trie, expected._trie)
+        self.assertEqual(RadixTrie.from_words(words)._trie, expected._trie)
+        self.assertEqual(list(expected.prefixes()), sorted(set(words)))
+
+    def test_sorted_load_matches_inserts(self):
+        # Tiny alphabet, so that many words are prefixes of others
+        rng = Random(1)
+        for _ in range(50):
+            words = [''.join(rng.choices('ab', k=rng.randrange(7)))
+                     for _ in range(rng.randrange(1, 30))]
+            expected = RadixTrie()
+            for word in words:
+                expected._insert(word)
+            self.assertEqual(RadixTrie.from_words(sorted(words))._trie, expected._trie, words)
+            # Sorted start, then out-of-order tail
+            ordered = sorted(words[:10]) + words[10:]
+            self.assertEqual(RadixTrie.from_words(ordered)._trie, expected._trie, ordered)
+
+    def test_prefix_ends_inside_edge(self):
+        trie = RadixTrie.from_words(self.words)
+        self.assertEqual(list(trie.prefixes('applesa')), ['applesauce', 'applesauces'])
+        self.assertEqual(list(trie.prefixes('applesx')), [])
+        self.assertFalse(trie.is_word('applesauc'))
+
+    def test_weights_unsupported(self):
+        with self.assertRaises(ValueError):
+            RadixTrie.from_words(['apple'], [1])
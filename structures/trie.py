@@ -1,10 +1,17 @@
 #!/usr/bin/env python3
 
+import heapq
+from itertools import islice
 from pprint import pformat, pprint as pp
 import sys
+from types import MappingProxyType
 from typing import Any
 
 
+# Key holding greatest weight in a node's subtree. Never a letter, as it's empty.
+_BEST = ''
+
+
 class Trie:
     """
     Simple nested-dictionary implementation of a Trie.
@@ -27,14 +34,84 @@ class Trie:
         return cls.from_words(cls._read_file(path))
 
     @classmethod
-    def from_words(cls, words):
+    def from_words(cls, words, weights=None):
         """
         Create new `Trie` object from given words.
+
+        Args:
+            words:
+                Iterable of words.
+            weights:
+                Optional iterable of numbers, one per word, used to rank
+                completions in `top()`.
         """
         trie = cls()
-        trie._load(words)
+        trie._load(words, weights)
         return trie
 
+    def fuzzy(self, word, max_distance=1):
+        """
+        Yield `(word, distance)` for words within an edit distance of `word`.
+
+        Distance is the Levenshtein distance: the number of single-letter
+        insertions, deletions and substitutions needed to turn one word into
+        the other. See `_fuzzy_search()` for how subtrees are pruned.
+
+        Args:
+            word:
+                Word to search for.
+            max_distance:
+                Greatest distance to include.
+
+        Returns:
+            Generator of matches, in lexicographic order.
+        """
+        return _fuzzy_search(word, max_distance, self._trie, self._labelled_edges, _is_end)
+
+    @classmethod
+    def from_snapshot(cls, path):
+        """
+        Create new trie from words, and any weights, saved by `save()`.
+
+        Every word is read and inserted, so this takes as long as building
+        from a word list. Use `load()` to query a snapshot in place.
+        """
+        with cls.load(path) as dawg:
+            words = list(dawg)
+            weights = None if dawg.weights is None else list(dawg.weights)
+        return cls.from_words(words, weights)
+
+    @staticmethod
+    def load(path):
+        """
+        Open words saved by `save()`, mapped into memory and queried in place.
+
+        Nothing is parsed up-front, so loading takes well under a millisecond,
+        and processes loading the same file share one copy of it.
+
+        Returns:
+            Read-only `Dawg`, which answers `is_word()`, `is_prefix()`,
+            `prefixes()`, `fuzzy()` and, if saved with weights, `top()`.
+            Call its `close()` when finished with it.
+        """
+        # Imported here as the dawg module imports this one
+        from .dawg import Dawg
+        return Dawg.open(path)
+
+    def save(self, path):
+        """
+        Save words to `path` as a compact `Dawg`, to be read by `load()` or
+        `from_snapshot()`.
+
+        Weights are saved too, as floats.
+        """
+        from .dawg import Dawg
+        words = list(self.prefixes())
+        weights = None
+        if _BEST in self._trie:
+            weights = [self._prefix(word)[None] for word in words]
+        Dawg.from_words(words, weights).save(path)
+
     def is_word(self, word):
         """
         Does the whole `word` exist in trie?
@@ -53,35 +130,63 @@ class Trie:
         prefix = self._prefix(word)
         return bool(prefix)
 
-    def prefixes(self, prefix):
+    def prefixes(self, prefix='', limit=None):
         """
-        Return all full words that start with `prefix`.
+        Yield full words that start with `prefix`, in lexicographic order.
+
+        Words are found lazily, so only as much of the trie is visited as
+        the caller consumes.
+
+        Args:
+            prefix:
+                Start of words to find. The prefix itself is included if it
+                is a whole word.
+            limit:
+                Maximum number of words to yield, or None for all of them.
         """
-        raise NotImplementedError
-        words = []
         tree = self._prefix(prefix)
         if not tree:
-            return words
-
-        def generate_words(prefix, tree):
-            for letter in tree:
-                if letter is None:
-                    continue
-
-                word = prefix + letter
-                if None in tree[letter]:
-                    yield word
-                else:
-                    pp(tree[letter])
-                    for x in generate_words(word, tree[letter]):
-                        yield x
+            return
+        yield from islice(self._generate_words(prefix, tree), limit)
 
+    def top(self, prefix='', limit=10):
+        """
+        Yield `(word, weight)` for the heaviest words starting with `prefix`.
 
-        for word in generate_words(prefix, tree):
-            words.append(word)
+        Every node is annotated with the maximum weight found beneath it, so a
+        best-first search finds the top words without visiting the rest of
+        the subtree. Ties are broken lexicographically.
 
-        pp(words)
-        return words
+        Args:
+            prefix:
+                Start of words to find.
+            limit:
+                Maximum number of words to yield, or None for all of them.
+
+        Raises:
+            ValueError:
+                If the trie was built without weights.
+        """
+        if self._trie and _BEST not in self._trie:
+            raise ValueError("Trie was built without weights")
+        tree = self._prefix(prefix)
+        if not tree:
+            return
+
+        # Heap of (-weight, text, node), where node is None for whole words
+        heap = [(-tree[_BEST], prefix, tree)]
+        found = 0
+        while heap and (limit is None or found < limit):
+            weight, text, node = heapq.heappop(heap)
+            if node is None:
+                yield text, -weight
+                found += 1
+                continue
+            if None in node:
+                heapq.heappush(heap, (-node[None], text, None))
+            for letter, child in node.items():
+                if letter:
+                    heapq.heappush(heap, (-child[_BEST], text + letter, child))
 
     def _count_dicts(self,) -> int:
         """
@@ -109,17 +214,51 @@ class Trie:
         return count(self._trie)
 
 
-    def _load(self, words):
+    def _generate_words(self, prefix, tree):
+        """
+        Yield whole words in `tree` lexicographically, depth-first.
+        """
+        stack = [(prefix, tree)]
+        while stack:
+            prefix, tree = stack.pop()
+            if None in tree:
+                yield prefix
+            letters = sorted((letter for letter in tree if letter), reverse=True)
+            stack.extend((prefix + letter, tree[letter]) for letter in letters)
+
+    def _labelled_edges(self, tree):
+        """
+        Return `(label, child)` for every child of node, in sorted order.
+        """
+        return [(letter, tree[letter]) for letter in sorted(letter for letter in tree if letter)]
+
+    def _load(self, words, weights=None):
         """
         Replace current data with that from `words` iterable.
+
+        With weights, each word's end marker holds its weight, and every node
+        on its path holds the greatest weight beneath it under `_BEST`.
         """
         self._trie = {}
-        for word in words:
+        if weights is None:
+            for word in words:
+                word = word.strip().lower()
+                current = self._trie
+                for letter in word:
+                    current = current.setdefault(letter, {})
+                current[None] = None
+            return
+
+        for word, weight in zip(words, weights, strict=True):
             word = word.strip().lower()
             current = self._trie
             for letter in word:
+                if current.get(_BEST, weight) <= weight:
+                    current[_BEST] = weight
                 current = current.setdefault(letter, {})
-            current[None] = None
+            if current.get(_BEST, weight) <= weight:
+                current[_BEST] = weight
+            current[None] = weight
 
     def _prefix(self, word):
         """
@@ -156,6 +295,327 @@ class Trie:
         return '\n'.join(lines)
 
 
+class RadixTrie(Trie):
+    """
+    Path-compressed (Patricia) trie, whose edges are labelled with strings.
+
+    Chains of nodes with only one child are merged into a single edge, so a
+    long unbranched suffix costs one edge rather than one node per letter.
+    Each node is a dictionary mapping the first letter of every outgoing edge
+    to a `(label, child)` tuple, plus the `None` end-of-word marker. Edges
+    to leaves, the end of a word with no longer words after it, are stored as
+    just the label string.
+
+    Sorted input, such as most word lists, is loaded in one linear pass that
+    never splits an edge. Loading is still a little slower than for `Trie`,
+    as finding each word's common prefix with the previous one is done in
+    Python, but the result takes well under half the memory. Weights are not
+    supported.
+    """
+    def is_word(self, word):
+        """
+        Does the whole `word` exist in trie?
+        """
+        found = self._find(word)
+        return found is not None and found[1] == '' and None in found[0]
+
+    def is_prefix(self, word):
+        """
+        Is the given `word` found as prefix, or as whole word?
+        """
+        found = self._find(word)
+        return found is not None and bool(found[0])
+
+    def prefixes(self, prefix='', limit=None):
+        """
+        Yield full words that start with `prefix`, in lexicographic order.
+
+        Args:
+            prefix:
+                Start of words to find.
+            limit:
+                Maximum number of words to yield, or None for all of them.
+        """
+        found = self._find(prefix)
+        if found is None:
+            return
+        node, rest = found
+        yield from islice(self._generate_words(prefix + rest, node), limit)
+
+    @classmethod
+    def from_snapshot(cls, path):
+        """
+        Create new trie from words saved by `save()`.
+
+        Any weights are ignored, as they are not supported.
+        """
+        with cls.load(path) as dawg:
+            return cls.from_words(list(dawg))
+
+    def _count_dicts(self):
+        """
+        Count the number of dictionaries used, one per branching node.
+        """
+        count = 0
+        stack = [self._trie]
+        while stack:
+            node = stack.pop()
+            count += 1
+            stack.extend(child for _, child in _edges(node) if child is not _LEAF)
+        return count
+
+    def _find(self, word):
+        """
+        Follow `word` from the root.
+
+        Returns:
+            None if `word` is not a prefix, otherwise a tuple of the node
+            reached and the rest of the label of the edge leading to it, which
+            is empty unless `word` ends part way along an edge.
+        """
+        node = self._trie
+        index = 0
+        while index < len(word):
+            entry = node.get(word[index])
+            if entry is None:
+                return None
+            label, child = _split(entry)
+            remaining = word[index:index + len(label)]
+            if not label.startswith(remaining):
+                return None
+            index += len(label)
+            node = child
+            if len(remaining) < len(label):
+                return node, label[len(remaining):]
+        return node, ''
+
+    def _generate_words(self, prefix, tree):
+        """
+        Yield whole words in `tree` lexicographically, depth-first.
+        """
+        stack = [(prefix, tree)]
+        while stack:
+            prefix, tree = stack.pop()
+            if None in tree:
+                yield prefix
+            edges = sorted(_edges(tree), reverse=True)
+            stack.extend((prefix + label, child) for label, child in edges)
+
+    def _insert(self, word):
+        """
+        Add a single word, in any order, splitting an edge if need be.
+        """
+        node = self._trie
+        index = 0
+        while index < len(word):
+            letter = word[index]
+            entry = node.get(letter)
+            if entry is None:
+                node[letter] = word[index:]
+                return
+            label, child = _split(entry)
+            common = _common_length(label, word[index:])
+            if common < len(label):
+                child = {label[common]: _join(label[common:], child)}
+                node[letter] = (label[:common], child)
+            elif child is _LEAF:
+                if index + common == len(word):
+                    return
+                child = {None: None}
+                node[letter] = (label, child)
+            node = child
+            index += common
+        node[None] = None
+
+    def _labelled_edges(self, tree):
+        """
+        Return `(label, child)` for every child of node, in sorted order.
+        """
+        return sorted(_edges(tree))
+
+    def _load(self, words, weights=None):
+        """
+        Replace current data with that from `words` iterable.
+
+        While words arrive in sorted order, each edge is created exactly once,
+        with its final label, so no edge is ever split. Nodes along the
+        previous word are kept open on a stack, and only attached to their
+        parents once a later word shows where they branch off. Any words
+        after the first out-of-order one are inserted one by one instead.
+        """
+        if weights is not None:
+            raise ValueError(f"{self.__class__.__name__} does not support weights")
+
+        self._trie = {}
+        words = (word.strip().lower() for word in words)
+        # Open nodes along the previous word, as (depth, node)
+        stack = [(0, self._trie)]
+        previous = None
+        for word in words:
+            if previous is None:
+                previous = word
+                continue
+            if word <= previous:
+                if word == previous:
+                    continue
+                _close_path(stack, previous, 0)
+                previous = None
+                self._insert(word)
+                break
+            # Inline, as this is most of the cost of loading
+            if word.startswith(previous):
+                common = len(previous)
+            else:
+                common = 0
+                for a, b in zip(previous, word):
+                    if a != b:
+                        break
+                    common += 1
+            if common == len(previous) and common:
+                # Previous word is a prefix of this one, so ends on a node
+                stack.append((common, {None: None}))
+            elif stack[-1][0] == common and common < len(previous):
+                # Commonest case, previous word just leaves an open node
+                stack[-1][1][previous[common]] = previous[common:]
+            else:
+                _close_path(stack, previous, common)
+            previous = word
+
+        if previous is not None:
+            _close_path(stack, previous, 0)
+        for word in words:
+            self._insert(word)
+
+    def _prefix(self, word):
+        """
+        Return sub-trie if `word` ends on a node, `False` otherwise.
+        """
+        found = self._find(word)
+        if found is None or found[1]:
+            return False
+        return found[0]
+
+
+# Read-only child of every leaf edge
+_LEAF = MappingProxyType({None: None})
+
+
+def _common_length(a, b):
+    """
+    Length of the common prefix of two strings.
+    """
+    length = 0
+    for x, y in zip(a, b):
+        if x != y:
+            break
+        length += 1
+    return length
+
+
+def _close_path(stack, word, depth):
+    """
+    Attach the open nodes along `word` below `depth`, for `RadixTrie._load()`.
+
+    The remainder of `word` becomes a leaf edge. Then every open node deeper
+    than `depth` is popped and attached to its parent with its final label.
+    If no open node lies exactly at `depth` a branching node is made there,
+    and left open for the next word.
+    """
+    if stack[-1][0] == len(word):
+        # Only the empty word ends on an open node
+        stack[-1][1][None] = None
+        return
+
+    child, child_depth = _LEAF, len(word)
+    while True:
+        if stack[-1][0] < depth:
+            parent_depth, parent = depth, {}
+            stack.append((depth, parent))
+        else:
+            parent_depth, parent = stack[-1]
+        if child_depth > parent_depth:
+            parent[word[parent_depth]] = _join(word[parent_depth:child_depth], child)
+        if parent_depth <= depth:
+            return
+        stack.pop()
+        child, child_depth = parent, parent_depth
+
+
+def _fuzzy_search(word, max_distance, root, edges, is_end):
+    """
+    Yield `(word, distance)` for words in a trie within `max_distance` of `word`.
+
+    Walks the trie depth-first, carrying one row of the Levenshtein
+    dynamic-programming table per node: the distances from the node's prefix
+    to every prefix of `word`. A child's row is computed from its parent's
+    in `O(len(word))`, so shared prefixes are only costed once. If every
+    entry in a row exceeds `max_distance` no extension of that prefix can
+    match, and the whole subtree is skipped.
+
+    Args:
+        word: Word to search for.
+        max_distance: Greatest distance to include.
+        root: Root node.
+        edges: Function returning `(label, child)` for a node's edges, sorted.
+        is_end: Function returning true if a word ends at node.
+    """
+    stack = [('', root, list(range(len(word) + 1)))]
+    while stack:
+        prefix, node, row = stack.pop()
+        if row[-1] <= max_distance and is_end(node):
+            yield prefix, row[-1]
+
+        children = []
+        for label, child in edges(node):
+            child_row = row
+            for letter in label:
+                child_row = _next_row(child_row, word, letter)
+                if min(child_row) > max_distance:
+                    break
+            else:
+                children.append((prefix + label, child, child_row))
+        stack.extend(reversed(children))
+
+
+def _is_end(node):
+    return None in node
+
+
+def _next_row(row, word, letter):
+    """
+    Next row of Levenshtein table, after appending `letter` to the prefix.
+    """
+    next_row = [row[0] + 1]
+    for column, target in enumerate(word, 1):
+        next_row.append(min(
+            next_row[column - 1] + 1,
+            row[column] + 1,
+            row[column - 1] + (target != letter),
+        ))
+    return next_row
+
+
+def _edges(node):
+    """
+    Yield `(label, child)` for every edge out of a radix node.
+    """
+    return (_split(entry) for letter, entry in node.items() if letter is not None)
+
+
+def _join(label, child):
+    """
+    Edge entry for label and child, just the label for leaves.
+    """
+    return label if child is _LEAF else (label, child)
+
+
+def _split(entry):
+    """
+    Return `(label, child)` for an edge entry.
+    """
+    return (entry, _LEAF) if entry.__class__ is str else entry
+
+
 """
 def search_trie(word, trie):
     "